@@ -2,6 +2,7 @@
 Base settings to build other settings files upon.
 """
 
+import tempfile
 from pathlib import Path
 
 import environ
@@ -349,3 +350,5 @@ LRM_QA_USER = env("LRM_QA_USER")
 LRM_QA_PASSWORD = env("LRM_QA_PASSWORD")
 LRM_DEV_TOKEN = env("LRM_DEV_TOKEN")
 XLI_TOKEN = env("XLI_TOKEN")
+# pages downloaded by xpath title patterns, revalidated with their ETag/Last-Modified before reuse
+TITLE_PAGE_CACHE_DIR = env("TITLE_PAGE_CACHE_DIR", default=str(Path(tempfile.gettempdir()) / "title_page_cache"))
@@ -21,19 +21,14 @@ def _health_check_on_urls_titles(server_name: str):
     collection_config_folders = [collection.config_folder for collection in Collection.objects.all()]
 
     for collection_config_folder in collection_config_folders:
-        page = 1
         urls_server_info_dict = {}
-        while True:
-            response = api.query(page=page, collection_config_folder=collection_config_folder)
-            if response.get("cursorRowCount", 0) == 0:  # Safeguard against missing 'cursorRowCount'
-                break
-            for record in response.get("records", []):  # Safeguard against missing 'records'
-                url = record.get(url_field)
-                title = record.get("title")
-                if url and title:  # Ensure both url and title are present
-                    urls_server_info_dict[url] = {"title": title}
-            page += 1
+        for record in api.iter_query_records(collection_config_folder=collection_config_folder):
+            url = record.get(url_field)
+            title = record.get("title")
+            if url and title:  # Ensure both url and title are present
+                urls_server_info_dict[url] = {"title": title}
         print(f"Finished collecting URLs from {server_name} server for config folder {collection_config_folder}")
+        print(f"Sinequa requests so far: {api.metrics}")
 
         collection_object = Collection.objects.filter(config_folder=collection_config_folder)
         candidate_urls_objects = CandidateURL.objects.filter(collection=collection_object[0])
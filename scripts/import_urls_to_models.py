@@ -5,25 +5,26 @@ you will need to log onto the server and run the following script
 
 import json
 
-from sde_collections.models.candidate_url import CandidateURL
 from sde_collections.models.collection import Collection
+from sde_collections.models.delta_url import DeltaUrl
+from sde_collections.utils.bulk_load import copy_urls
 
 urls = json.load(open("solar_urls.json"))
 
 collection = Collection.objects.get(name="Solar System Exploration")
 
-for url in urls:
-    candidate_url = CandidateURL.objects.create(
-        url=url["url"],
-        collection=collection,
-        hash="1",
-        scraped_title=url["title"],
-        generated_title=url["generated_title"],
-        visited=False,
-        document_type=0,
-        inferenced_by="",
-        is_pdf=False,
-        present_on_test=False,
-        present_on_prod=False,
-    )
-    candidate_url.save()
+counts = copy_urls(
+    DeltaUrl,
+    collection,
+    (
+        {
+            "url": url["url"],
+            "scraped_title": url["title"],
+            "generated_title": url["generated_title"],
+            "document_type": 0,
+        }
+        for url in urls
+    ),
+    fields=["url", "scraped_title", "generated_title", "document_type"],
+)
+print(f"Created {counts['created']} DeltaUrls, skipped {counts['skipped']} URLs that already exist")
@@ -7,6 +7,7 @@ from sde_collections.models.delta_patterns import (
     DeltaDivisionPattern,
     DeltaResolvedTitle,
     DeltaTitlePattern,
+    PatternApplicationJob,
 )
 
 from .models.candidate_url import CandidateURL, ResolvedTitle
@@ -344,11 +345,20 @@ class DeltaDivisionPatternAdmin(admin.ModelAdmin):
     search_fields = ("match_pattern", "division")
 
 
+class PatternApplicationJobAdmin(admin.ModelAdmin):
+    list_display = ("match_pattern", "action", "status", "progress", "collection", "created_at")
+    list_filter = ("action", "status")
+    readonly_fields = ("error",)
+
+
 class DumpUrlAdmin(admin.ModelAdmin):
     """Admin View for DumpUrl"""
 
     list_display = ("url", "scraped_title", "collection")
     list_filter = ("collection",)
+    # the text is shown rather than a choice of every stored blob
+    exclude = ("scraped_text_blob",)
+    readonly_fields = ("scraped_text",)
 
 
 class DeltaUrlAdmin(admin.ModelAdmin):
@@ -356,6 +366,8 @@ class DeltaUrlAdmin(admin.ModelAdmin):
 
     list_display = ("url", "scraped_title", "generated_title", "collection")
     list_filter = ("collection",)
+    exclude = ("scraped_text_blob",)
+    readonly_fields = ("scraped_text",)
 
 
 class CuratedUrlAdmin(admin.ModelAdmin):
@@ -363,6 +375,8 @@ class CuratedUrlAdmin(admin.ModelAdmin):
 
     list_display = ("url", "scraped_title", "generated_title", "collection")
     list_filter = ("collection",)
+    exclude = ("scraped_text_blob",)
+    readonly_fields = ("scraped_text",)
 
 
 admin.site.register(WorkflowHistory, WorkflowHistoryAdmin)
@@ -376,6 +390,7 @@ admin.site.register(DivisionPattern, DivisionPatternAdmin)
 admin.site.register(DeltaTitlePattern, DeltaTitlePatternAdmin)
 admin.site.register(DeltaResolvedTitle, DeltaResolvedTitleAdmin)
 admin.site.register(DeltaDivisionPattern, DeltaDivisionPatternAdmin)
+admin.site.register(PatternApplicationJob, PatternApplicationJobAdmin)
 admin.site.register(DumpUrl, DumpUrlAdmin)
 admin.site.register(DeltaUrl, DeltaUrlAdmin)
 admin.site.register(CuratedUrl, CuratedUrlAdmin)
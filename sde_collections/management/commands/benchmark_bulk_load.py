@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sde_collections.models.collection import Collection
+from sde_collections.models.collection_choice_fields import Divisions
+from sde_collections.models.delta_url import DumpUrl
+from sde_collections.utils.bulk_load import copy_urls
+
+BULK_CREATE_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Compare DumpUrl loading throughput of create() per row, bulk_create and the COPY loader"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--urls", type=int, default=100_000, help="Number of DumpUrls to load per method")
+        parser.add_argument("--text-size", type=int, default=2000, help="Bytes of scraped_text per URL")
+        parser.add_argument(
+            "--create-urls", type=int, default=5000, help="Number of DumpUrls for the slow create() per row method"
+        )
+
+    def handle(self, *args, **options):
+        text = "x" * options["text_size"]
+        collection = Collection.objects.create(
+            name=f"Bulk Load Benchmark {int(time.time())}",
+            url="https://example.com",
+            division=Divisions.ASTROPHYSICS,
+        )
+
+        def rows(method, count):
+            for index in range(count):
+                yield {
+                    "url": f"https://example.com/benchmark/{collection.id}/{method}/{index}",
+                    "scraped_title": f"Title {index}",
+                    "scraped_text": text,
+                }
+
+        def create_per_row(count):
+            with transaction.atomic():
+                for row in rows("create", count):
+                    DumpUrl.objects.create(collection=collection, **row)
+
+        def bulk_create(count):
+            with transaction.atomic():
+                batch = []
+                for row in rows("bulk_create", count):
+                    batch.append(DumpUrl(collection=collection, **row))
+                    if len(batch) == BULK_CREATE_BATCH_SIZE:
+                        DumpUrl.objects.bulk_create(batch, ignore_conflicts=True)
+                        batch = []
+                DumpUrl.objects.bulk_create(batch, ignore_conflicts=True)
+
+        def copy(count):
+            copy_urls(DumpUrl, collection, rows("copy", count), fields=["url", "scraped_title", "scraped_text"])
+
+        try:
+            for name, load, count in [
+                ("create() per row", create_per_row, options["create_urls"]),
+                ("bulk_create", bulk_create, options["urls"]),
+                ("COPY", copy, options["urls"]),
+            ]:
+                started = time.perf_counter()
+                load(count)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{name:>16}: {count} rows in {elapsed:.1f}s ({count / elapsed:,.0f} rows/sec)")
+        finally:
+            # Collection.delete is a model field, so delete through the queryset
+            Collection.objects.filter(pk=collection.pk).delete()
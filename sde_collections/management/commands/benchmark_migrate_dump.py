@@ -0,0 +1,86 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+
+from sde_collections.models.collection import Collection
+from sde_collections.models.collection_choice_fields import Divisions
+from sde_collections.models.delta_url import CuratedUrl, DeltaUrl, DumpUrl
+from sde_collections.models.text_blob import TextBlob
+
+BATCH_SIZE = 5000
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = "Time Collection.migrate_dump_to_delta and report peak RSS on a synthetic collection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--urls", type=int, default=500_000, help="Number of DumpUrls to migrate")
+        parser.add_argument("--text-size", type=int, default=2000, help="Bytes of scraped_text per URL")
+        parser.add_argument(
+            "--changed", type=float, default=0.1, help="Fraction of curated URLs whose title changed in the dump"
+        )
+        parser.add_argument("--full", action="store_true", help="Run a non-incremental migration")
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark collection afterwards")
+
+    def handle(self, *args, **options):
+        url_count = options["urls"]
+        # every URL shares one blob, which the first bulk_create stores
+        text = "x" * options["text_size"]
+        blob = TextBlob.from_text(text) if text else None
+        changed_every = max(int(1 / options["changed"]), 1) if options["changed"] else 0
+
+        collection = Collection.objects.create(
+            name=f"Migration Benchmark {int(time.time())}",
+            url="https://example.com",
+            division=Divisions.ASTROPHYSICS,
+        )
+        self.stdout.write(f"Creating {url_count} DumpUrls in {collection.config_folder}")
+
+        # the first 90% of URLs are already curated, and 10% as many curated URLs are gone from the dump
+        curated_count = url_count * 9 // 10
+        for start in range(0, url_count, BATCH_SIZE):
+            DumpUrl.objects.bulk_create(
+                DumpUrl(
+                    collection=collection,
+                    url=f"https://example.com/benchmark/{collection.id}/{index}",
+                    scraped_title=(
+                        f"Changed {index}" if changed_every and index % changed_every == 0 else f"Title {index}"
+                    ),
+                    scraped_text_blob=blob,
+                )
+                for index in range(start, min(start + BATCH_SIZE, url_count))
+            )
+        for start in range(0, curated_count + url_count // 10, BATCH_SIZE):
+            CuratedUrl.objects.bulk_create(
+                CuratedUrl(
+                    collection=collection,
+                    url=f"https://example.com/benchmark/{collection.id}/{index if index < curated_count else -index}",
+                    scraped_title=f"Title {index}",
+                    scraped_text_blob=blob,
+                )
+                for index in range(start, min(start + BATCH_SIZE, curated_count + url_count // 10))
+            )
+
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        collection.migrate_dump_to_delta(incremental=not options["full"])
+        elapsed = time.perf_counter() - started
+        rss_after = peak_rss_mb()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Migrated {url_count} URLs into {DeltaUrl.objects.filter(collection=collection).count()} "
+                f"DeltaUrls in {elapsed:.1f}s ({url_count / elapsed:,.0f} URLs/s). "
+                f"Peak RSS {rss_after:.0f} MB, {rss_after - rss_before:.0f} MB above the peak before migrating."
+            )
+        )
+
+        if not options["keep"]:
+            # Collection.delete is a model field, so delete through the queryset
+            Collection.objects.filter(pk=collection.pk).delete()
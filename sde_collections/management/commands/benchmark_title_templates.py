@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sde_collections.utils.title_resolver import TitleTemplate, compile_title_template
+
+DEFAULT_TITLE_PATTERN = "{collection} | {title} - Processed ({url})"
+
+
+class Command(BaseCommand):
+    help = "Compare rendering titles with a title pattern compiled per render against a cached compiled template"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--renders", type=int, default=100_000, help="Number of titles to render per method")
+        parser.add_argument("--title-pattern", default=DEFAULT_TITLE_PATTERN, help="Title pattern to render")
+
+    def handle(self, *args, **options):
+        renders, title_pattern = options["renders"], options["title_pattern"]
+        contexts = [
+            {"url": f"https://example.com/page/{index}", "title": f"Title {index}", "collection": "Benchmark"}
+            for index in range(1000)
+        ]
+
+        def compile_per_render():
+            for index in range(renders):
+                TitleTemplate(title_pattern).render(contexts[index % len(contexts)])
+
+        def cached_template():
+            for index in range(renders):
+                compile_title_template(title_pattern).render(contexts[index % len(contexts)])
+
+        for name, render in [("compiled per render", compile_per_render), ("cached template", cached_template)]:
+            started = time.perf_counter()
+            render()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{name:>19}: {renders} titles in {elapsed:.2f}s ({elapsed / renders * 1e6:.1f}µs per title)"
+            )
@@ -22,6 +22,7 @@ from sde_collections.models.pattern import (
     IncludePattern,
     TitlePattern,
 )
+from sde_collections.utils.bulk_load import copy_urls
 
 STATUSES_TO_MIGRATE = [
     WorkflowStatusChoices.CURATED,
@@ -38,6 +39,9 @@ STATUSES_TO_MIGRATE = [
     WorkflowStatusChoices.PROD_MAJOR,
 ]
 
+# fields copied from each CandidateURL to its DeltaUrl
+CANDIDATE_URL_FIELDS = ["url", "scraped_title", "generated_title", "visited", "document_type", "division"]
+
 
 class Command(BaseCommand):
     help = """Migrate CandidateURLs to DeltaUrl, apply the matching patterns,
@@ -68,31 +72,16 @@ class Command(BaseCommand):
 
         # Step 3: Migrate all CandidateURLs to DeltaUrl
         start_time = time.time()
-        # Set to track URLs globally across all collections
-        global_unique_urls = set()
-
+        # DeltaUrls were cleared above, so skipping conflicting URLs keeps each URL in the first collection that has it
         for collection in all_collections_with_urls:
-            delta_urls = []
-
-            # Filter CandidateURL objects, ensuring each URL is globally unique
-            for candidate_url in CandidateURL.objects.filter(collection=collection):
-                if candidate_url.url not in global_unique_urls:
-                    global_unique_urls.add(candidate_url.url)
-                    delta_urls.append(
-                        DeltaUrl(
-                            collection=candidate_url.collection,
-                            url=candidate_url.url,
-                            scraped_title=candidate_url.scraped_title,
-                            generated_title=candidate_url.generated_title,
-                            visited=candidate_url.visited,
-                            document_type=candidate_url.document_type,
-                            division=candidate_url.division,
-                            to_delete=False,
-                        )
-                    )
-
-            # Bulk create the unique DeltaUrl instances for this collection
-            DeltaUrl.objects.bulk_create(delta_urls)
+            copy_urls(
+                DeltaUrl,
+                collection,
+                CandidateURL.objects.filter(collection=collection)
+                .values(*CANDIDATE_URL_FIELDS)
+                .iterator(chunk_size=5000),
+                fields=CANDIDATE_URL_FIELDS,
+            )
 
         self.stdout.write(f"Migrated CandidateURLs to DeltaUrl in {time.time() - start_time:.2f} seconds.")
 
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from sde_collections.models.delta_url import DumpUrl
+from sde_collections.utils.partitioning import (
+    is_partitioned,
+    partition_by_collection,
+    unpartition,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Partition the DumpUrl table by collection, moving the existing rows into one partition per "
+        "collection, or with --undo turn it back into a single table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--undo", action="store_true", help="Turn the partitioned table back into a single table")
+
+    def handle(self, *args, **options):
+        if options["undo"]:
+            if not is_partitioned(DumpUrl):
+                self.stdout.write("The DumpUrl table isn't partitioned")
+                return
+            unpartition(DumpUrl)
+            self.stdout.write(self.style.SUCCESS("Turned the DumpUrl table back into a single table"))
+            return
+
+        if is_partitioned(DumpUrl):
+            self.stdout.write("The DumpUrl table is already partitioned")
+            return
+        partitions = partition_by_collection(DumpUrl)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Partitioned the DumpUrl table into {partitions} collection partitions; other collections get "
+                "theirs the next time their DumpUrls are cleared"
+            )
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from sde_collections.models.text_blob import TextBlob
+
+
+class Command(BaseCommand):
+    help = "Delete scraped text blobs that no DumpUrl, DeltaUrl or CuratedUrl references any more"
+
+    def handle(self, *args, **options):
+        deleted = TextBlob.objects.purge_unreferenced()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unreferenced text blobs"))
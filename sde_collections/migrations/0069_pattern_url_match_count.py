@@ -0,0 +1,90 @@
+# Generated by Django 4.2.9 on 2026-10-18 02:27
+
+import re
+
+from django.db import migrations, models
+
+PATTERN_MODELS = [
+    "deltaexcludepattern",
+    "deltaincludepattern",
+    "deltatitlepattern",
+    "deltadocumenttypepattern",
+    "deltadivisionpattern",
+]
+
+
+def backfill_url_match_counts(apps, schema_editor):
+    DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
+    CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
+
+    for model_name in PATTERN_MODELS:
+        model = apps.get_model("sde_collections", model_name)
+        for pattern in model.objects.all():
+            # same conversion as BaseMatchPattern.get_regex_pattern
+            regex_pattern = re.escape(pattern.match_pattern)
+            if pattern.match_pattern_type == 1:
+                regex_pattern = f"{regex_pattern}$"
+            else:
+                regex_pattern = regex_pattern.replace(r"\*", ".*")
+
+            filters = {"collection_id": pattern.collection_id, "url__regex": regex_pattern}
+            delta_urls = DeltaUrl.objects.filter(**filters).order_by().values("url")
+            curated_urls = CuratedUrl.objects.filter(**filters).order_by().values("url")
+            pattern.url_match_count = delta_urls.union(curated_urls).count()
+            pattern.save(update_fields=["url_match_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sde_collections", "0068_alter_deltadivisionpattern_collection_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="deltadivisionpattern",
+            name="url_match_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of unique Delta and Curated URLs matched, refreshed whenever the pattern is applied",
+            ),
+        ),
+        migrations.AddField(
+            model_name="deltadocumenttypepattern",
+            name="url_match_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of unique Delta and Curated URLs matched, refreshed whenever the pattern is applied",
+            ),
+        ),
+        migrations.AddField(
+            model_name="deltaexcludepattern",
+            name="url_match_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of unique Delta and Curated URLs matched, refreshed whenever the pattern is applied",
+            ),
+        ),
+        migrations.AddField(
+            model_name="deltaincludepattern",
+            name="url_match_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of unique Delta and Curated URLs matched, refreshed whenever the pattern is applied",
+            ),
+        ),
+        migrations.AddField(
+            model_name="deltatitlepattern",
+            name="url_match_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of unique Delta and Curated URLs matched, refreshed whenever the pattern is applied",
+            ),
+        ),
+        migrations.RunPython(backfill_url_match_counts, migrations.RunPython.noop),
+    ]
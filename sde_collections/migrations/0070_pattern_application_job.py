@@ -0,0 +1,56 @@
+# Generated by Django 4.2.9 on 2026-10-18 02:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("sde_collections", "0069_pattern_url_match_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatternApplicationJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("pattern_id", models.PositiveBigIntegerField()),
+                (
+                    "match_pattern",
+                    models.CharField(
+                        help_text="Copied from the pattern, which unapply deletes", verbose_name="Pattern"
+                    ),
+                ),
+                ("action", models.IntegerField(choices=[(1, "Apply"), (2, "Unapply")])),
+                (
+                    "status",
+                    models.IntegerField(
+                        choices=[(1, "Pending"), (2, "Running"), (3, "Succeeded"), (4, "Failed")], default=1
+                    ),
+                ),
+                ("progress", models.PositiveSmallIntegerField(default=0, verbose_name="Progress (%)")),
+                ("error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "collection",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pattern_jobs",
+                        to="sde_collections.collection",
+                    ),
+                ),
+                (
+                    "pattern_type",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="contenttypes.contenttype"),
+                ),
+            ],
+            options={
+                "verbose_name": "Pattern Application Job",
+                "verbose_name_plural": "Pattern Application Jobs",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
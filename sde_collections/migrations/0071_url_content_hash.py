@@ -0,0 +1,87 @@
+# Generated by Django 4.2.9 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+URL_TABLES = ["sde_collections_dumpurl", "sde_collections_deltaurl", "sde_collections_curatedurl"]
+
+# Must match BaseUrl.compute_content_hash: the hashed fields joined by a unit separator, NULL as ""
+CONTENT_HASH_SQL = """
+    md5(
+        COALESCE({row}.scraped_title, '') || chr(31) ||
+        COALESCE({row}.scraped_text, '') || chr(31) ||
+        COALESCE({row}.generated_title, '') || chr(31) ||
+        COALESCE({row}.document_type::text, '') || chr(31) ||
+        COALESCE({row}.division::text, '')
+    )
+"""
+
+CREATE_TRIGGERS = f"""
+    CREATE FUNCTION sde_collections_url_content_hash() RETURNS trigger AS $$
+    BEGIN
+        NEW.content_hash := {CONTENT_HASH_SQL.format(row="NEW")};
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """ + "".join(
+    f"""
+        CREATE TRIGGER {table}_content_hash
+        BEFORE INSERT OR UPDATE OF scraped_title, scraped_text, generated_title, document_type, division, content_hash
+        ON {table} FOR EACH ROW EXECUTE FUNCTION sde_collections_url_content_hash();
+        UPDATE {table} SET content_hash = {CONTENT_HASH_SQL.format(row=table)};
+        """
+    for table in URL_TABLES
+)
+
+DROP_TRIGGERS = "".join(f"DROP TRIGGER {table}_content_hash ON {table};" for table in URL_TABLES) + (
+    "DROP FUNCTION sde_collections_url_content_hash();"
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sde_collections", "0070_pattern_application_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="curatedurl",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="MD5 of the scraped and curated content, maintained by a database trigger on every write",
+                max_length=32,
+                verbose_name="Content Hash",
+            ),
+        ),
+        migrations.AddField(
+            model_name="deltaurl",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="MD5 of the scraped and curated content, maintained by a database trigger on every write",
+                max_length=32,
+                verbose_name="Content Hash",
+            ),
+        ),
+        migrations.AddField(
+            model_name="dumpurl",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="MD5 of the scraped and curated content, maintained by a database trigger on every write",
+                max_length=32,
+                verbose_name="Content Hash",
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,198 @@
+# Generated by Django 4.2.9 on 2026-10-18 03:43
+
+import hashlib
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+URL_TABLES = ["sde_collections_dumpurl", "sde_collections_deltaurl", "sde_collections_curatedurl"]
+BLOB_TABLE = "sde_collections_textblob"
+BATCH_SIZE = 2000
+
+# The content hash now covers the scraped text's blob key instead of the text itself; it must
+# match BaseUrl.compute_content_hash
+CONTENT_HASH_SQL = """
+    md5(
+        COALESCE({row}.scraped_title, '') || chr(31) ||
+        COALESCE({row}.scraped_text_blob_id, '') || chr(31) ||
+        COALESCE({row}.generated_title, '') || chr(31) ||
+        COALESCE({row}.document_type::text, '') || chr(31) ||
+        COALESCE({row}.division::text, '')
+    )
+"""
+
+# The triggers from 0071 list scraped_text among their columns, so they have to go before it does
+DROP_TEXT_TRIGGERS = "".join(f"DROP TRIGGER {table}_content_hash ON {table};" for table in URL_TABLES)
+CREATE_TEXT_TRIGGERS = "".join(
+    f"""
+    CREATE TRIGGER {table}_content_hash
+    BEFORE INSERT OR UPDATE OF scraped_title, scraped_text, generated_title, document_type, division, content_hash
+    ON {table} FOR EACH ROW EXECUTE FUNCTION sde_collections_url_content_hash();
+    """
+    for table in URL_TABLES
+)
+
+# Rewriting the hashes re-checks the foreign keys of rows moved above; checking them immediately
+# keeps them from blocking the index creation at the end of the migration
+CREATE_BLOB_TRIGGERS = (
+    f"""
+    SET CONSTRAINTS ALL IMMEDIATE;
+    CREATE OR REPLACE FUNCTION sde_collections_url_content_hash() RETURNS trigger AS $$
+    BEGIN
+        NEW.content_hash := {CONTENT_HASH_SQL.format(row="NEW")};
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+    + "".join(
+        f"""
+        CREATE TRIGGER {table}_content_hash
+        BEFORE INSERT OR UPDATE OF scraped_title, scraped_text_blob_id, generated_title, document_type, division,
+            content_hash
+        ON {table} FOR EACH ROW EXECUTE FUNCTION sde_collections_url_content_hash();
+        UPDATE {table} SET content_hash = {CONTENT_HASH_SQL.format(row=table)};
+        """
+        for table in URL_TABLES
+    )
+    + "SET CONSTRAINTS ALL DEFERRED;"
+)
+
+# Restores the 0071 function; its triggers are recreated by CREATE_TEXT_TRIGGERS
+DROP_BLOB_TRIGGERS = "".join(f"DROP TRIGGER {table}_content_hash ON {table};" for table in URL_TABLES) + (
+    """
+    CREATE OR REPLACE FUNCTION sde_collections_url_content_hash() RETURNS trigger AS $$
+    BEGIN
+        NEW.content_hash := md5(
+            COALESCE(NEW.scraped_title, '') || chr(31) ||
+            COALESCE(NEW.scraped_text, '') || chr(31) ||
+            COALESCE(NEW.generated_title, '') || chr(31) ||
+            COALESCE(NEW.document_type::text, '') || chr(31) ||
+            COALESCE(NEW.division::text, '')
+        );
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+def move_texts_to_blobs(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        # pending foreign key checks would block the DDL that follows, so check them as rows are updated
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        for table in URL_TABLES:
+            last_id = 0
+            while True:
+                cursor.execute(
+                    f"SELECT id, scraped_text FROM {table} WHERE id > %s AND scraped_text <> '' ORDER BY id LIMIT %s",
+                    [last_id, BATCH_SIZE],
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                blobs = {}
+                keys = []
+                for _, text in rows:
+                    encoded = text.encode()
+                    key = hashlib.sha256(encoded).hexdigest()
+                    if key not in blobs:
+                        blobs[key] = (key, zlib.compress(encoded, 6), len(encoded))
+                    keys.append(key)
+                cursor.executemany(
+                    f"INSERT INTO {BLOB_TABLE} (hash, data, size) VALUES (%s, %s, %s) ON CONFLICT (hash) DO NOTHING",
+                    list(blobs.values()),
+                )
+                cursor.execute(
+                    f"UPDATE {table} SET scraped_text_blob_id = blob.key "
+                    f"FROM unnest(%s::bigint[], %s::varchar[]) AS blob(id, key) WHERE {table}.id = blob.id",
+                    [[row[0] for row in rows], keys],
+                )
+        cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+
+def move_blobs_to_texts(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for table in URL_TABLES:
+            last_id = 0
+            while True:
+                cursor.execute(
+                    f"SELECT url.id, blob.data FROM {table} AS url JOIN {BLOB_TABLE} AS blob "
+                    "ON blob.hash = url.scraped_text_blob_id WHERE url.id > %s ORDER BY url.id LIMIT %s",
+                    [last_id, BATCH_SIZE],
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                cursor.execute(
+                    f"UPDATE {table} SET scraped_text = blob.text "
+                    f"FROM unnest(%s::bigint[], %s::text[]) AS blob(id, text) WHERE {table}.id = blob.id",
+                    [[row[0] for row in rows], [zlib.decompress(row[1]).decode() for row in rows]],
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sde_collections", "0071_url_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TextBlob",
+            fields=[
+                (
+                    "hash",
+                    models.CharField(
+                        editable=False, max_length=64, primary_key=True, serialize=False, verbose_name="Hash"
+                    ),
+                ),
+                (
+                    "data",
+                    models.BinaryField(
+                        help_text="The text, UTF-8 encoded and zlib compressed", verbose_name="Compressed Text"
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveIntegerField(
+                        help_text="Length of the uncompressed text in bytes", verbose_name="Size"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Text Blob",
+                "verbose_name_plural": "Text Blobs",
+            },
+        ),
+        *(
+            migrations.AddField(
+                model_name=model_name,
+                name="scraped_text_blob",
+                field=models.ForeignKey(
+                    blank=True,
+                    help_text="This is the text scraped by Sinequa; empty texts have no blob",
+                    null=True,
+                    on_delete=django.db.models.deletion.PROTECT,
+                    related_name="+",
+                    to="sde_collections.textblob",
+                    verbose_name="Scraped Text",
+                ),
+            )
+            for model_name in ["curatedurl", "deltaurl", "dumpurl"]
+        ),
+        migrations.RunPython(move_texts_to_blobs, move_blobs_to_texts),
+        migrations.RunSQL(DROP_TEXT_TRIGGERS, CREATE_TEXT_TRIGGERS),
+        *(
+            migrations.RemoveField(
+                model_name=model_name,
+                name="scraped_text",
+            )
+            for model_name in ["curatedurl", "deltaurl", "dumpurl"]
+        ),
+        migrations.RunSQL(CREATE_BLOB_TRIGGERS, DROP_BLOB_TRIGGERS),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 4.2.9 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+# (URL table, its column in the pattern membership tables, the membership tables' suffix)
+URL_TABLES = [
+    ("sde_collections_deltaurl", "deltaurl_id", "delta_urls"),
+    ("sde_collections_curatedurl", "curatedurl_id", "curated_urls"),
+]
+
+# Must match the exclusion rule the API used to compute per query: include patterns win over exclude patterns
+EXCLUDED_SQL = """
+    (
+        EXISTS (SELECT 1 FROM sde_collections_deltaexcludepattern_{suffix} AS e WHERE e.{column} = {row}.id)
+        AND NOT EXISTS (SELECT 1 FROM sde_collections_deltaincludepattern_{suffix} AS i WHERE i.{column} = {row}.id)
+    )
+"""
+
+
+def create_triggers(table, column, suffix):
+    excluded = EXCLUDED_SQL.format(suffix=suffix, column=column, row="url")
+    sql = f"""
+        CREATE FUNCTION {table}_refresh_excluded() RETURNS trigger AS $$
+        BEGIN
+            UPDATE {table} AS url SET excluded = {excluded}
+            WHERE url.id IN (SELECT {column} FROM changed_memberships)
+            AND url.excluded IS DISTINCT FROM {excluded};
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        -- the set-based migration and COPY loader insert URLs without naming this column
+        ALTER TABLE {table} ALTER COLUMN excluded SET DEFAULT false;
+        UPDATE {table} AS url SET excluded = true WHERE {excluded};
+        """
+    for pattern in ["exclude", "include"]:
+        membership_table = f"sde_collections_delta{pattern}pattern_{suffix}"
+        for event, transition in [("insert", "NEW"), ("delete", "OLD")]:
+            sql += f"""
+                CREATE TRIGGER {suffix}_{pattern}_{event}_excluded
+                AFTER {event.upper()} ON {membership_table} REFERENCING {transition} TABLE AS changed_memberships
+                FOR EACH STATEMENT EXECUTE FUNCTION {table}_refresh_excluded();
+                """
+    return sql
+
+
+def drop_triggers(table, column, suffix):
+    sql = ""
+    for pattern in ["exclude", "include"]:
+        for event in ["insert", "delete"]:
+            sql += (
+                f"DROP TRIGGER {suffix}_{pattern}_{event}_excluded ON sde_collections_delta{pattern}pattern_{suffix};"
+            )
+    return sql + f"DROP FUNCTION {table}_refresh_excluded();"
+
+
+CREATE_TRIGGERS = "".join(create_triggers(*url_table) for url_table in URL_TABLES)
+DROP_TRIGGERS = "".join(drop_triggers(*url_table) for url_table in URL_TABLES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sde_collections", "0072_scraped_text_blobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="curatedurl",
+            name="excluded",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Matched by an exclude pattern and no include pattern, maintained by a database trigger",
+            ),
+        ),
+        migrations.AddField(
+            model_name="deltaurl",
+            name="excluded",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Matched by an exclude pattern and no include pattern, maintained by a database trigger",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="curatedurl",
+            index=models.Index(
+                condition=models.Q(("excluded", False)), fields=["collection", "url"], name="curatedurl_included_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="deltaurl",
+            index=models.Index(
+                condition=models.Q(("excluded", False)), fields=["collection", "url"], name="deltaurl_included_idx"
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
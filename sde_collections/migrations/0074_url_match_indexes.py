@@ -0,0 +1,41 @@
+# Generated by Django 4.2.9 on 2026-10-18 04:08
+
+from django.db import migrations, models
+
+URL_TABLES = ["sde_collections_deltaurl", "sde_collections_curatedurl", "sde_collections_candidateurl"]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Index the url columns for the regexes of patterns that can match anywhere in a URL. pg_trgm
+    ships with Postgres' contrib modules but not every server installs them; without it those
+    patterns keep scanning, so the indexes are skipped rather than failing the migration.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in URL_TABLES:
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {table}_url_trgm ON {table} USING gin (url gin_trgm_ops)")
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    for table in URL_TABLES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_url_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sde_collections", "0073_materialized_excluded"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="candidateurl",
+            index=models.Index(fields=["url"], name="candidateurl_url_like_idx", opclasses=["varchar_pattern_ops"]),
+        ),
+        # not part of the models' Meta, since whether they exist depends on the server
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
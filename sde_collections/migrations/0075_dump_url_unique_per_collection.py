@@ -0,0 +1,22 @@
+# Generated by Django 4.2.9 on 2026-10-18 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sde_collections", "0074_url_match_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dumpurl",
+            name="url",
+            field=models.CharField(verbose_name="Url"),
+        ),
+        migrations.AlterUniqueTogether(
+            name="dumpurl",
+            unique_together={("collection", "url")},
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 4.2.9 on 2026-10-18 04:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# field patterns, with the field they set and the SQL for the value their unapply clears it to
+FIELD_PATTERNS = {
+    "deltadocumenttypepattern": ("document_type", "NULL"),
+    "deltadivisionpattern": ("division", "NULL"),
+    "deltatitlepattern": ("generated_title", "to_jsonb(''::text)"),
+}
+INCLUSION_PATTERNS = ["deltaexcludepattern", "deltaincludepattern"]
+
+
+def journal_existing_applications(apps, schema_editor):
+    """
+    Journal the patterns applied before there was a journal so their unapply keeps working. Each
+    DeltaUrl a field pattern matches gets the value unapply restores: its CuratedUrl's value, or
+    the cleared value without one. Each DeltaUrl an inclusion pattern matches is journaled without
+    a value, so unapply still deletes any of them left identical to their CuratedUrl.
+    """
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
+    CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
+    PatternJournalEntry = apps.get_model("sde_collections", "PatternJournalEntry")
+
+    for model_name in [*FIELD_PATTERNS, *INCLUSION_PATTERNS]:
+        model = apps.get_model("sde_collections", model_name)
+        through = model.delta_urls.through
+        if not through.objects.exists():
+            continue
+        pattern_type, _ = ContentType.objects.get_or_create(app_label="sde_collections", model=model_name)
+        m2m_field = model._meta.get_field("delta_urls")
+        pattern_column, url_column = m2m_field.m2m_column_name(), m2m_field.m2m_reverse_name()
+
+        if model_name in FIELD_PATTERNS:
+            field, cleared_value = FIELD_PATTERNS[model_name]
+            restore_value = f"CASE WHEN curated.id IS NULL THEN {cleared_value} ELSE to_jsonb(curated.{field}) END"
+        else:
+            restore_value = "NULL"
+
+        schema_editor.execute(
+            f"INSERT INTO {PatternJournalEntry._meta.db_table} "
+            "(pattern_type_id, pattern_id, delta_url_id, restore_value) "
+            f"SELECT %s, membership.{pattern_column}, membership.{url_column}, {restore_value} "
+            f"FROM {through._meta.db_table} membership "
+            f"JOIN {DeltaUrl._meta.db_table} delta ON delta.id = membership.{url_column} "
+            f"LEFT JOIN {CuratedUrl._meta.db_table} curated "
+            "ON curated.collection_id = delta.collection_id AND curated.url = delta.url "
+            "ON CONFLICT DO NOTHING",
+            [pattern_type.id],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("sde_collections", "0075_dump_url_unique_per_collection"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatternJournalEntry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("pattern_id", models.PositiveBigIntegerField()),
+                (
+                    "restore_value",
+                    models.JSONField(
+                        blank=True,
+                        help_text="The value unapply() sets the pattern's field back to: its CuratedUrl's value, "
+                        "or the cleared value without one",
+                        null=True,
+                    ),
+                ),
+                (
+                    "delta_url",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pattern_journal_entries",
+                        to="sde_collections.deltaurl",
+                    ),
+                ),
+                (
+                    "pattern_type",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="contenttypes.contenttype"),
+                ),
+            ],
+            options={
+                "verbose_name": "Pattern Journal Entry",
+                "verbose_name_plural": "Pattern Journal Entries",
+                "unique_together": {("pattern_type", "pattern_id", "delta_url")},
+            },
+        ),
+        migrations.RunPython(journal_existing_applications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-18 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sde_collections", "0076_pattern_journal"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="patternapplicationjob",
+            name="action",
+            field=models.IntegerField(choices=[(1, "Apply"), (2, "Unapply"), (3, "Reapply")]),
+        ),
+    ]
@@ -93,6 +93,10 @@ class CandidateURL(models.Model):
         verbose_name = "Candidate URL"
         verbose_name_plural = "Candidate URLs"
         ordering = ["url"]
+        indexes = [
+            # serves the exact and prefix matches of patterns, like the index Django adds to unique url columns
+            models.Index(fields=["url"], name="candidateurl_url_like_idx", opclasses=["varchar_pattern_ops"])
+        ]
 
     @property
     def fileext(self) -> str:
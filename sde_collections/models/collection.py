@@ -1,11 +1,14 @@
+import itertools
 import json
 import urllib.parse
+from typing import cast
 
 import requests
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models.functions import Collate
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from model_utils import FieldTracker
 from slugify import slugify
@@ -13,6 +16,9 @@ from slugify import slugify
 from config_generation.db_to_xml import XmlEditor
 
 from ..utils.github_helper import GitHubHandler
+from ..utils.merge_join import left_merge_join
+from ..utils.partitioning import clear_collection, drop_collection_partition
+from ..utils.pattern_engine import PatternMatchIndex
 from ..utils.slack_utils import (
     STATUS_CHANGE_NOTIFICATIONS,
     format_slack_message,
@@ -27,11 +33,33 @@ from .collection_choice_fields import (
     UpdateFrequencies,
     WorkflowStatusChoices,
 )
+from .delta_patterns import (
+    BaseMatchPattern,
+    DeltaDivisionPattern,
+    DeltaDocumentTypePattern,
+    DeltaExcludePattern,
+    DeltaIncludePattern,
+    DeltaTitlePattern,
+)
 from .delta_url import CuratedUrl, DeltaUrl, DumpUrl
 
 User = get_user_model()
 DELTA_COMPARISON_FIELDS = ["scraped_title"]  # Add more fields as needed
 
+# Fields copied from a DeltaUrl onto its CuratedUrl by promote_to_curated; content_hash and
+# excluded are maintained by the database
+PROMOTED_FIELDS = [
+    field.name
+    for field in DeltaUrl._meta.fields
+    if field.name not in ["id", "collection", "to_delete", "content_hash", "excluded"]
+]
+PROMOTION_CHUNK_SIZE = 2000
+
+
+def _column_name(model: type[models.Model], field_name: str) -> str:
+    """The database column of one of the model's concrete fields."""
+    return cast(models.Field, model._meta.get_field(field_name)).column
+
 
 class Collection(models.Model):
     """Model definition for Collection."""
@@ -87,16 +115,37 @@ class Collection(models.Model):
         verbose_name_plural = "Collections"
 
     def clear_delta_urls(self):
-        """Clears all DeltaUrls for this collection."""
-        DeltaUrl.objects.filter(collection=self).delete()
+        """
+        Clears all DeltaUrls for this collection. The rows referencing them are deleted first with
+        one statement each, so the DeltaUrls can be deleted without collecting their ids in memory.
+        """
+        for relation in DeltaUrl._meta.get_fields():
+            if isinstance(relation, models.ManyToManyRel):
+                model = cast(type[models.Model], relation.through)
+                field_name = relation.field.m2m_reverse_field_name()
+            elif isinstance(relation, models.ForeignObjectRel):
+                model = cast(type[models.Model], relation.related_model)
+                field_name = relation.field.name
+            else:
+                continue
+            model._base_manager.filter(**{f"{field_name}__collection": self}).delete()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {DeltaUrl._meta.db_table} WHERE collection_id = %s", [self.id])
 
     def clear_dump_urls(self):
-        """Clears all DumpUrls for this collection."""
-        DumpUrl.objects.filter(collection=self).delete()
+        """
+        Clears all DumpUrls for this collection. When the DumpUrl table is partitioned by
+        collection (see `manage.py partition_dump_urls`) this truncates the collection's partition.
+        """
+        clear_collection(DumpUrl, self)
 
-    def refresh_url_lists_for_all_patterns(self):
+    def refresh_url_lists_for_all_patterns(self) -> dict[str, int]:
         """
         Updates pattern relations for all patterns associated with this collection.
+
+        Memberships are diffed in SQL, one pair of statements per pattern type and URL table,
+        inside a single transaction. Returns the number of membership rows added and removed.
         """
         # List of pattern models to update
         pattern_models = [
@@ -107,53 +156,174 @@ class Collection(models.Model):
             "DeltaDivisionPattern",
         ]
 
-        # Loop through each model and update its relations
-        for model_name in pattern_models:
-            # Get the model dynamically
-            model = ContentType.objects.get(app_label="sde_collections", model=model_name.lower()).model_class()
-
-            # Filter patterns for the current collection and update relations
-            for pattern in model.objects.filter(collection=self):
-                pattern.update_affected_delta_urls_list()
-                pattern.update_affected_curated_urls_list()
-
-    def migrate_dump_to_delta(self):
+        totals = {"added": 0, "removed": 0}
+        with transaction.atomic():
+            # Loop through each model and update its relations
+            for model_name in pattern_models:
+                # Get the model dynamically
+                model = cast(
+                    type[BaseMatchPattern],
+                    ContentType.objects.get(app_label="sde_collections", model=model_name.lower()).model_class(),
+                )
+
+                # Filter patterns for the current collection and update relations
+                patterns = list(model._default_manager.filter(collection=self))
+                for field_name in ["delta_urls", "curated_urls"]:
+                    added, removed = model.sync_url_memberships(field_name, patterns)
+                    totals["added"] += added
+                    totals["removed"] += removed
+
+                for pattern in patterns:
+                    pattern.refresh_url_match_count()
+
+        return totals
+
+    def migrate_dump_to_delta(self, incremental: bool = True):
         """
         Migrates data from DumpUrls to DeltaUrls, preserving all fields.
         Creates DeltaUrls that reflect:
         1. Changes from DumpUrls vs CuratedUrls
         2. Missing URLs in DumpUrls that exist in CuratedUrls (marked for deletion)
+
+        The comparison runs in the database: a FULL OUTER JOIN of the collection's DumpUrls and
+        CuratedUrls is upserted into DeltaUrls with a single INSERT ... SELECT, so no URL or
+        scraped text is loaded into Python.
+
+        In incremental mode (the default) only the URLs this migration touches are run through
+        the collection's patterns. DeltaUrls that patterns created from still-current CuratedUrls
+        are kept, other leftover DeltaUrls are removed and their CuratedUrls re-evaluated.
+        With incremental=False all DeltaUrls are cleared and every pattern is re-applied.
         """
-        # Step 1: Clear existing DeltaUrls for this collection
-        self.clear_delta_urls()
+        with transaction.atomic():
+            # DumpUrls are usually bulk loaded just before this, so refresh the planner's statistics
+            # to keep it from choosing nested loops for the join
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {DumpUrl._meta.db_table}")
+
+            # Step 1: Clear existing DeltaUrls for this collection, or drop the stale ones in incremental mode
+            if incremental:
+                stale_deltas = self._find_stale_deltas()
+                DeltaUrl.objects.filter(id__in=[delta_id for delta_id, _, _ in stale_deltas]).delete()
+            else:
+                self.clear_delta_urls()
 
-        # Step 2: Fetch all current DumpUrls and CuratedUrls for this collection
-        dump_urls = {url.url: url for url in DumpUrl.objects.filter(collection=self)}
-        curated_urls = {url.url: url for url in CuratedUrl.objects.filter(collection=self)}
+            # Step 2: Upsert new, changed and to_delete DeltaUrls from the DumpUrl/CuratedUrl join
+            migrated_deltas = self._upsert_deltas_from_dump()
 
-        # Step 3: Process each URL in DumpUrls to migrate as needed
-        for url, dump in dump_urls.items():
-            curated = curated_urls.get(url)
+            # Step 3: Clear DumpUrls after migration is complete
+            self.clear_dump_urls()
 
-            if curated:
-                # Check if any of the comparison fields differ
-                if any(getattr(curated, field) != getattr(dump, field) for field in DELTA_COMPARISON_FIELDS):
-                    self.create_or_update_delta_url(dump, to_delete=False)
-            else:
-                # New URL, not in CuratedUrls; move it entirely to DeltaUrls
-                self.create_or_update_delta_url(dump, to_delete=False)
+        # Step 4: Apply all patterns to DeltaUrls
+        if not incremental:
+            self.apply_all_patterns()
+            return
 
-        # Step 4: Identify CuratedUrls missing in DumpUrls and flag them for deletion in DeltaUrls
-        for curated in curated_urls.values():
-            if curated.url not in dump_urls:
-                self.create_or_update_delta_url(curated, to_delete=True)
+        # Step 4a: Apply patterns to the migrated DeltaUrls and the CuratedUrls behind removed deltas
+        match_index = PatternMatchIndex.for_collection(
+            self,
+            delta_ids=[delta_id for delta_id, _, _ in migrated_deltas],
+            curated_ids=[curated_id for _, _, curated_id in stale_deltas if curated_id is not None],
+        )
+        match_index.adjust_match_counts(
+            added_urls=[url for _, url, is_new in migrated_deltas if is_new],
+            removed_urls=[url for _, url, curated_id in stale_deltas if curated_id is None],
+        )
+        self.apply_all_patterns(match_index=match_index)
 
-        # Step 5: Clear DumpUrls after migration is complete
-        self.clear_dump_urls()
+    def _migration_source_sql(self) -> tuple[str, list, list[str]]:
+        """
+        SQL selecting the DeltaUrls a migration produces, one row per URL: DumpUrls that are new or
+        differ from their CuratedUrl in DELTA_COMPARISON_FIELDS, and CuratedUrls missing from the
+        dump with to_delete set. `curated_id` is NULL for URLs that are not curated yet.
+        """
+        columns = [field.column for field in DumpUrl._meta.fields if field.name not in ["id", "collection"]]
+        copied = ", ".join(
+            f"CASE WHEN dump.id IS NULL THEN curated.{column} ELSE dump.{column} END AS {column}" for column in columns
+        )
+        changed = " OR ".join(
+            f"dump.{_column_name(DumpUrl, field)} IS DISTINCT FROM curated.{_column_name(CuratedUrl, field)}"
+            for field in DELTA_COMPARISON_FIELDS
+        )
+        sql = f"""
+            SELECT {copied}, dump.id IS NULL AS to_delete, curated.id AS curated_id
+            FROM (SELECT * FROM {DumpUrl._meta.db_table} WHERE collection_id = %s) AS dump
+            FULL OUTER JOIN (SELECT * FROM {CuratedUrl._meta.db_table} WHERE collection_id = %s) AS curated
+                ON curated.url = dump.url
+            WHERE dump.id IS NULL OR curated.id IS NULL OR {changed}
+        """
+        return sql, [self.id, self.id], columns
 
-        # Step 6: Apply all patterns to DeltaUrls
-        # self.refresh_url_lists_for_all_patterns() # TODO: I'm pretty confident we shouldn't be running this
-        self.apply_all_patterns()
+    def _find_stale_deltas(self) -> list[tuple[int, str, int | None]]:
+        """
+        (id, url, curated id) of the DeltaUrls a migration would leave behind: those the migration
+        does not produce, unless a pattern created them from their unchanged CuratedUrl.
+        """
+        source_sql, params, _ = self._migration_source_sql()
+        unchanged = " AND ".join(
+            f"curated.{_column_name(CuratedUrl, field)} IS NOT DISTINCT FROM delta.{_column_name(DeltaUrl, field)}"
+            for field in DELTA_COMPARISON_FIELDS
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH source AS ({source_sql})
+                SELECT delta.id, delta.url, curated.id
+                FROM {DeltaUrl._meta.db_table} AS delta
+                LEFT JOIN {CuratedUrl._meta.db_table} AS curated
+                    ON curated.collection_id = delta.collection_id AND curated.url = delta.url
+                WHERE delta.collection_id = %s
+                  AND NOT EXISTS (SELECT 1 FROM source WHERE source.url = delta.url)
+                  AND (delta.to_delete OR curated.id IS NULL OR NOT ({unchanged}))
+                """,
+                params + [self.id],
+            )
+            return cursor.fetchall()
+
+    def _upsert_deltas_from_dump(self) -> list[tuple[int, str, bool]]:
+        """
+        Insert or update the DeltaUrls of this migration in one statement. Returns (id, url, is_new)
+        for each, where is_new marks URLs that were in neither the curated nor the delta table.
+
+        DumpUrls are only unique within their collection, while a DeltaUrl's url is unique across
+        collections, so an IntegrityError is raised if another collection already has a DeltaUrl
+        for one of the URLs, rather than leaving that URL out.
+        """
+        source_sql, params, columns = self._migration_source_sql()
+        column_list = ", ".join(columns)
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns + ["to_delete"])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH source AS ({source_sql})
+                SELECT COUNT(*), MIN(source.url)
+                FROM source JOIN {DeltaUrl._meta.db_table} AS delta ON delta.url = source.url
+                WHERE delta.collection_id <> %s
+                """,
+                params + [self.id],
+            )
+            held_elsewhere, example_url = cursor.fetchone()
+            if held_elsewhere:
+                raise IntegrityError(
+                    f"{held_elsewhere} URLs of {self.name} already have Delta URLs in other collections,"
+                    f" e.g. {example_url}"
+                )
+
+            cursor.execute(
+                f"""
+                WITH source AS ({source_sql}),
+                upserted AS (
+                    INSERT INTO {DeltaUrl._meta.db_table} (collection_id, {column_list}, to_delete)
+                    SELECT %s, {column_list}, to_delete FROM source
+                    ON CONFLICT (url) DO UPDATE SET {updates}
+                    WHERE {DeltaUrl._meta.db_table}.collection_id = EXCLUDED.collection_id
+                    RETURNING id, url, xmax = 0 AS inserted
+                )
+                SELECT upserted.id, upserted.url, upserted.inserted AND source.curated_id IS NULL
+                FROM upserted JOIN source ON source.url = upserted.url
+                """,
+                params + [self.id],
+            )
+            return cursor.fetchall()
 
     def create_or_update_delta_url(self, url_instance, to_delete=False):
         """
@@ -165,64 +335,124 @@ class Collection(models.Model):
             to_delete: Whether to mark the resulting DeltaUrl for deletion
         """
         # Get all copyable fields from the source instance
-        fields_to_copy = {
-            field.name: getattr(url_instance, field.name)
-            for field in url_instance._meta.fields
-            if field.name not in ["id", "collection"]
-        }
+        fields_to_copy = url_instance.fields_to_copy()
 
         # Set deletion status
         fields_to_copy["to_delete"] = to_delete
 
         # Update or create the DeltaUrl
-        DeltaUrl.objects.update_or_create(collection=self, url=url_instance.url, defaults=fields_to_copy)
+        delta_url, _ = DeltaUrl.objects.update_or_create(collection=self, url=url_instance.url, defaults=fields_to_copy)
+        return delta_url
 
     def promote_to_curated(self):
         """
         Promotes all DeltaUrls in this collection to CuratedUrls.
         Updates, adds, or removes CuratedUrls as necessary to match the latest DeltaUrls.
+
+        The ids and content hashes of DeltaUrls and CuratedUrls are streamed in url order and
+        merge-joined, and each batch is written with one set-based delete, update and insert, all
+        in one transaction. Pattern memberships are then diffed against the patterns' matches
+        over the promoted CuratedUrls, in one pass over the collection's URLs.
         """
-        # Step 1: Fetch all current DeltaUrls and CuratedUrls for this collection
-        delta_urls = {url.url: url for url in DeltaUrl.objects.filter(collection=self)}
-        curated_urls = {url.url: url for url in CuratedUrl.objects.filter(collection=self)}
+        pattern_models = [
+            DeltaExcludePattern,
+            DeltaIncludePattern,
+            DeltaTitlePattern,
+            DeltaDocumentTypePattern,
+            DeltaDivisionPattern,
+        ]
 
-        # Step 2: Process each DeltaUrl to update or create the corresponding CuratedUrl
-        for url, delta in delta_urls.items():
-            curated = curated_urls.get(url)
+        with transaction.atomic():
+            # Step 1: Update, create or delete the CuratedUrl for each DeltaUrl, a batch at a time.
+            # Only keys and content hashes are streamed, in url order, and merge-joined, so memory doesn't
+            # grow with the collection; the content itself is copied from table to table in SQL
+            by_url = Collate("url", "C")
+            deltas = (
+                DeltaUrl._base_manager.filter(collection=self)
+                .order_by(by_url)
+                .values_list("id", "url", "to_delete", "content_hash", "visited")
+            )
+            curated_urls = (
+                CuratedUrl._base_manager.filter(collection=self)
+                .order_by(by_url)
+                .values_list("id", "url", "content_hash", "visited")
+            )
+            pairs = left_merge_join(
+                deltas.iterator(chunk_size=PROMOTION_CHUNK_SIZE),
+                curated_urls.iterator(chunk_size=PROMOTION_CHUNK_SIZE),
+                key=lambda row: row[1],
+            )
+            while batch := list(itertools.islice(pairs, PROMOTION_CHUNK_SIZE)):
+                self._promote_delta_batch(batch)
+
+            # Step 2: Clear all DeltaUrls for this collection since they've been promoted
+            self.clear_delta_urls()
+
+            # Step 3: Every matched URL is now curated. Match the CuratedUrls against all patterns in
+            # one pass, then add and remove curated memberships by id and refresh the match counts
+            match_index = PatternMatchIndex.for_collection(self)
+            for model in pattern_models:
+                patterns = [pattern for pattern in match_index.patterns if type(pattern) is model]
+                model.sync_url_memberships("curated_urls", patterns, match_index)
+                for pattern in patterns:
+                    if pattern.url_match_count != match_index.get_match_count(pattern):
+                        pattern.url_match_count = match_index.get_match_count(pattern)
+                        model._default_manager.filter(pk=pattern.pk).update(url_match_count=pattern.url_match_count)
+
+    def _promote_delta_batch(self, pairs: list[tuple[tuple, tuple | None]]) -> None:
+        """
+        Apply a batch of DeltaUrls, each an (id, url, to_delete, content_hash, visited) row paired
+        with its CuratedUrl's (id, url, content_hash, visited) or None, with one DELETE, UPDATE and
+        INSERT. Empty and NULL DeltaUrl fields leave the CuratedUrl's value, or the default, in place.
+        """
+        curated_ids_to_delete = []
+        delta_ids_to_update = []
+        delta_ids_to_create = []
 
+        for (delta_id, _, to_delete, content_hash, visited), curated in pairs:
             # Delete the CuratedUrl if the DeltaUrl is marked for deletion
-            if delta.to_delete:
+            if to_delete:
                 if curated:
-                    curated.delete()
-                continue
-
-            if curated:
-                updated_fields = {}
-                for field in delta._meta.fields:
-                    field_name = field.name
-                    if field_name == "to_delete":
-                        continue
-
-                    delta_value = getattr(delta, field_name)
-                    if delta_value not in [None, ""] and getattr(curated, field_name) != delta_value:
-                        updated_fields[field_name] = delta_value
-
-                if updated_fields:
-                    CuratedUrl.objects.filter(pk=curated.pk).update(**updated_fields)
-            else:
-                # If no matching CuratedUrl, create a new one using all non-null and non-empty fields
-                new_data = {
-                    field.name: getattr(delta, field.name)
-                    for field in delta._meta.fields
-                    if field.name not in ["to_delete", "collection"] and getattr(delta, field.name) not in [None, ""]
-                }
-                CuratedUrl.objects.create(collection=self, **new_data)
-
-        # Step 3: Clear all DeltaUrls for this collection since they've been promoted
-        DeltaUrl.objects.filter(collection=self).delete()
-
-        # Step 4: Reapply patterns to DeltaUrls
-        self.refresh_url_lists_for_all_patterns()
+                    curated_ids_to_delete.append(curated[0])
+            elif curated is None:
+                delta_ids_to_create.append(delta_id)
+            # Nothing to promote if the content is unchanged
+            elif (content_hash, visited) != curated[2:]:
+                delta_ids_to_update.append(delta_id)
+
+        fields = [field for field in DeltaUrl._meta.fields if field.name in PROMOTED_FIELDS]
+
+        def promoted_value(field, fallback):
+            if isinstance(field, (models.CharField, models.TextField)):
+                return f"COALESCE(NULLIF(delta.{field.column}, ''), {fallback})"
+            return f"COALESCE(delta.{field.column}, {fallback})"
+
+        with connection.cursor() as cursor:
+            if curated_ids_to_delete:
+                CuratedUrl._base_manager.filter(id__in=curated_ids_to_delete).only("id").delete()
+            if delta_ids_to_update:
+                assignments = ", ".join(
+                    f"{field.column} = {promoted_value(field, f'curated.{field.column}')}" for field in fields
+                )
+                cursor.execute(
+                    f"UPDATE {CuratedUrl._meta.db_table} AS curated SET {assignments} "
+                    f"FROM {DeltaUrl._meta.db_table} AS delta "
+                    "WHERE delta.id = ANY(%s) AND curated.url = delta.url",
+                    [delta_ids_to_update],
+                )
+            if delta_ids_to_create:
+                # content_hash is filled in by the trigger
+                columns = ", ".join(["collection_id", "content_hash", *(field.column for field in fields)])
+                values = ", ".join(promoted_value(field, "%s") for field in fields)
+                cursor.execute(
+                    f"INSERT INTO {CuratedUrl._meta.db_table} ({columns}) "
+                    f"SELECT %s, '', {values} FROM {DeltaUrl._meta.db_table} AS delta WHERE delta.id = ANY(%s)",
+                    [
+                        self.id,
+                        *(field.get_db_prep_save(field.get_default(), connection) for field in fields),
+                        delta_ids_to_create,
+                    ],
+                )
 
     def add_to_public_query(self):
         """Add the collection to the public query."""
@@ -609,23 +839,27 @@ class Collection(models.Model):
 
         self.save()
 
-    def apply_all_patterns(self):
-        """Apply all the patterns with debug information."""
-
-        for pattern in self.deltaexcludepatterns.all():
-            pattern.apply()
-
-        for pattern in self.deltaincludepatterns.all():
-            pattern.apply()
+    def apply_all_patterns(self, match_index: PatternMatchIndex | None = None):
+        """
+        Apply all the patterns of this collection.
 
-        for pattern in self.deltatitlepatterns.all():
-            pattern.apply()
+        Every pattern is compiled into a single PatternMatchIndex and the collection's URLs are
+        matched against it in one pass, so patterns read their matches from the index instead of
+        each running its own regex scan. Patterns are applied in the order exclude, include,
+        title, document type, division.
 
-        for pattern in self.deltadocumenttypepatterns.all():
-            pattern.apply()
+        Pass a partial index (see PatternMatchIndex.for_collection) to only apply the patterns
+        to a subset of the collection's URLs.
+        """
+        if match_index is None:
+            match_index = PatternMatchIndex.for_collection(self)
 
-        for pattern in self.deltadivisionpatterns.all():
-            pattern.apply()
+        for pattern in match_index.patterns:
+            pattern._match_index = match_index
+            try:
+                pattern.apply()
+            finally:
+                pattern._match_index = None
 
     def save(self, *args, **kwargs):
         # Call the function to generate the value for the generated_field based on the original_field
@@ -724,6 +958,11 @@ class WorkflowHistory(models.Model):
         return color_choices[self.workflow_status]
 
 
+@receiver(post_delete, sender=Collection)
+def drop_dump_url_partition(sender, instance, **kwargs):
+    drop_collection_partition(DumpUrl, instance.pk)
+
+
 @receiver(post_save, sender=Collection)
 def log_workflow_history(sender, instance, created, **kwargs):
     if instance.workflow_status != instance.old_workflow_status:
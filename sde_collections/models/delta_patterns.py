@@ -1,18 +1,29 @@
-import re
-from typing import Any
+import itertools
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, cast
 
 from django.apps import apps
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models, transaction
+from django.utils import timezone
 
+from ..utils.page_fetcher import PageFetcher
 from ..utils.title_resolver import (
     is_valid_fstring,
     is_valid_xpath,
     parse_title,
     resolve_title,
+    resolve_titles,
 )
+from ..utils.url_match import match_pattern_filter, match_pattern_regex
 from .collection_choice_fields import Divisions, DocumentTypes
 
+# URLs whose resolved titles are written together by DeltaTitlePattern.apply
+TITLE_BATCH_SIZE = 1000
+# rows per INSERT or UPDATE when apply and unapply write URLs in bulk
+BULK_WRITE_BATCH_SIZE = 1000
+
 
 class BaseMatchPattern(models.Model):
     """Base class for all delta patterns."""
@@ -31,6 +42,11 @@ class BaseMatchPattern(models.Model):
         "Pattern", help_text="This pattern is compared against the URL of all documents in the collection"
     )
     match_pattern_type = models.IntegerField(choices=MatchPatternTypeChoices.choices, default=1)
+    url_match_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of unique Delta and Curated URLs matched, refreshed whenever the pattern is applied",
+    )
     delta_urls = models.ManyToManyField(
         "DeltaUrl",
         related_name="%(class)ss",  # Makes delta_url.deltaincludepatterns.all()
@@ -40,64 +56,337 @@ class BaseMatchPattern(models.Model):
         related_name="%(class)ss",  # Makes curated_url.deltaincludepatterns.all()
     )
 
-    def get_url_match_count(self):
+    # Set by Collection.apply_all_patterns so matches come from a precomputed PatternMatchIndex
+    _match_index = None
+
+    # Set by PatternApplicationJob.run so apply()/unapply() can report their progress
+    _progress_callback: Callable[[int], None] | None = None
+
+    def report_progress(self, percent: int) -> None:
+        if self._progress_callback is not None:
+            self._progress_callback(percent)
+
+    def track_progress(self, items, start: int, end: int):
+        """
+        Iterate over `items`, reporting progress from `start` to `end` percent as it goes.
+        Only counts the items when a job is listening for progress.
+        """
+        if self._progress_callback is None:
+            yield from items
+            return
+
+        total = len(items) if isinstance(items, list) else items.count()
+        step = max(total // 20, 1)
+        for position, item in enumerate(items, start=1):
+            yield item
+            if position % step == 0:
+                self.report_progress(start + (end - start) * position // total)
+        self.report_progress(end)
+
+    def get_url_match_count(self) -> int:
         """
         Get the number of unique URLs this pattern matches across both delta and curated URLs.
         """
-        delta_urls = set(self.get_matching_delta_urls().values_list("url", flat=True))
-        curated_urls = set(self.get_matching_curated_urls().values_list("url", flat=True))
-        return len(delta_urls.union(curated_urls))
+        if self._match_index is not None:
+            return self._match_index.get_match_count(self)
+        delta_urls = self.get_matching_delta_urls().order_by().values("url")
+        curated_urls = self.get_matching_curated_urls().order_by().values("url")
+        return delta_urls.union(curated_urls).count()
+
+    def refresh_url_match_count(self) -> int:
+        """Recount this pattern's matches and persist them to url_match_count."""
+        self.url_match_count = self.get_url_match_count()
+        type(self).objects.filter(pk=self.pk).update(url_match_count=self.url_match_count)
+        return self.url_match_count
+
+    @classmethod
+    def refresh_url_match_counts(cls, patterns: list) -> None:
+        """
+        Recount the matches of several patterns of one collection in a single query, with the
+        regexes evaluated by the database, and persist the counts that changed.
+        """
+        if not patterns:
+            return
+        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
+        CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
 
-    def is_most_distinctive_pattern(self, url) -> bool:
+        collection_id = patterns[0].collection_id
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pattern.id, (SELECT count(*) FROM ("
+                f"SELECT url FROM {DeltaUrl._meta.db_table} WHERE collection_id = %s AND url ~ pattern.regex "
+                f"UNION SELECT url FROM {CuratedUrl._meta.db_table} WHERE collection_id = %s AND url ~ pattern.regex"
+                ") AS matched) FROM unnest(%s::bigint[], %s::text[]) AS pattern(id, regex)",
+                [
+                    collection_id,
+                    collection_id,
+                    [pattern.id for pattern in patterns],
+                    [pattern.get_regex_pattern() for pattern in patterns],
+                ],
+            )
+            counts = dict(cursor.fetchall())
+
+        changed = [pattern for pattern in patterns if pattern.url_match_count != counts[pattern.id]]
+        for pattern in changed:
+            pattern.url_match_count = counts[pattern.id]
+        cls._default_manager.bulk_update(changed, ["url_match_count"])
+
+    def get_dominated_urls(self) -> set[str]:
         """
-        Determine if this pattern should apply to a URL by checking if it matches
-        the smallest number of URLs among all patterns that match this URL.
-        Returns True if this pattern should be applied.
+        Get the URLs on which another pattern of the same type matches fewer URLs than this one,
+        and therefore takes precedence. The competing patterns that share URLs with this one are
+        recounted together in one query, since their persisted url_match_count goes stale when
+        URLs are added or removed without applying them.
         """
-        my_match_count = self.get_url_match_count()
+        if self._match_index is not None:
+            return self._match_index.get_dominated_urls(self)
 
-        # Get patterns from same type that affect this URL
-        pattern_class = self.__class__
-        matching_patterns = (
-            pattern_class.objects.filter(collection=self.collection)
-            .filter(models.Q(delta_urls__url=url.url) | models.Q(curated_urls__url=url.url))
-            .exclude(id=self.id)
+        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
+        CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
+
+        competitors = list(
+            type(self)
+            ._default_manager.filter(collection=self.collection)
+            .filter(
+                models.Q(delta_urls__url__in=self.get_matching_delta_urls().values("url"))
+                | models.Q(curated_urls__url__in=self.get_matching_curated_urls().values("url"))
+            )
+            .exclude(pk=self.pk)
             .distinct()
-        )  # TODO: does this have a distinct urls, or distinct model objects.
+        )
+        type(self).refresh_url_match_counts(competitors)
+        stronger_patterns = [
+            competitor.pk for competitor in competitors if competitor.url_match_count < self.url_match_count
+        ]
+        if not stronger_patterns:
+            return set()
+
+        related_query_name = f"{self._meta.model_name}s"
+        delta_urls = DeltaUrl.objects.filter(**{f"{related_query_name}__in": stronger_patterns}).values_list(
+            "url", flat=True
+        )
+        curated_urls = CuratedUrl.objects.filter(**{f"{related_query_name}__in": stronger_patterns}).values_list(
+            "url", flat=True
+        )
+        return set(delta_urls.union(curated_urls))
 
-        # If any matching pattern has a smaller URL set, don't apply
-        for pattern in matching_patterns:
-            if pattern.get_url_match_count() < my_match_count:
-                return False
+    def is_most_distinctive_pattern(self, url) -> bool:
+        """
+        Determine if this pattern should apply to a URL by checking if it matches
+        the smallest number of URLs among all patterns that match this URL.
+        Returns True if this pattern should be applied.
 
-        return True
+        When checking many URLs, call get_dominated_urls() once and test membership instead.
+        """
+        return url.url not in self.get_dominated_urls()
 
     def get_regex_pattern(self) -> str:
         """Convert the match pattern into a proper regex based on pattern type."""
-        escaped_pattern = re.escape(self.match_pattern)
-        if self.match_pattern_type == self.MatchPatternTypeChoices.INDIVIDUAL_URL:
-            return f"{escaped_pattern}$"
-        return escaped_pattern.replace(r"\*", ".*")
+        return match_pattern_regex(self.match_pattern, self.is_individual_url)
+
+    def get_url_filter(self) -> models.Q:
+        """The `url` filter selecting this pattern's matches, in the most index-friendly form it allows."""
+        return match_pattern_filter(self.match_pattern, self.is_individual_url)
+
+    @property
+    def is_individual_url(self) -> bool:
+        return self.match_pattern_type == self.MatchPatternTypeChoices.INDIVIDUAL_URL
 
     def get_matching_delta_urls(self) -> models.QuerySet:
         """Get all DeltaUrls that match this pattern."""
         DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
-        regex_pattern = self.get_regex_pattern()
-        return DeltaUrl.objects.filter(collection=self.collection, url__regex=regex_pattern)
+        if self._match_index is not None:
+            return DeltaUrl.objects.filter(id__in=self._match_index.delta_ids[self])
+        return DeltaUrl.objects.filter(self.get_url_filter(), collection=self.collection)
 
     def get_matching_curated_urls(self) -> models.QuerySet:
         """Get all CuratedUrls that match this pattern."""
         CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
-        regex_pattern = self.get_regex_pattern()
-        return CuratedUrl.objects.filter(collection=self.collection, url__regex=regex_pattern)
+        if self._match_index is not None:
+            return CuratedUrl.objects.filter(id__in=self._match_index.curated_ids[self])
+        return CuratedUrl.objects.filter(self.get_url_filter(), collection=self.collection)
+
+    def create_deltas_from_curated(self, curated_urls: list, overrides: Iterable[dict]) -> list:
+        """
+        Create DeltaUrls copying every field from several CuratedUrls in one INSERT, with each
+        CuratedUrl's overrides from `overrides`, in the same order, applied on top. Registers the
+        new DeltaUrls with the attached match index so later patterns see them.
+        """
+        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
+
+        delta_urls = []
+        for curated_url, url_overrides in zip(curated_urls, overrides):
+            fields = curated_url.fields_to_copy()
+            fields["to_delete"] = False
+            fields.update(url_overrides)
+            delta_urls.append(DeltaUrl(collection=self.collection, **fields))
+
+        DeltaUrl.objects.bulk_create(delta_urls, batch_size=BULK_WRITE_BATCH_SIZE)
+        if self._match_index is not None:
+            for delta_url in delta_urls:
+                self._match_index.add_delta_url(delta_url.id, delta_url.url)
+        return delta_urls
+
+    def journal_entries(self) -> models.QuerySet:
+        """The DeltaUrls this pattern's applications journaled, see PatternJournalEntry."""
+        return PatternJournalEntry.objects.filter(
+            pattern_type=ContentType.objects.get_for_model(self), pattern_id=self.pk
+        )
+
+    def record_matching_delta_urls(self, field: str | None = None, cleared_value: Any = None) -> None:
+        """
+        Journal the Delta URLs the pattern matches after an apply(), with the value unapply()
+        gives back to `field`: their Curated URL's value, or `cleared_value` without one.
+        A Delta URL already journaled by an earlier application keeps its entry.
+        """
+        CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
 
-    def update_affected_delta_urls_list(self) -> None:
-        """Update the many-to-many relationship for matched DeltaUrls."""
-        self.delta_urls.set(self.get_matching_delta_urls())
+        matching_delta_urls = self.get_matching_delta_urls()
+        curated_values: dict[str, Any] = {}
+        if field is not None:
+            curated_values = dict(
+                CuratedUrl.objects.filter(
+                    collection=self.collection, url__in=matching_delta_urls.values("url")
+                ).values_list("url", field)
+            )
+        pattern_type = ContentType.objects.get_for_model(self)
+        PatternJournalEntry.objects.bulk_create(
+            [
+                PatternJournalEntry(
+                    pattern_type=pattern_type,
+                    pattern_id=self.pk,
+                    delta_url_id=delta_url_id,
+                    restore_value=curated_values.get(url, cleared_value),
+                )
+                for delta_url_id, url in matching_delta_urls.values_list("id", "url")
+            ],
+            ignore_conflicts=True,
+            batch_size=BULK_WRITE_BATCH_SIZE,
+        )
+
+    def revert_field(self, field: str, cleared_value: Any) -> None:
+        """
+        Undo a pattern that sets `field` by replaying its journal, in bulk:
+        1. Journaled Delta URLs take back their Curated URL's value, or `cleared_value` if they
+           have no Curated URL, as journaled, and are deleted when they then match their Curated URL
+        2. Affected Curated URLs left without a Delta URL get one with `cleared_value`
+        Only the journaled Delta URLs are read, and they are written with bulk writes.
+        """
+        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
+        CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
+
+        entries = list(self.journal_entries().select_related("delta_url"))
+        curated_by_url = CuratedUrl.objects.filter(collection=self.collection).in_bulk(
+            [entry.delta_url.url for entry in entries], field_name="url"
+        )
+
+        reverted, redundant = [], []
+        for entry in self.track_progress(entries, 0, 70):
+            delta = entry.delta_url
+            curated = curated_by_url.get(delta.url)
+            setattr(delta, field, entry.restore_value)
+            # the database recomputes the hash on write; compute it here to compare against the curated URL
+            delta.content_hash = delta.compute_content_hash()
+            if curated is not None and delta.content_matches(curated):
+                redundant.append(delta.id)
+            else:
+                reverted.append(delta)
+
+        DeltaUrl.objects.bulk_update(reverted, [field], batch_size=BULK_WRITE_BATCH_SIZE)
+        DeltaUrl.objects.filter(id__in=redundant).delete()
+        self.journal_entries().delete()
+
+        # Curated URLs whose Delta URL was promoted, or just deleted as redundant, get a fresh one
+        affected_curated = list(self.curated_urls.all())
+        urls_with_deltas = set(
+            DeltaUrl.objects.filter(url__in=[curated.url for curated in affected_curated]).values_list("url", flat=True)
+        )
+        new_deltas = []
+        for curated in self.track_progress(affected_curated, 70, 95):
+            if curated.url not in urls_with_deltas:
+                fields = curated.fields_to_copy()
+                fields[field] = cleared_value
+                new_deltas.append(DeltaUrl(collection=self.collection, **fields))
+        DeltaUrl.objects.bulk_create(new_deltas, batch_size=BULK_WRITE_BATCH_SIZE)
+
+    def update_affected_delta_urls_list(self) -> tuple[int, int]:
+        """Update the many-to-many relationship for matched DeltaUrls. Returns (added, removed)."""
+        return type(self).sync_url_memberships("delta_urls", [self], self._match_index)
+
+    def update_affected_curated_urls_list(self) -> tuple[int, int]:
+        """Update the many-to-many relationship for matched CuratedUrls. Returns (added, removed)."""
+        return type(self).sync_url_memberships("curated_urls", [self], self._match_index)
+
+    @classmethod
+    def sync_url_memberships(cls, field_name: str, patterns: list, match_index=None) -> tuple[int, int]:
+        """
+        Bring the `delta_urls` or `curated_urls` through table of the given patterns in line with
+        what they match, diffing in SQL rather than loading both id lists into Python:
+        an INSERT ... SELECT ... ON CONFLICT DO NOTHING adds missing rows and a DELETE removes
+        rows for URLs that no longer match. The patterns must all belong to one collection.
+
+        Matches are taken from `match_index` when given, otherwise the regexes are evaluated
+        by the database. Returns (added, removed) row counts.
+        """
+        if not patterns:
+            return 0, 0
+
+        m2m_field = cast(models.ManyToManyField, cls._meta.get_field(field_name))
+        through_table = m2m_field.m2m_db_table()
+        pattern_column = m2m_field.m2m_column_name()
+        url_column = m2m_field.m2m_reverse_name()
+        url_table = cast(type[models.Model], m2m_field.related_model)._meta.db_table
+        pattern_ids = [pattern.id for pattern in patterns]
+
+        with connection.cursor() as cursor:
+            if match_index is not None:
+                if field_name == "delta_urls":
+                    matched_ids, scope = match_index.delta_ids, match_index.delta_scope
+                else:
+                    matched_ids, scope = match_index.curated_ids, match_index.curated_scope
+                pairs = [(pattern.id, url_id) for pattern in patterns for url_id in matched_ids[pattern]]
+                matches_sql = "SELECT * FROM unnest(%s::bigint[], %s::bigint[])"
+                matches_params = [[pattern_id for pattern_id, _ in pairs], [url_id for _, url_id in pairs]]
+
+                cursor.execute(
+                    f"INSERT INTO {through_table} ({pattern_column}, {url_column}) {matches_sql} "
+                    "ON CONFLICT DO NOTHING",
+                    matches_params,
+                )
+                added = cursor.rowcount
+
+                # a partial index only knows about the URLs it evaluated
+                scope_sql, scope_params = "", []
+                if scope is not None:
+                    scope_sql, scope_params = f" AND {url_column} = ANY(%s)", [list(scope)]
+                cursor.execute(
+                    f"DELETE FROM {through_table} WHERE {pattern_column} = ANY(%s){scope_sql} "
+                    f"AND ({pattern_column}, {url_column}) NOT IN ({matches_sql})",
+                    [pattern_ids, *scope_params, *matches_params],
+                )
+                removed = cursor.rowcount
+            else:
+                patterns_sql = "unnest(%s::bigint[], %s::text[]) AS pattern(id, regex)"
+                patterns_params = [pattern_ids, [pattern.get_regex_pattern() for pattern in patterns]]
+                collection_id = patterns[0].collection_id
+
+                cursor.execute(
+                    f"INSERT INTO {through_table} ({pattern_column}, {url_column}) "
+                    f"SELECT pattern.id, url.id FROM {patterns_sql} "
+                    f"JOIN {url_table} url ON url.collection_id = %s AND url.url ~ pattern.regex "
+                    "ON CONFLICT DO NOTHING",
+                    [*patterns_params, collection_id],
+                )
+                added = cursor.rowcount
+                cursor.execute(
+                    f"DELETE FROM {through_table} membership USING {patterns_sql}, {url_table} url "
+                    f"WHERE membership.{pattern_column} = pattern.id AND membership.{url_column} = url.id "
+                    "AND url.url !~ pattern.regex",
+                    patterns_params,
+                )
+                removed = cursor.rowcount
 
-    def update_affected_curated_urls_list(self) -> None:
-        """Update the many-to-many relationship for matched CuratedUrls."""
-        self.curated_urls.set(self.get_matching_curated_urls())
+        return added, removed
 
     def apply(self) -> None:
         """Apply pattern effects. Must be implemented by subclasses."""
@@ -107,9 +396,14 @@ class BaseMatchPattern(models.Model):
         """Remove pattern effects. Must be implemented by subclasses."""
         raise NotImplementedError
 
-    def save(self, *args, **kwargs) -> None:
+    def save(self, *args, apply: bool = True, **kwargs) -> None:
+        """
+        Save the pattern and apply it. Pass `apply=False` to only save it, e.g. when the
+        application is queued as a PatternApplicationJob instead.
+        """
         super().save(*args, **kwargs)
-        self.apply()
+        if apply:
+            self.apply()
 
     def delete(self, *args, **kwargs) -> None:
         self.unapply()
@@ -143,6 +437,8 @@ class InclusionPatternBase(BaseMatchPattern):
         """
         DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
 
+        self.refresh_url_match_count()
+
         # Get QuerySet of all matching CuratedUrls
         matching_curated_urls = self.get_matching_curated_urls()
 
@@ -151,22 +447,21 @@ class InclusionPatternBase(BaseMatchPattern):
             id__in=self.curated_urls.values_list("id", flat=True)
         )
 
-        # Create Delta URLs for newly affected Curated URLs if needed
-        for curated_url in previously_unaffected_curated:
-            # Skip if Delta already exists
-            if DeltaUrl.objects.filter(url=curated_url.url, collection=self.collection).exists():
-                continue
-
-            # Create new Delta URL copying fields from Curated URL
-            fields = {
-                field.name: getattr(curated_url, field.name)
-                for field in curated_url._meta.fields
-                if field.name not in ["id", "collection"]
-            }
-            fields["to_delete"] = False
-            fields["collection"] = self.collection
+        # Create Delta URLs for newly affected Curated URLs that don't have one, in one INSERT
+        urls_with_deltas = set(
+            DeltaUrl.objects.filter(
+                collection=self.collection, url__in=previously_unaffected_curated.values("url")
+            ).values_list("url", flat=True)
+        )
+        new_curated = [
+            curated_url
+            for curated_url in self.track_progress(previously_unaffected_curated, 0, 80)
+            if curated_url.url not in urls_with_deltas
+        ]
+        self.create_deltas_from_curated(new_curated, ({} for _ in new_curated))
 
-            DeltaUrl.objects.create(**fields)
+        # unapply tidies up every DeltaUrl the pattern matches, including the ones just created
+        self.record_matching_delta_urls()
 
         # Update relationships - this handles inclusion/exclusion status
         self.update_affected_delta_urls_list()
@@ -175,43 +470,45 @@ class InclusionPatternBase(BaseMatchPattern):
         """
         Remove this pattern's effects by:
         1. Creating Delta URLs for previously excluded Curated URLs to show they're no longer excluded/included
-        2. Cleaning up any Delta URLs that are now identical to their Curated URL counterparts
-           (these would have only existed to show their exclusion/inclusion)
+        2. Cleaning up the Delta URLs in the pattern's journal that are identical to their Curated URL
+           counterparts (these would have only existed to show their exclusion/inclusion)
         """
         DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
         CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
 
-        # Create Delta URLs for previously affected Curated URLs
-        for curated_url in self.curated_urls.all():
-            fields = {
-                field.name: getattr(curated_url, field.name)
-                for field in curated_url._meta.fields
-                if field.name not in ["id", "collection"]
-            }
-            fields["to_delete"] = False
-            fields["collection"] = self.collection
-
-            DeltaUrl.objects.get_or_create(**fields)
+        # Create Delta URLs for previously affected Curated URLs that don't have one
+        affected_curated = list(self.curated_urls.all())
+        urls_with_deltas = set(
+            DeltaUrl.objects.filter(url__in=[curated_url.url for curated_url in affected_curated]).values_list(
+                "url", flat=True
+            )
+        )
+        new_deltas = []
+        for curated_url in self.track_progress(affected_curated, 0, 50):
+            if curated_url.url not in urls_with_deltas:
+                fields = curated_url.fields_to_copy()
+                fields["to_delete"] = False
+                new_deltas.append(DeltaUrl(collection=self.collection, **fields))
+        DeltaUrl.objects.bulk_create(new_deltas, batch_size=BULK_WRITE_BATCH_SIZE)
 
         # Clean up redundant Delta URLs
-        for delta_url in self.delta_urls.filter(to_delete=False):
-            try:
-                curated_url = CuratedUrl.objects.get(collection=self.collection, url=delta_url.url)
-
-                # Check if Delta is now identical to Curated
-                fields_match = all(
-                    getattr(delta_url, field.name) == getattr(curated_url, field.name)
-                    for field in delta_url._meta.fields
-                    if field.name not in ["id", "to_delete"]
-                )
-
-                if fields_match:
-                    delta_url.delete()
-
-            except CuratedUrl.DoesNotExist:
-                continue
-
-        # Clear pattern relationships
+        affected_deltas = [
+            entry.delta_url
+            for entry in self.journal_entries().filter(delta_url__to_delete=False).select_related("delta_url")
+        ]
+        curated_by_url = CuratedUrl.objects.filter(collection=self.collection).in_bulk(
+            [delta_url.url for delta_url in affected_deltas], field_name="url"
+        )
+        redundant = [
+            delta_url.id
+            for delta_url in self.track_progress(affected_deltas, 50, 95)
+            if delta_url.url in curated_by_url and delta_url.content_matches(curated_by_url[delta_url.url])
+        ]
+        DeltaUrl.objects.filter(id__in=redundant).delete()
+        self.journal_entries().delete()
+
+        # Clear pattern relationships. The membership tables are keyed by pattern, so every row
+        # of this pattern's was added by its applications and they are cleared whole
         self.delta_urls.clear()
         self.curated_urls.clear()
 
@@ -264,39 +561,39 @@ class FieldModifyingPattern(BaseMatchPattern):
         field = self.get_field_to_modify()
         new_value = self.get_new_value()
 
+        # Resolve pattern precedence once, rather than per URL
+        self.refresh_url_match_count()
+        dominated_urls = self.get_dominated_urls()
+
         # Get newly matching Curated URLs
         matching_curated_urls = self.get_matching_curated_urls()
         previously_unaffected_curated = matching_curated_urls.exclude(
             id__in=self.curated_urls.values_list("id", flat=True)
         )
 
-        # Create DeltaUrls only where field value would change
-        for curated_url in previously_unaffected_curated:
-            if not self.is_most_distinctive_pattern(curated_url):
-                continue
-
-            if (
-                getattr(curated_url, field) == new_value
-                or DeltaUrl.objects.filter(url=curated_url.url, collection=self.collection).exists()
-            ):
-                continue
-
-            fields = {
-                f.name: getattr(curated_url, f.name)
-                for f in curated_url._meta.fields
-                if f.name not in ["id", "collection"]
-            }
-            fields[field] = new_value
-            fields["to_delete"] = False
-            fields["collection"] = self.collection
-
-            DeltaUrl.objects.create(**fields)
-
-        # Update all matching DeltaUrls with the new field value if this is the most distinctive pattern
-        for delta_url in self.get_matching_delta_urls():
-            if self.is_most_distinctive_pattern(delta_url):
+        # Create DeltaUrls only where field value would change, in one INSERT
+        urls_with_deltas = set(
+            DeltaUrl.objects.filter(
+                collection=self.collection, url__in=previously_unaffected_curated.values("url")
+            ).values_list("url", flat=True)
+        )
+        new_curated = [
+            curated_url
+            for curated_url in self.track_progress(previously_unaffected_curated, 0, 40)
+            if curated_url.url not in dominated_urls
+            and curated_url.url not in urls_with_deltas
+            and getattr(curated_url, field) != new_value
+        ]
+        self.create_deltas_from_curated(new_curated, ({field: new_value} for _ in new_curated))
+
+        # Set the new field value on the matching DeltaUrls where this is the most distinctive pattern
+        changed = []
+        for delta_url in self.track_progress(self.get_matching_delta_urls().only("id", "url", field), 40, 90):
+            if delta_url.url not in dominated_urls and getattr(delta_url, field) != new_value:
                 setattr(delta_url, field, new_value)
-                delta_url.save()
+                changed.append(delta_url)
+        DeltaUrl.objects.bulk_update(changed, [field], batch_size=BULK_WRITE_BATCH_SIZE)
+        self.record_matching_delta_urls(field)
 
         # Update pattern relationships
         self.update_affected_delta_urls_list()
@@ -305,51 +602,10 @@ class FieldModifyingPattern(BaseMatchPattern):
         """
         Remove field modifications:
         1. Create Delta URLs for affected Curated URLs to explicitly set NULL
-        2. Remove field value from affected Delta URLs only if no other patterns affect them
+        2. Restore the journaled field value of the Delta URLs the pattern matched
         3. Clean up Delta URLs that become identical to their Curated URL
         """
-
-        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
-        CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
-
-        field = self.get_field_to_modify()
-
-        # Get all affected URLs
-        affected_deltas = self.delta_urls.all()
-        affected_curated = self.curated_urls.all()
-
-        # Process each affected delta URL
-        for delta in affected_deltas:
-            curated = CuratedUrl.objects.filter(collection=self.collection, url=delta.url).first()
-
-            if not curated:
-                # Scenario 1: Delta only - new URL
-                setattr(delta, field, None)
-                delta.save()
-            else:
-                # Scenario 2: Both exist
-                setattr(delta, field, getattr(curated, field))
-                delta.save()
-
-                # Check if delta is now redundant
-                fields_match = all(
-                    getattr(delta, f.name) == getattr(curated, f.name)
-                    for f in delta._meta.fields
-                    if f.name not in ["id", "to_delete"]
-                )
-                if fields_match:
-                    delta.delete()
-
-        # Handle curated URLs that don't have deltas
-        for curated in affected_curated:
-            if not DeltaUrl.objects.filter(url=curated.url).exists():
-                # Scenario 3: Curated only
-                # Copy all fields from curated except the one we're nulling
-                fields = {
-                    f.name: getattr(curated, f.name) for f in curated._meta.fields if f.name not in ["id", "collection"]
-                }
-                fields[field] = None  # Set the pattern's field to None
-                delta = DeltaUrl.objects.create(collection=self.collection, **fields)
+        self.revert_field(self.get_field_to_modify(), None)
 
         # Clear pattern relationships
         self.delta_urls.clear()
@@ -428,6 +684,17 @@ class DeltaTitlePattern(BaseMatchPattern):
         except Exception as e:
             return None, str(e)
 
+    def generate_titles(self, url_objs, fetcher: PageFetcher | None = None) -> Iterator[tuple[str | None, str | None]]:
+        """
+        Generate the titles of several URLs, in order, as (generated_title, error_message) tuples.
+        Pages needed by xpath segments are downloaded concurrently through `fetcher`.
+        """
+        contexts = (
+            {"url": url_obj.url, "title": url_obj.scraped_title, "collection": self.collection.name}
+            for url_obj in url_objs
+        )
+        return resolve_titles(self.title_pattern, contexts, fetcher)
+
     def apply(self) -> None:
         """
         Apply the title pattern to matching URLs:
@@ -435,122 +702,126 @@ class DeltaTitlePattern(BaseMatchPattern):
         2. Create Delta URLs only where the generated title differs
         3. Update all matching Delta URLs with new titles
         4. Track title resolution status and errors
+
+        Titles are resolved ahead of the writes and written TITLE_BATCH_SIZE URLs at a time,
+        with a fixed number of queries per batch.
         """
-        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
-        DeltaResolvedTitle = apps.get_model("sde_collections", "DeltaResolvedTitle")
-        DeltaResolvedTitleError = apps.get_model("sde_collections", "DeltaResolvedTitleError")
+        # Resolve pattern precedence once, rather than per URL
+        self.refresh_url_match_count()
+        dominated_urls = self.get_dominated_urls()
 
         # Get newly matching Curated URLs
         matching_curated_urls = self.get_matching_curated_urls()
-        previously_unaffected_curated = matching_curated_urls.exclude(
-            id__in=self.curated_urls.values_list("id", flat=True)
-        )
-
-        # Process each previously unaffected curated URL
-        for curated_url in previously_unaffected_curated:
-            if not self.is_most_distinctive_pattern(curated_url):
-                continue
-
-            new_title, error = self.generate_title_for_url(curated_url)
+        previously_unaffected_curated = [
+            curated_url
+            for curated_url in matching_curated_urls.exclude(id__in=self.curated_urls.values_list("id", flat=True))
+            if curated_url.url not in dominated_urls
+        ]
+        matching_delta_urls = [
+            delta_url for delta_url in self.get_matching_delta_urls() if delta_url.url not in dominated_urls
+        ]
+
+        # One fetcher serves both passes, so xpath pages are downloaded over the same connections
+        with PageFetcher() as fetcher:
+            results = zip(
+                self.track_progress(previously_unaffected_curated, 0, 40),
+                self.generate_titles(previously_unaffected_curated, fetcher),
+            )
+            while batch := list(itertools.islice(results, TITLE_BATCH_SIZE)):
+                self._apply_to_curated_urls(batch)
 
-            if error:
-                # Log error and continue to next URL
-                DeltaResolvedTitleError.objects.create(title_pattern=self, delta_url=curated_url, error_string=error)
-                continue
-
-            # Skip if the generated title matches existing or if Delta already exists
-            if (
-                curated_url.generated_title == new_title
-                or DeltaUrl.objects.filter(url=curated_url.url, collection=self.collection).exists()
-            ):
-                continue
-
-            # Create new Delta URL with the new title
-            fields = {
-                field.name: getattr(curated_url, field.name)
-                for field in curated_url._meta.fields
-                if field.name not in ["id", "collection"]
-            }
-            fields["generated_title"] = new_title
-            fields["to_delete"] = False
-            fields["collection"] = self.collection
+            results = zip(
+                self.track_progress(matching_delta_urls, 40, 90),
+                self.generate_titles(matching_delta_urls, fetcher),
+            )
+            while batch := list(itertools.islice(results, TITLE_BATCH_SIZE)):
+                self._apply_to_delta_urls(batch)
+        self.record_matching_delta_urls("generated_title", "")
 
-            delta_url = DeltaUrl.objects.create(**fields)
+        # Update pattern relationships
+        self.update_affected_delta_urls_list()
 
-            # Record successful title resolution
-            DeltaResolvedTitle.objects.create(title_pattern=self, delta_url=delta_url, resolved_title=new_title)
+    def _apply_to_curated_urls(self, results: list[tuple[Any, tuple[str | None, str | None]]]) -> None:
+        """
+        Create Delta URLs for the Curated URLs whose generated title changes, unless they already
+        have one, and record their resolved titles. A Curated URL whose title can't be resolved is
+        left alone; resolution errors are recorded against Delta URLs only.
+        """
+        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
+        DeltaResolvedTitle = apps.get_model("sde_collections", "DeltaResolvedTitle")
 
-        # Update titles for all matching Delta URLs
-        for delta_url in self.get_matching_delta_urls():
-            if not self.is_most_distinctive_pattern(delta_url):
-                continue
+        existing_delta_urls = set(
+            DeltaUrl.objects.filter(
+                collection=self.collection, url__in=[curated_url.url for curated_url, _ in results]
+            ).values_list("url", flat=True)
+        )
+        changed = [
+            (curated_url, new_title)
+            for curated_url, (new_title, error) in results
+            if not error and curated_url.generated_title != new_title and curated_url.url not in existing_delta_urls
+        ]
+        if not changed:
+            return
+
+        delta_urls = self.create_deltas_from_curated(
+            [curated_url for curated_url, _ in changed], [{"generated_title": new_title} for _, new_title in changed]
+        )
+        DeltaResolvedTitle.objects.bulk_create(
+            [
+                DeltaResolvedTitle(title_pattern=self, delta_url=delta_url, resolved_title=delta_url.generated_title)
+                for delta_url in delta_urls
+            ]
+        )
 
-            new_title, error = self.generate_title_for_url(delta_url)
+    def _apply_to_delta_urls(self, results: list[tuple[Any, tuple[str | None, str | None]]]) -> None:
+        """
+        Set the generated titles of Delta URLs and upsert their resolved titles, or their errors
+        where resolution failed. A resolved title replaces the URL's previous error.
+        """
+        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
+        DeltaResolvedTitle = apps.get_model("sde_collections", "DeltaResolvedTitle")
+        DeltaResolvedTitleError = apps.get_model("sde_collections", "DeltaResolvedTitleError")
 
+        resolved_titles, errors = [], []
+        for delta_url, (new_title, error) in results:
             if error:
-                DeltaResolvedTitleError.objects.create(title_pattern=self, delta_url=delta_url, error_string=error)
-                continue
+                errors.append(DeltaResolvedTitleError(title_pattern=self, delta_url=delta_url, error_string=error))
+            else:
+                delta_url.generated_title = new_title
+                resolved_titles.append(
+                    DeltaResolvedTitle(title_pattern=self, delta_url=delta_url, resolved_title=new_title)
+                )
 
-            # Update title and record resolution - key change here
-            DeltaResolvedTitle.objects.update_or_create(
-                delta_url=delta_url,  # Only use delta_url for lookup
-                defaults={"title_pattern": self, "resolved_title": new_title},
+        if errors:
+            DeltaResolvedTitleError.objects.bulk_create(
+                errors,
+                update_conflicts=True,
+                unique_fields=["delta_url"],
+                update_fields=["title_pattern", "error_string", "http_status_code"],
             )
-
-            delta_url.generated_title = new_title
-            delta_url.save()
-
-        # Update pattern relationships
-        self.update_affected_delta_urls_list()
+        if resolved_titles:
+            DeltaResolvedTitle.objects.bulk_create(
+                resolved_titles,
+                update_conflicts=True,
+                unique_fields=["delta_url"],
+                update_fields=["title_pattern", "resolved_title"],
+            )
+            resolved_delta_urls = [resolved_title.delta_url for resolved_title in resolved_titles]
+            DeltaResolvedTitleError.objects.filter(delta_url__in=resolved_delta_urls).delete()
+            DeltaUrl.objects.bulk_update(resolved_delta_urls, ["generated_title"])
 
     def unapply(self) -> None:
         """
         Remove title modifications:
         1. Create Delta URLs for affected Curated URLs to explicitly clear titles
-        2. Remove generated titles from affected Delta URLs
+        2. Restore the journaled generated titles of the Delta URLs the pattern matched
         3. Clean up Delta URLs that become identical to their Curated URL
         4. Clear resolution tracking
         """
-        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
-        CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
         DeltaResolvedTitle = apps.get_model("sde_collections", "DeltaResolvedTitle")
         DeltaResolvedTitleError = apps.get_model("sde_collections", "DeltaResolvedTitleError")
 
-        # Get all affected URLs
-        affected_deltas = self.delta_urls.all()
-        affected_curated = self.curated_urls.all()
-
-        # Process each affected delta URL
-        for delta in affected_deltas:
-            curated = CuratedUrl.objects.filter(collection=self.collection, url=delta.url).first()
-
-            if not curated:
-                # Scenario 1: Delta only - clear generated title
-                delta.generated_title = ""
-                delta.save()
-            else:
-                # Scenario 2: Both exist - revert to curated title
-                delta.generated_title = curated.generated_title
-                delta.save()
-
-                # Check if delta is now redundant
-                fields_match = all(
-                    getattr(delta, f.name) == getattr(curated, f.name)
-                    for f in delta._meta.fields
-                    if f.name not in ["id", "to_delete"]
-                )
-                if fields_match:
-                    delta.delete()
-
-        # Handle curated URLs that don't have deltas
-        for curated in affected_curated:
-            if not DeltaUrl.objects.filter(url=curated.url).exists():
-                # Scenario 3: Curated only - create delta with cleared title
-                fields = {
-                    f.name: getattr(curated, f.name) for f in curated._meta.fields if f.name not in ["id", "collection"]
-                }
-                fields["generated_title"] = ""
-                DeltaUrl.objects.create(collection=self.collection, **fields)
+        self.revert_field("generated_title", "")
 
         # Clear resolution tracking
         DeltaResolvedTitle.objects.filter(title_pattern=self).delete()
@@ -592,3 +863,158 @@ class DeltaResolvedTitle(DeltaResolvedTitleBase):
 class DeltaResolvedTitleError(DeltaResolvedTitleBase):
     error_string = models.TextField(null=False, blank=False)
     http_status_code = models.IntegerField(null=True, blank=True)
+
+
+class PatternJournalEntry(models.Model):
+    """
+    A DeltaUrl a pattern's apply() matched, with the value unapply() gives back to the pattern's
+    field: the DeltaUrl's CuratedUrl value, or the cleared value without one. unapply() replays a
+    pattern's entries instead of re-deriving its effects from every URL in the collection.
+    CuratedUrl values only change at promotion, which clears the DeltaUrls and so their entries.
+    """
+
+    pattern_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    pattern_id = models.PositiveBigIntegerField()
+    delta_url = models.ForeignKey(
+        "sde_collections.DeltaUrl", on_delete=models.CASCADE, related_name="pattern_journal_entries"
+    )
+    restore_value = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="The value unapply() sets the pattern's field back to: its CuratedUrl's value, "
+        "or the cleared value without one",
+    )
+
+    class Meta:
+        verbose_name = "Pattern Journal Entry"
+        verbose_name_plural = "Pattern Journal Entries"
+        unique_together = ("pattern_type", "pattern_id", "delta_url")
+
+
+class PatternApplicationJobQuerySet(models.QuerySet):
+    def unfinished(self) -> "PatternApplicationJobQuerySet":
+        return self.filter(status__in=[PatternApplicationJob.Status.PENDING, PatternApplicationJob.Status.RUNNING])
+
+    def unapplying(self, pattern_model: type[BaseMatchPattern]) -> "PatternApplicationJobQuerySet":
+        """The unfinished unapply jobs of patterns of `pattern_model`, each of which will delete its pattern."""
+        return self.unfinished().filter(
+            pattern_type=ContentType.objects.get_for_model(pattern_model), action=PatternApplicationJob.Action.UNAPPLY
+        )
+
+
+class PatternApplicationJob(models.Model):
+    """
+    Tracks a pattern apply/unapply that runs in a Celery task instead of the request that
+    created or deleted the pattern. Jobs of one collection run one at a time.
+    """
+
+    class Action(models.IntegerChoices):
+        APPLY = 1, "Apply"
+        UNAPPLY = 2, "Unapply"
+        # unapply and apply again, for a pattern whose value was replaced
+        REAPPLY = 3, "Reapply"
+
+    class Status(models.IntegerChoices):
+        PENDING = 1, "Pending"
+        RUNNING = 2, "Running"
+        SUCCEEDED = 3, "Succeeded"
+        FAILED = 4, "Failed"
+
+    collection = models.ForeignKey("Collection", on_delete=models.CASCADE, related_name="pattern_jobs")
+    pattern_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    pattern_id = models.PositiveBigIntegerField()
+    match_pattern = models.CharField("Pattern", help_text="Copied from the pattern, which unapply deletes")
+    action = models.IntegerField(choices=Action.choices)
+    status = models.IntegerField(choices=Status.choices, default=Status.PENDING)
+    progress = models.PositiveSmallIntegerField("Progress (%)", default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PatternApplicationJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Pattern Application Job"
+        verbose_name_plural = "Pattern Application Jobs"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_action_display()} {self.match_pattern}"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in [self.Status.SUCCEEDED, self.Status.FAILED]
+
+    @classmethod
+    def enqueue(cls, pattern: BaseMatchPattern, action: int) -> "PatternApplicationJob":
+        """Record a job for the pattern and start its task once the current transaction commits."""
+        from ..tasks import run_pattern_application_job
+
+        job = cls.objects.create(
+            collection=pattern.collection,
+            pattern_type=ContentType.objects.get_for_model(pattern),
+            pattern_id=pattern.pk,
+            match_pattern=pattern.match_pattern,
+            action=action,
+        )
+        transaction.on_commit(lambda: run_pattern_application_job.delay(job.pk))
+        return job
+
+    def get_pattern(self) -> BaseMatchPattern:
+        return cast(BaseMatchPattern, self.pattern_type.get_object_for_this_type(pk=self.pattern_id))
+
+    def update_progress(self, percent: int) -> None:
+        self.progress = min(max(percent, 0), 100)
+        # written on the job's own connection, which commits straight away, so that progress can
+        # be polled while the transaction of run() is still open
+        with self._progress_connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {self._meta.db_table} SET progress = %s, updated_at = %s WHERE id = %s",
+                [self.progress, timezone.now(), self.pk],
+            )
+
+    def run(self) -> None:
+        """
+        Apply, reapply, or unapply and delete the pattern in one transaction, so a job that fails or
+        times out part way leaves the URLs and the pattern as they were and can simply be rerun.
+        A pattern that was deleted before its job ran fails an apply and completes an unapply.
+        """
+        self.status = self.Status.RUNNING
+        self.save(update_fields=["status", "updated_at"])
+
+        self._progress_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    # serialize the jobs of a collection, as patterns take precedence over each other
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", [self.collection_id])
+                try:
+                    pattern = self.get_pattern()
+                except ObjectDoesNotExist:
+                    pattern = None
+                if pattern is not None:
+                    pattern._progress_callback = self.update_progress
+                    if self.action == self.Action.APPLY:
+                        pattern.apply()
+                    elif self.action == self.Action.REAPPLY:
+                        pattern.unapply()
+                        pattern.apply()
+                    else:
+                        pattern.delete()
+        except Exception as e:
+            self.status = self.Status.FAILED
+            self.error = str(e)
+            self.save(update_fields=["status", "error", "updated_at"])
+            raise
+        finally:
+            self._progress_connection.close()
+
+        if pattern is None and self.action != self.Action.UNAPPLY:
+            self.status = self.Status.FAILED
+            self.error = "The pattern was deleted before it could be applied."
+            self.save(update_fields=["status", "error", "updated_at"])
+            return
+
+        self.status = self.Status.SUCCEEDED
+        self.progress = 100
+        self.save(update_fields=["status", "progress", "updated_at"])
@@ -1,67 +1,38 @@
+import hashlib
 import os
+from typing import cast
 from urllib.parse import urlparse
 
-from django.db import models
+from django.db import models, transaction
 
 from .collection_choice_fields import Divisions, DocumentTypes
-from .delta_patterns import DeltaExcludePattern, DeltaIncludePattern
+from .text_blob import TextBlob
 
 
-class DeltaUrlQuerySet(models.QuerySet):
-    def with_exclusion_status(self):
-        """
-        Annotate queryset with exclusion status, taking into account both exclude and include patterns.
-        Include patterns take precedence over exclude patterns.
-        """
-        return self.annotate(
-            has_exclude=models.Exists(
-                DeltaExcludePattern.delta_urls.through.objects.filter(deltaurl=models.OuterRef("pk"))
-            ),
-            has_include=models.Exists(
-                DeltaIncludePattern.delta_urls.through.objects.filter(deltaurl=models.OuterRef("pk"))
-            ),
-            excluded=models.Case(
-                # If has_include is True, URL is not excluded regardless of exclude patterns
-                models.When(has_include=True, then=models.Value(False)),
-                # Otherwise, excluded status is determined by presence of exclude pattern
-                default=models.F("has_exclude"),
-                output_field=models.BooleanField(),
-            ),
-        )
-
-
-class CuratedUrlQuerySet(models.QuerySet):
-    def with_exclusion_status(self):
-        """
-        Annotate queryset with exclusion status, taking into account both exclude and include patterns.
-        Include patterns take precedence over exclude patterns.
-        """
-        return self.annotate(
-            has_exclude=models.Exists(
-                DeltaExcludePattern.curated_urls.through.objects.filter(curatedurl=models.OuterRef("pk"))
-            ),
-            has_include=models.Exists(
-                DeltaIncludePattern.curated_urls.through.objects.filter(curatedurl=models.OuterRef("pk"))
-            ),
-            excluded=models.Case(
-                # If has_include is True, URL is not excluded regardless of exclude patterns
-                models.When(has_include=True, then=models.Value(False)),
-                # Otherwise, excluded status is determined by presence of exclude pattern
-                default=models.F("has_exclude"),
-                output_field=models.BooleanField(),
-            ),
-        )
-
-
-# Manager classes remain unchanged since they just use the updated QuerySets
-class DeltaUrlManager(models.Manager):
-    def get_queryset(self):
-        return DeltaUrlQuerySet(self.model, using=self._db).with_exclusion_status()
-
-
-class CuratedUrlManager(models.Manager):
-    def get_queryset(self):
-        return CuratedUrlQuerySet(self.model, using=self._db).with_exclusion_status()
+class UrlQuerySet(models.QuerySet):
+    def with_scraped_text(self):
+        """Fetch each URL's scraped text in the same query, rather than one query per URL on access."""
+        return self.select_related("scraped_text_blob")
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        # store the texts first, so the new rows can reference them
+        TextBlob.objects.store(blob for url in objs if (blob := url.unsaved_text_blob()) is not None)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+# Fields covered by BaseUrl.content_hash, in the order they are hashed. The trigger created in
+# migration 0071 computes the same hash in Postgres, so the two must be kept in sync.
+# scraped_text is hashed by its blob's key, which is itself a hash of the text.
+CONTENT_HASH_FIELDS = ["scraped_title", "scraped_text_blob_id", "generated_title", "document_type", "division"]
+CONTENT_HASH_SEPARATOR = "\x1f"
+
+# DeltaUrl.excluded and CuratedUrl.excluded are kept up to date by triggers on the exclude and
+# include pattern membership tables, created in migration 0074
+EXCLUDED_HELP_TEXT = "Matched by an exclude pattern and no include pattern, maintained by a database trigger"
+
+
+UrlManager = models.Manager.from_queryset(UrlQuerySet)
 
 
 class BaseUrl(models.Model):
@@ -74,11 +45,14 @@ class BaseUrl(models.Model):
         blank=True,
         help_text="This is the original title scraped by Sinequa",
     )
-    scraped_text = models.TextField(
-        "Scraped Text",
-        default="",
+    scraped_text_blob = models.ForeignKey(
+        TextBlob,
+        verbose_name="Scraped Text",
+        null=True,
         blank=True,
-        help_text="This is the text scraped by Sinequa",
+        on_delete=models.PROTECT,
+        related_name="+",
+        help_text="This is the text scraped by Sinequa; empty texts have no blob",
     )
     generated_title = models.CharField(
         "Generated Title",
@@ -90,11 +64,75 @@ class BaseUrl(models.Model):
     visited = models.BooleanField(default=False)
     document_type = models.IntegerField(choices=DocumentTypes.choices, null=True)
     division = models.IntegerField(choices=Divisions.choices, null=True)
+    content_hash = models.CharField(
+        "Content Hash",
+        max_length=32,
+        default="",
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text="MD5 of the scraped and curated content, maintained by a database trigger on every write",
+    )
 
     class Meta:
         abstract = True
         ordering = ["url"]
 
+    def compute_content_hash(self) -> str:
+        values = ["" if getattr(self, field) is None else str(getattr(self, field)) for field in CONTENT_HASH_FIELDS]
+        return hashlib.md5(CONTENT_HASH_SEPARATOR.join(values).encode()).hexdigest()
+
+    def content_matches(self, other: "BaseUrl") -> bool:
+        """Whether two URL rows hold the same content, without comparing every field."""
+        return self.content_hash == other.content_hash and self.visited == other.visited
+
+    @property
+    def scraped_text(self) -> str:
+        blob = self.scraped_text_blob
+        return "" if blob is None else blob.text
+
+    @scraped_text.setter
+    def scraped_text(self, text: str) -> None:
+        self.scraped_text_blob = TextBlob.from_text(text) if text else None
+
+    def unsaved_text_blob(self) -> TextBlob | None:
+        """The blob of a scraped text set on this instance, if it hasn't been stored yet."""
+        if not cast(models.ForeignKey, self._meta.get_field("scraped_text_blob")).is_cached(self):
+            return None
+        blob = self.scraped_text_blob
+        return blob if blob is not None and blob._state.adding else None
+
+    def fields_to_copy(self) -> dict:
+        """
+        Every field but id, collection and excluded, keyed by attname, for copying this URL into
+        another URL table. The scraped text is copied by its blob's key, without loading the text,
+        and excluded follows the copy's own pattern memberships.
+        """
+        return {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.fields
+            if field.name not in ["id", "collection", "excluded"]
+        }
+
+    def save(self, *args, **kwargs):
+        if (blob := self.unsaved_text_blob()) is not None:
+            with transaction.atomic():
+                TextBlob.objects.store([blob])
+                self._save_with_content_hash(*args, **kwargs)
+        else:
+            self._save_with_content_hash(*args, **kwargs)
+
+    def _save_with_content_hash(self, *args, **kwargs):
+        # the database recomputes the hash on write; setting it here keeps this instance in sync
+        if self.get_deferred_fields().isdisjoint(CONTENT_HASH_FIELDS):
+            self.content_hash = self.compute_content_hash()
+            super().save(*args, **kwargs)
+        else:
+            # hashing would load the deferred fields; defer the hash instead, so the value the trigger
+            # computed is only read back if it is used
+            super().save(*args, **kwargs)
+            del self.content_hash
+
     @property
     def fileext(self) -> str:
         # Parse the URL to get the path
@@ -141,36 +179,53 @@ class BaseUrl(models.Model):
 class DumpUrl(BaseUrl):
     """Stores the raw dump from the server before deltas are calculated."""
 
+    # unique per collection rather than globally, so the table can be partitioned by collection
+    # (see `manage.py partition_dump_urls`). DeltaUrl urls stay globally unique, and migrating a
+    # dump raises rather than skip a URL that another collection has as a DeltaUrl
+    url = models.CharField("Url")
     collection = models.ForeignKey("Collection", on_delete=models.CASCADE, related_name="dump_urls")
 
+    objects = UrlManager()
+
     class Meta:
         verbose_name = "Dump Urls"
         verbose_name_plural = "Dump Urls"
         ordering = ["url"]
+        unique_together = ("collection", "url")
 
 
 class DeltaUrl(BaseUrl):
     """Urls that are being curated. Only deltas are stored in this model."""
 
     collection = models.ForeignKey("Collection", on_delete=models.CASCADE, related_name="delta_urls")
+    excluded = models.BooleanField(default=False, editable=False, help_text=EXCLUDED_HELP_TEXT)
 
-    objects = DeltaUrlManager()
+    objects = UrlManager()
     to_delete = models.BooleanField(default=False)
 
     class Meta:
         verbose_name = "Delta Urls"
         verbose_name_plural = "Delta Urls"
         ordering = ["url"]
+        indexes = [
+            models.Index(fields=["collection", "url"], condition=models.Q(excluded=False), name="deltaurl_included_idx")
+        ]
 
 
 class CuratedUrl(BaseUrl):
     """Urls that are curated and ready for production"""
 
     collection = models.ForeignKey("Collection", on_delete=models.CASCADE, related_name="curated_urls")
+    excluded = models.BooleanField(default=False, editable=False, help_text=EXCLUDED_HELP_TEXT)
 
-    objects = CuratedUrlManager()
+    objects = UrlManager()
 
     class Meta:
         verbose_name = "Curated Urls"
         verbose_name_plural = "Curated Urls"
         ordering = ["url"]
+        indexes = [
+            models.Index(
+                fields=["collection", "url"], condition=models.Q(excluded=False), name="curatedurl_included_idx"
+            )
+        ]
@@ -10,6 +10,7 @@ from ..utils.title_resolver import (
     parse_title,
     resolve_title,
 )
+from ..utils.url_match import match_pattern_filter
 from .collection_choice_fields import Divisions, DocumentTypes
 
 
@@ -37,13 +38,10 @@ class BaseMatchPattern(models.Model):
 
     def matched_urls(self):
         """Find all the urls matching the pattern."""
-        escaped_match_pattern = re.escape(self.match_pattern)
         if self.match_pattern_type == self.MatchPatternTypeChoices.INDIVIDUAL_URL:
-            return self.collection.candidate_urls.filter(url__regex=f"{escaped_match_pattern}$")
+            return self.collection.candidate_urls.filter(match_pattern_filter(self.match_pattern, individual=True))
         elif self.match_pattern_type == self.MatchPatternTypeChoices.MULTI_URL_PATTERN:
-            return self.collection.candidate_urls.filter(
-                url__regex=escaped_match_pattern.replace(r"\*", ".*")  # allow * wildcards
-            )
+            return self.collection.candidate_urls.filter(match_pattern_filter(self.match_pattern, individual=False))
         else:
             raise NotImplementedError
 
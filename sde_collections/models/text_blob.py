@@ -0,0 +1,73 @@
+import hashlib
+import zlib
+from collections.abc import Iterable
+from functools import cached_property
+
+from django.apps import apps
+from django.db import connection, models, transaction
+
+COMPRESSION_LEVEL = 6
+STORE_BATCH_SIZE = 1000
+
+
+class TextBlobManager(models.Manager["TextBlob"]):
+    def store(self, blobs: Iterable["TextBlob"]) -> None:
+        """Save blobs that aren't stored yet, skipping any whose text is already in the table."""
+        unique_blobs = {blob.hash: blob for blob in blobs}
+        self.bulk_create(unique_blobs.values(), batch_size=STORE_BATCH_SIZE, ignore_conflicts=True)
+        for blob in unique_blobs.values():
+            blob._state.adding = False
+
+    def purge_unreferenced(self) -> int:
+        """Delete blobs no URL references any more, returning how many were deleted."""
+        url_models = [apps.get_model("sde_collections", name) for name in ["DumpUrl", "DeltaUrl", "CuratedUrl"]]
+        table = self.model._meta.db_table
+        unreferenced = " AND ".join(
+            f"NOT EXISTS (SELECT 1 FROM {model._meta.db_table} AS url WHERE url.scraped_text_blob_id = blob.hash)"
+            for model in url_models
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            # blocks writers that are adding blobs, so a blob can't be deleted while a URL is being pointed at it
+            cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute(f"DELETE FROM {table} AS blob WHERE {unreferenced}")
+            return cursor.rowcount
+
+
+class TextBlob(models.Model):
+    """
+    A compressed text, stored once however many URLs hold it and keyed by the SHA-256 of its
+    contents. Copying a URL between the dump, delta and curated tables only copies the key.
+    """
+
+    hash = models.CharField("Hash", max_length=64, primary_key=True, editable=False)
+    data = models.BinaryField("Compressed Text", help_text="The text, UTF-8 encoded and zlib compressed")
+    size = models.PositiveIntegerField("Size", help_text="Length of the uncompressed text in bytes")
+
+    objects = TextBlobManager()
+
+    class Meta:
+        verbose_name = "Text Blob"
+        verbose_name_plural = "Text Blobs"
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    @classmethod
+    def from_text(cls, text: str) -> "TextBlob":
+        """Build an unsaved blob for `text`; `TextBlob.objects.store` saves it unless it already exists."""
+        encoded = text.encode()
+        blob = cls(
+            hash=hashlib.sha256(encoded).hexdigest(),
+            data=zlib.compress(encoded, COMPRESSION_LEVEL),
+            size=len(encoded),
+        )
+        blob.text = text
+        return blob
+
+    @cached_property
+    def text(self) -> str:
+        return zlib.decompress(self.data).decode()
+
+    def __str__(self):
+        return self.hash
@@ -3,11 +3,13 @@ from rest_framework import serializers
 from .models.collection import Collection, WorkflowHistory
 from .models.collection_choice_fields import Divisions, DocumentTypes
 from .models.delta_patterns import (
+    BaseMatchPattern,
     DeltaDivisionPattern,
     DeltaDocumentTypePattern,
     DeltaExcludePattern,
     DeltaIncludePattern,
     DeltaTitlePattern,
+    PatternApplicationJob,
 )
 from .models.delta_url import CuratedUrl, DeltaUrl
 
@@ -55,7 +57,7 @@ class WorkflowHistorySerializer(serializers.ModelSerializer):
 
 
 class DeltaURLSerializer(serializers.ModelSerializer):
-    excluded = serializers.BooleanField(required=False)
+    excluded = serializers.BooleanField(read_only=True)
     document_type_display = serializers.CharField(source="get_document_type_display", read_only=True)
     division_display = serializers.CharField(source="get_division_display", read_only=True)
     url = serializers.CharField(required=False)
@@ -95,7 +97,7 @@ class DeltaURLSerializer(serializers.ModelSerializer):
 
 
 class CuratedURLSerializer(serializers.ModelSerializer):
-    excluded = serializers.BooleanField(required=False)
+    excluded = serializers.BooleanField(read_only=True)
     document_type_display = serializers.CharField(source="get_document_type_display", read_only=True)
     division_display = serializers.CharField(source="get_division_display", read_only=True)
     url = serializers.CharField(required=False)
@@ -230,7 +232,22 @@ class BasePatternSerializer(serializers.ModelSerializer):
     def get_delta_urls_count(self, instance):
         return instance.delta_urls.count()
 
+    def create(self, validated_data):
+        # serializer.save(apply=False) saves the pattern without applying it
+        apply = validated_data.pop("apply", True)
+        instance = self.Meta.model(**validated_data)
+        instance.save(apply=apply)
+        return instance
+
+    def update(self, instance, validated_data):
+        apply = validated_data.pop("apply", True)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(apply=apply)
+        return instance
+
     class Meta:
+        model: type[BaseMatchPattern]
         fields = (
             "id",
             "collection",
@@ -259,17 +276,6 @@ class TitlePatternSerializer(BasePatternSerializer, serializers.ModelSerializer)
         model = DeltaTitlePattern
         fields = BasePatternSerializer.Meta.fields + ("title_pattern",)
 
-    def validate_match_pattern(self, value):
-        try:
-            title_pattern = DeltaTitlePattern.objects.get(
-                match_pattern=value,
-                match_pattern_type=DeltaTitlePattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
-            )
-            title_pattern.delete()
-        except DeltaTitlePattern.DoesNotExist:
-            pass
-        return value
-
 
 class DocumentTypePatternSerializer(BasePatternSerializer, serializers.ModelSerializer):
     document_type_display = serializers.CharField(source="get_document_type_display", read_only=True)
@@ -287,17 +293,6 @@ class DocumentTypePatternSerializer(BasePatternSerializer, serializers.ModelSeri
             "document_type_display",
         )
 
-    def validate_match_pattern(self, value):
-        try:
-            title_pattern = DeltaDocumentTypePattern.objects.get(
-                match_pattern=value,
-                match_pattern_type=DeltaDocumentTypePattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
-            )
-            title_pattern.delete()
-        except DeltaDocumentTypePattern.DoesNotExist:
-            pass
-        return value
-
 
 class DivisionPatternSerializer(BasePatternSerializer, serializers.ModelSerializer):
     division_display = serializers.CharField(source="get_division_display", read_only=True)
@@ -310,13 +305,28 @@ class DivisionPatternSerializer(BasePatternSerializer, serializers.ModelSerializ
             "division_display",
         )
 
-    def validate_match_pattern(self, value):
-        try:
-            division_pattern = DeltaDivisionPattern.objects.get(
-                match_pattern=value,
-                match_pattern_type=DeltaDivisionPattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
-            )
-            division_pattern.delete()
-        except DeltaDivisionPattern.DoesNotExist:
-            pass
-        return value
+
+class PatternApplicationJobSerializer(serializers.ModelSerializer):
+    action_display = serializers.CharField(source="get_action_display", read_only=True)
+    status_display = serializers.CharField(source="get_status_display", read_only=True)
+    pattern_type = serializers.CharField(source="pattern_type.model", read_only=True)
+
+    class Meta:
+        model = PatternApplicationJob
+        fields = (
+            "id",
+            "collection",
+            "pattern_type",
+            "pattern_id",
+            "match_pattern",
+            "action",
+            "action_display",
+            "status",
+            "status_display",
+            "progress",
+            "is_finished",
+            "error",
+            "created_at",
+            "updated_at",
+        )
+        read_only_fields = fields
@@ -1,13 +1,36 @@
 import json
+import math
+import time
+from collections import defaultdict, deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
+from urllib.parse import urlsplit
 
 import requests
 import urllib3
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-server_configs = {
+# connections kept alive per host; raise it when pages are fetched from several threads
+DEFAULT_POOL_SIZE = 10
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 300)
+DEFAULT_RETRIES = 5
+# retries wait backoff_factor * 2 ** (retry - 1) seconds, or what the server asks for in Retry-After
+DEFAULT_BACKOFF_FACTOR = 1
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+QUERY_PAGE_SIZE = 1000
+# search.query pages requested at once from a server, unless its config sets "query_concurrency"
+DEFAULT_QUERY_CONCURRENCY = 4
+
+# rows per engine.sql request when paging through full texts; each row carries a document's whole text
+FULL_TEXT_PAGE_SIZE = 500
+
+server_configs: dict[str, dict[str, Any]] = {
     "dev": {
         "app_name": "nasa-sba-smd",
         "query_name": "query-smd-primary",
@@ -24,6 +47,7 @@ server_configs = {
         "query_name": "query-smd-primary",
         "base_url": "https://sciencediscoveryengine.nasa.gov",
         "index": "sde_index",
+        "query_concurrency": 8,
     },
     "secret_test": {
         "app_name": "nasa-sba-sde",
@@ -57,8 +81,51 @@ server_configs = {
 }
 
 
+class RequestMetrics:
+    """Latency of every request an Api has made, grouped by endpoint."""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.retries: dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, seconds: float, retries: int = 0) -> None:
+        self.latencies[endpoint].append(seconds)
+        self.retries[endpoint] += retries
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Request count, retries, and mean, p95 and max latency in seconds for each endpoint."""
+        summary = {}
+        for endpoint, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            summary[endpoint] = {
+                "count": len(ordered),
+                "retries": self.retries[endpoint],
+                "mean": sum(ordered) / len(ordered),
+                "p95": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+                "max": ordered[-1],
+            }
+        return summary
+
+    def __str__(self) -> str:
+        return ", ".join(
+            f"{endpoint}: {stats['count']} requests, {stats['retries']} retries, "
+            f"mean {stats['mean']:.2f}s, p95 {stats['p95']:.2f}s, max {stats['max']:.2f}s"
+            for endpoint, stats in self.summary().items()
+        )
+
+
 class Api:
-    def __init__(self, server_name: str = None, user: str = None, password: str = None, token: str = None) -> None:
+    def __init__(
+        self,
+        server_name: str = None,
+        user: str = None,
+        password: str = None,
+        token: str = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float | tuple[float, float] = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+    ) -> None:
         self.server_name = server_name
         if server_name not in server_configs:
             raise ValueError(f"Server name '{server_name}' is not in server_configs")
@@ -74,6 +141,38 @@ class Api:
         self._provided_password = password
         self._provided_token = token
 
+        # one session per Api, so paginated calls reuse kept-alive connections instead of a new TLS handshake each
+        self.timeout = timeout
+        self.session = self._build_session(pool_size, retries, backoff_factor)
+        self.metrics = RequestMetrics()
+
+    @staticmethod
+    def _build_session(pool_size: int, retries: int, backoff_factor: float) -> requests.Session:
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            # every endpoint is a read, so retrying POSTs is safe
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.verify = False
+        return session
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "Api":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
     def _get_user(self) -> str | None:
         """Retrieve the user, using the provided value or defaulting to Django settings."""
         return self._provided_user or getattr(settings, f"{self.server_name}_USER".upper(), None)
@@ -98,9 +197,18 @@ class Api:
         raw_data: str | None = None,
     ) -> Any:
         """Sends a POST request and processes the response."""
-        response = requests.post(
-            url, headers=headers, json=payload if raw_data is None else None, data=raw_data, verify=False
+        started = time.perf_counter()
+        response = self.session.post(
+            url, headers=headers, json=payload if raw_data is None else None, data=raw_data, timeout=self.timeout
         )
+        retry_history = getattr(response.raw, "retries", None)
+        # the query string can carry credentials, so only the path is recorded
+        self.metrics.record(
+            urlsplit(url).path,
+            time.perf_counter() - started,
+            retries=len(retry_history.history) if retry_history else 0,
+        )
+
         if response.status_code == requests.codes.ok:
             return response.json()
         else:
@@ -124,7 +232,7 @@ class Api:
                 "name": self.query_name,
                 "text": "",
                 "page": page,
-                "pageSize": 1000,
+                "pageSize": QUERY_PAGE_SIZE,
                 "advanced": {},
             },
         }
@@ -135,6 +243,50 @@ class Api:
 
         return self.process_response(url, payload)
 
+    def iter_query_records(
+        self, collection_config_folder: str | None = None, source: str | None = None, concurrency: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yields every search.query record of a collection, in page order.
+
+        The first page gives the total row count, and the remaining pages are then requested
+        `concurrency` at a time on a thread pool sharing this Api's session, so a large
+        collection costs one round trip per `concurrency` pages instead of one per page.
+        At most `concurrency` pages are held in memory ahead of the consumer.
+        """
+        concurrency = concurrency or self.config.get("query_concurrency", DEFAULT_QUERY_CONCURRENCY)
+
+        first_page = self.query(page=1, collection_config_folder=collection_config_folder, source=source)
+        if not first_page.get("cursorRowCount"):
+            return
+        yield from first_page.get("records", [])
+
+        total_rows = first_page.get("totalRowCount")
+        if total_rows is None:
+            # without a total the page count is unknown, so fall back to paging until an empty page
+            page = 2
+            while (response := self.query(page, collection_config_folder, source)).get("cursorRowCount"):
+                yield from response.get("records", [])
+                page += 1
+            return
+
+        remaining_pages = iter(range(2, math.ceil(total_rows / QUERY_PAGE_SIZE) + 1))
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"sinequa-{self.server_name}")
+        try:
+            in_flight: deque[Future] = deque()
+            for page in remaining_pages:
+                in_flight.append(executor.submit(self.query, page, collection_config_folder, source))
+                if len(in_flight) == concurrency:
+                    break
+            while in_flight:
+                response = in_flight.popleft().result()
+                # keep the window full while the consumer works through this page
+                if (next_page := next(remaining_pages, None)) is not None:
+                    in_flight.append(executor.submit(self.query, next_page, collection_config_folder, source))
+                yield from response.get("records", [])
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def sql_query(self, sql: str) -> Any:
         """Executes an SQL query on the configured server using token-based authentication."""
         token = self._get_token()
@@ -153,28 +305,31 @@ class Api:
 
         return self.process_response(url, headers=headers, raw_data=raw_payload)
 
-    def get_full_texts(self, collection_config_folder: str, source: str = None) -> Any:
+    def get_full_texts(
+        self, collection_config_folder: str, source: str = None, page_size: int = FULL_TEXT_PAGE_SIZE
+    ) -> Iterator[dict[str, str]]:
         """
         Retrieves the full texts, URLs, and titles for a specified collection.
 
-        Returns:
-            dict: A JSON response containing the results of the SQL query,
-                where each item has 'url', 'text', and 'title'.
+        The SQL endpoint is queried one page of `page_size` rows at a time, so only a single page
+        is ever held in memory. Documents are yielded as they are read, and the next page is only
+        requested once the current one has been consumed.
+
+        Yields:
+            dict: One item per document, with 'url', 'full_text', and 'title'.
 
         Example:
-            Calling get_full_texts("example_collection") might return:
-                [
-                    {
-                        'url': 'http://example.com/article1',
-                        'text': 'Here is the full text of the first article...',
-                        'title': 'Article One Title'
-                    },
-                    {
-                        'url': 'http://example.com/article2',
-                        'text': 'Here is the full text of the second article...',
-                        'title': 'Article Two Title'
-                    }
-                ]
+            Iterating over get_full_texts("example_collection") might yield:
+                {
+                    'url': 'http://example.com/article1',
+                    'full_text': 'Here is the full text of the first article...',
+                    'title': 'Article One Title'
+                }
+                {
+                    'url': 'http://example.com/article2',
+                    'full_text': 'Here is the full text of the second article...',
+                    'title': 'Article Two Title'
+                }
         """
 
         if not source:
@@ -183,9 +338,20 @@ class Api:
         if (index := self.config.get("index")) is None:
             raise ValueError("Index not defined for this server")
 
-        sql = f"SELECT url1, text, title FROM {index} WHERE collection = '/{source}/{collection_config_folder}/'"
-        full_text_response = self.sql_query(sql)
-        return self._process_full_text_response(full_text_response)
+        skip = 0
+        while True:
+            # a stable order keeps SKIP/COUNT pages from overlapping
+            sql = (
+                f"SELECT url1, text, title FROM {index} WHERE collection = '/{source}/{collection_config_folder}/' "
+                f"ORDER BY id SKIP {skip} COUNT {page_size}"
+            )
+            full_text_response = self.sql_query(sql)
+            page = self._process_full_text_response(full_text_response)
+            yield from page
+
+            if len(page) < page_size:
+                break
+            skip += page_size
 
     @staticmethod
     def _process_full_text_response(full_text_response: str):
@@ -1,23 +1,28 @@
 import json
-import os
-import shutil
+import tempfile
+import time
+from collections.abc import Iterable, Iterator
+from typing import IO
 
 import boto3
 from django.apps import apps
 from django.conf import settings
-from django.core import management
-from django.core.management.commands import loaddata
-from django.db import IntegrityError
+from django.db import transaction
 
 from config import celery_app
 
 from .models.collection import Collection, WorkflowStatusChoices
 from .models.delta_url import DumpUrl
 from .sinequa_api import Api
+from .utils.bulk_load import copy_urls
 from .utils.github_helper import GitHubHandler
 
+# DumpUrl fields filled from Sinequa records
+DUMP_FIELDS = ["url", "scraped_title", "scraped_text"]
+
 
 def _get_data_to_import(collection, server_name):
+    """Yields the url and scraped_title of every record Sinequa has for the collection, as they are fetched."""
     # ignore these because they are API collections and don't have URLs
     ignore_collections = [
         "/SMD/ASTRO_NAVO_HEASARC/",
@@ -29,68 +34,77 @@ def _get_data_to_import(collection, server_name):
         "/SMD/PDS_API_Legacy_All/",
     ]
 
-    data_to_import = []
-    api = Api(server_name=server_name)
-    page = 1
-    while True:
-        print(f"Getting page: {page}")
-        response = api.query(page=page, collection_config_folder=collection.config_folder)
-        if response["cursorRowCount"] == 0:
-            break
-
-        for record in response.get("records", []):
-            full_collection_name = record.get("collection")[0]
+    with Api(server_name=server_name) as api:
+        for record in api.iter_query_records(collection_config_folder=collection.config_folder):
+            full_collection_name = record["collection"][0]
             if full_collection_name in ignore_collections:
                 continue
 
             url = record.get("download_url")
-            title = record.get("title", "")
-            collection_pk = collection.pk
-
             if not url:
                 continue
 
-            augmented_data = {
-                "model": "sde_collections.url",
-                "fields": {
-                    "collection": collection_pk,
-                    "url": url,
-                    "scraped_title": title,
-                },
-            }
+            yield {"url": url, "scraped_title": record.get("title", "")}
+        print(f"Sinequa requests: {api.metrics}")
 
-            data_to_import.append(augmented_data)
-        page += 1
-    return data_to_import
 
+def _spool_records(records: Iterable[dict]) -> IO[bytes]:
+    """
+    Write `records` to a temporary file, one JSON line each, as they are fetched. Downloading
+    this way holds no database transaction open, and memory doesn't grow with the records.
+    Returns the file, rewound; it is deleted once closed.
+    """
+    spool = tempfile.TemporaryFile()
+    try:
+        for record in records:
+            spool.write(json.dumps(record).encode() + b"\n")
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
 
-@celery_app.task(soft_time_limit=10000)
-def import_candidate_urls_from_api(server_name="test", collection_ids=[]):
-    TEMP_FOLDER_NAME = "temp"
-    os.makedirs(TEMP_FOLDER_NAME, exist_ok=True)
 
-    collections = Collection.objects.filter(id__in=collection_ids)
+def _read_spool(spool: IO[bytes]) -> Iterator[dict]:
+    for line in spool:
+        yield json.loads(line)
 
-    for collection in collections:
-        urls_file = f"{TEMP_FOLDER_NAME}/{collection.config_folder}.json"
 
-        print("Getting responses from API")
-        data_to_import = _get_data_to_import(server_name=server_name, collection=collection)
-        print(f"Got {len(data_to_import)} records for {collection.config_folder}")
+def _replace_dump_urls(collection, records) -> int:
+    """
+    Replace the collection's DumpUrls with `records`, dicts of DumpUrl field values, streaming them
+    into the table with COPY so the records never have to be held in memory at once. URLs that
+    already exist are skipped. Returns the number of records read.
+    """
+    collection.clear_dump_urls()
 
-        print("Dumping django fixture to file")
-        json.dump(data_to_import, open(urls_file, "w"))
+    started = time.perf_counter()
+    counts = copy_urls(DumpUrl, collection, records, fields=DUMP_FIELDS)
+    elapsed = time.perf_counter() - started
 
-        print("Deleting existing candidate URLs")
-        # this sometimes takes a while
-        collection.candidate_urls.all().delete()
+    rows_per_second = counts["rows"] / elapsed if elapsed else 0
+    print(
+        f"Processed {counts['created']} new records in {elapsed:.1f}s ({rows_per_second:,.0f} rows/sec), "
+        f"skipped {counts['skipped']} duplicate URLs."
+    )
+    return counts["rows"]
 
-        print("Loading fixture; this may take a while")
-        # subprocess.call(f'python manage.py loaddata "{urls_file}"', shell=True)
-        management.call_command(loaddata.Command(), urls_file)
 
-        print("Applying existing patterns; this may take a while")
-        collection.apply_all_patterns()
+@celery_app.task(soft_time_limit=10000)
+def import_candidate_urls_from_api(server_name="test", collection_ids=[]):
+    collections = Collection.objects.filter(id__in=collection_ids)
+
+    for collection in collections:
+        print(f"Importing URLs for {collection.config_folder}; this may take a while")
+        # the records are downloaded before any transaction is opened. The DumpUrls are then replaced
+        # and migrated in one transaction, so a failed import leaves the collection as it was and
+        # curators never see a partially imported collection
+        with _spool_records(_get_data_to_import(collection, server_name)) as spool, transaction.atomic():
+            record_count = _replace_dump_urls(collection, _read_spool(spool))
+            print(f"Got {record_count} records for {collection.config_folder}")
+
+            print("Migrating to DeltaUrls and applying existing patterns")
+            collection.migrate_dump_to_delta()
 
         if collection.workflow_status == WorkflowStatusChoices.READY_FOR_ENGINEERING:
             collection.workflow_status = WorkflowStatusChoices.ENGINEERING_IN_PROGRESS
@@ -100,9 +114,6 @@ def import_candidate_urls_from_api(server_name="test", collection_ids=[]):
         collection.workflow_status = WorkflowStatusChoices.READY_FOR_CURATION
         collection.save()
 
-    print("Deleting temp files")
-    shutil.rmtree(TEMP_FOLDER_NAME)
-
 
 @celery_app.task()
 def push_to_github_task(collection_ids):
@@ -145,6 +156,13 @@ def resolve_title_pattern(title_pattern_id):
     title_pattern.apply()
 
 
+@celery_app.task(soft_time_limit=3600, time_limit=3660)
+def run_pattern_application_job(job_id):
+    PatternApplicationJob = apps.get_model("sde_collections", "PatternApplicationJob")
+    job = PatternApplicationJob.objects.get(id=job_id)
+    job.run()
+
+
 @celery_app.task
 def fetch_and_replace_full_text(collection_id, server_name):
     """
@@ -152,6 +170,11 @@ def fetch_and_replace_full_text(collection_id, server_name):
     from a given server. This task deletes all existing DumpUrl entries for the collection and creates
     new entries based on the latest fetched data.
 
+    Documents are streamed from the server a page at a time into a temporary file, so memory use
+    doesn't grow with the size of the collection and no transaction is held open while they download.
+    They are then loaded in one transaction with the migration to DeltaUrls, so the replacement is
+    atomic. URLs that already exist are skipped.
+
     Args:
         collection_id (int): The identifier for the collection in the database.
         server_name (str): The name of the server.
@@ -160,29 +183,20 @@ def fetch_and_replace_full_text(collection_id, server_name):
         str: A message indicating the result of the operation, including the number of URLs processed.
     """
     collection = Collection.objects.get(id=collection_id)
-    api = Api(server_name)
-    documents = api.get_full_texts(collection.config_folder)
-
-    # Step 1: Delete all existing DumpUrl entries for the collection
-    deleted_count, _ = DumpUrl.objects.filter(collection=collection).delete()
-
-    # Step 2: Create new DumpUrl entries from the fetched documents
-    processed_count = 0
-    for doc in documents:
-        try:
-            DumpUrl.objects.create(
-                url=doc["url"],
-                collection=collection,
-                scraped_text=doc.get("full_text", ""),
-                scraped_title=doc.get("title", ""),
-            )
-            processed_count += 1
-        except IntegrityError:
-            # Handle duplicate URL case if needed
-            print(f"Duplicate URL found, skipping: {doc['url']}")
-
-    collection.migrate_dump_to_delta()
-
-    print(f"Processed {processed_count} new records.")
-
-    return f"Successfully processed {len(documents)} records and updated the database."
+
+    # Step 1: Download the documents, without holding a database transaction open
+    with Api(server_name) as api:
+        spool = _spool_records(
+            {"url": doc["url"], "scraped_text": doc.get("full_text") or "", "scraped_title": doc.get("title") or ""}
+            for doc in api.get_full_texts(collection.config_folder)
+        )
+        print(f"Sinequa requests: {api.metrics}")
+
+    with spool, transaction.atomic():
+        # Step 2: Replace all existing DumpUrl entries for the collection with the fetched documents
+        record_count = _replace_dump_urls(collection, _read_spool(spool))
+
+        # Step 3: Migrate the DumpUrls to DeltaUrls
+        collection.migrate_dump_to_delta()
+
+    return f"Successfully processed {record_count} records and updated the database."
@@ -0,0 +1,97 @@
+"""
+A local web server serving HTML pages, for testing xpath title resolution against real HTTP.
+
+`pages` maps a path to its HTML; any other path is a 404. Pages are sent with an ETag, or with
+a Last-Modified when `last_modified` is set, and conditional requests for an unchanged page are
+answered with a 304. Set `delay` to simulate round-trip latency.
+"""
+
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class FakePagesHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive between requests
+    protocol_version = "HTTP/1.1"
+    server: "FakePagesServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            self._handle()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _handle(self):
+        server = self.server
+        page = server.pages.get(self.path)
+        if page is None:
+            self._respond(404, b"Not found", {})
+            return
+
+        content = page.encode()
+        if server.last_modified:
+            validators = {"Last-Modified": LAST_MODIFIED}
+            unchanged = self.headers.get("If-Modified-Since") == LAST_MODIFIED
+        else:
+            validators = {"ETag": f'"{hashlib.md5(content).hexdigest()}"'}
+            unchanged = self.headers.get("If-None-Match") == validators["ETag"]
+
+        if unchanged:
+            with server.lock:
+                server.not_modified += 1
+            self._respond(304, b"", validators)
+        else:
+            self._respond(200, content, validators)
+
+    def _respond(self, status, content, headers):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class FakePagesServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages=None, delay=0, last_modified=False):
+        super().__init__(("127.0.0.1", 0), FakePagesHandler)
+        self.pages: dict[str, str] = pages or {}
+        self.last_modified = last_modified
+        self.requests: list[tuple[str, dict]] = []
+        self.connections: set[tuple[str, int]] = set()
+        self.not_modified = 0
+        # seconds every request takes, and the most requests that were being handled at once
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
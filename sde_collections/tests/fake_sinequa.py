@@ -0,0 +1,95 @@
+"""
+A local stand-in for the Sinequa search.query and engine.sql endpoints, for testing Api against a
+real HTTP server.
+
+Records are served for whichever collection a request asks for. Queue status codes in `failures`
+to make the next requests fail before they are answered normally, and set `delay` to simulate
+round-trip latency.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeSinequaHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive between requests
+    protocol_version = "HTTP/1.1"
+    server: "FakeSinequaServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            server.requests.append((self.path, body))
+            server.connections.add(self.client_address)
+            status = server.failures.pop(0) if server.failures else 200
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            self._handle(status, body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _handle(self, status, body):
+        server = self.server
+
+        if status != 200:
+            self._respond(status, {"ErrorCode": status})
+        elif self.path.startswith("/api/v1/search.query"):
+            self._respond(200, self._search_page(body["query"]))
+        elif self.path.startswith("/api/v1/engine.sql"):
+            self._respond(200, {"Rows": server.rows})
+        else:
+            self._respond(404, {})
+
+    def _search_page(self, query):
+        start = (query["page"] - 1) * query["pageSize"]
+        end = start + query["pageSize"]
+        records = self.server.records[start:end]
+        return {"totalRowCount": len(self.server.records), "cursorRowCount": len(records), "records": records}
+
+    def _respond(self, status, payload):
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class FakeSinequaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, records=None, rows=None, delay=0):
+        super().__init__(("127.0.0.1", 0), FakeSinequaHandler)
+        self.records = records or []
+        self.rows = rows or []
+        self.failures: list[int] = []
+        self.requests: list[tuple[str, dict]] = []
+        self.connections: set[tuple[str, int]] = set()
+        # seconds every request takes, and the most requests that were being handled at once
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,115 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_bulk_load.py
+
+import pytest
+from rest_framework.test import APIRequestFactory
+
+from sde_collections.models.collection_choice_fields import DocumentTypes
+from sde_collections.models.delta_url import CuratedUrl, DeltaUrl, DumpUrl
+from sde_collections.tests.factories import CollectionFactory, DeltaUrlFactory
+from sde_collections.utils.bulk_load import ON_CONFLICT_UPDATE, copy_urls
+from sde_collections.views import DeltaURLBulkCreateView
+
+
+@pytest.mark.django_db
+class TestCopyUrls:
+    def setup_method(self):
+        self.collection = CollectionFactory()
+
+    def test_streams_rows_and_escapes_copy_format(self):
+        text = "tabs\there,\nnewlines,\\backslashes\\N and \r returns"
+        rows = ({"url": f"https://example.com/{index}", "scraped_text": text} for index in range(3))
+
+        counts = copy_urls(DumpUrl, self.collection, rows, fields=["url", "scraped_title", "scraped_text"])
+
+        assert counts == {"rows": 3, "created": 3, "updated": 0, "skipped": 0}
+        dump_url = DumpUrl.objects.get(url="https://example.com/1")
+        assert dump_url.scraped_text == text
+        assert dump_url.scraped_title == ""
+        assert dump_url.content_hash == dump_url.compute_content_hash()
+
+    def test_fills_unloaded_fields_with_model_defaults(self):
+        copy_urls(DeltaUrl, self.collection, [{"url": "https://example.com/a", "document_type": None}], fields=["url"])
+
+        delta_url = DeltaUrl.objects.get(url="https://example.com/a")
+        assert delta_url.collection == self.collection
+        assert delta_url.to_delete is False
+        assert delta_url.scraped_text == ""
+        assert delta_url.document_type is None
+
+    def test_skips_duplicate_and_existing_urls(self):
+        other_collection = CollectionFactory()
+        CuratedUrl.objects.create(collection=other_collection, url="https://example.com/taken", scraped_title="Kept")
+        rows = [
+            {"url": "https://example.com/a", "scraped_title": "First"},
+            {"url": "https://example.com/a", "scraped_title": "Second"},
+            {"url": "https://example.com/taken", "scraped_title": "Ignored"},
+        ]
+
+        counts = copy_urls(CuratedUrl, self.collection, rows, fields=["url", "scraped_title"])
+
+        assert counts == {"rows": 3, "created": 1, "updated": 0, "skipped": 2}
+        assert CuratedUrl.objects.get(url="https://example.com/a").scraped_title == "First"
+        assert CuratedUrl.objects.get(url="https://example.com/taken").collection == other_collection
+
+    def test_update_overwrites_only_same_collection(self):
+        other_collection = CollectionFactory()
+        DeltaUrl.objects.create(collection=self.collection, url="https://example.com/mine", scraped_title="Old")
+        DeltaUrl.objects.create(collection=other_collection, url="https://example.com/theirs", scraped_title="Old")
+        rows = [
+            {"url": "https://example.com/mine", "scraped_title": "New", "document_type": DocumentTypes.DATA},
+            {"url": "https://example.com/theirs", "scraped_title": "New", "document_type": DocumentTypes.DATA},
+        ]
+
+        counts = copy_urls(
+            DeltaUrl,
+            self.collection,
+            rows,
+            fields=["url", "scraped_title", "document_type"],
+            on_conflict=ON_CONFLICT_UPDATE,
+        )
+
+        assert counts == {"rows": 2, "created": 0, "updated": 1, "skipped": 1}
+        mine = DeltaUrl.objects.get(url="https://example.com/mine")
+        assert (mine.scraped_title, mine.document_type) == ("New", DocumentTypes.DATA)
+        assert DeltaUrl.objects.get(url="https://example.com/theirs").scraped_title == "Old"
+
+    def test_can_run_twice_in_one_transaction(self, django_assert_max_num_queries):
+        with django_assert_max_num_queries(8):
+            copy_urls(DumpUrl, self.collection, [{"url": "https://example.com/1"}], fields=["url"])
+        copy_urls(DumpUrl, self.collection, [{"url": "https://example.com/2"}], fields=["url"])
+
+        assert DumpUrl.objects.filter(collection=self.collection).count() == 2
+
+
+@pytest.mark.django_db
+class TestDeltaUrlBulkCreateView:
+    def setup_method(self):
+        self.collection = CollectionFactory()
+        self.delta_url = DeltaUrlFactory(collection=self.collection, url="https://example.com/old")
+
+    def post(self, rows):
+        request = APIRequestFactory().post("/", rows, format="json")
+        return DeltaURLBulkCreateView.as_view()(request, config_folder=self.collection.config_folder)
+
+    def test_replaces_the_collections_delta_urls(self):
+        response = self.post([{"url": "https://example.com/a", "scraped_title": "A"}])
+
+        assert response.status_code == 201
+        assert list(DeltaUrl.objects.filter(collection=self.collection).values_list("url", flat=True)) == [
+            "https://example.com/a"
+        ]
+
+    def test_rejects_urls_of_other_collections(self):
+        DeltaUrlFactory(collection=CollectionFactory(), url="https://example.com/taken")
+
+        response = self.post([{"url": "https://example.com/a"}, {"url": "https://example.com/taken"}])
+
+        # the serializer's unique validator rejects them before anything is copied
+        assert response.status_code == 400
+        assert response.data["error"][1]["url"][0].code == "unique"
+
+    def test_rejects_rows_that_would_be_skipped(self):
+        response = self.post([{"url": "https://example.com/a"}, {"url": "https://example.com/a"}])
+
+        assert response.status_code == 400
+        assert "1 of the posted URLs" in str(response.data)
@@ -0,0 +1,79 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_content_hash.py
+
+import pytest
+
+from sde_collections.models.collection_choice_fields import Divisions, DocumentTypes
+from sde_collections.models.delta_url import CuratedUrl, DeltaUrl, DumpUrl
+from sde_collections.tests.factories import (
+    CollectionFactory,
+    CuratedUrlFactory,
+    DeltaUrlFactory,
+    DumpUrlFactory,
+)
+
+
+@pytest.mark.django_db
+class TestContentHash:
+    def setup_method(self):
+        self.collection = CollectionFactory()
+
+    @pytest.mark.parametrize(
+        "fields",
+        [
+            {"scraped_title": "Title", "scraped_text": "Text", "document_type": None, "division": None},
+            {"scraped_title": "Tïtle ✓", "generated_title": "Generated", "document_type": DocumentTypes.DATA},
+            {"scraped_title": "", "scraped_text": "", "division": Divisions.EARTH_SCIENCE},
+        ],
+    )
+    def test_database_hash_matches_python_hash(self, fields):
+        delta_url = DeltaUrlFactory(collection=self.collection, **fields)
+        in_memory_hash = delta_url.content_hash
+
+        delta_url.refresh_from_db()
+        assert delta_url.content_hash == in_memory_hash == delta_url.compute_content_hash()
+
+    def test_hash_is_maintained_on_bulk_writes(self):
+        DumpUrl.objects.bulk_create([DumpUrl(collection=self.collection, url="https://example.com/bulk")])
+        dump_url = DumpUrl.objects.get(url="https://example.com/bulk")
+        assert dump_url.content_hash == dump_url.compute_content_hash()
+
+        DumpUrl.objects.filter(pk=dump_url.pk).update(scraped_title="Updated")
+        dump_url.refresh_from_db()
+        assert dump_url.content_hash == dump_url.compute_content_hash()
+
+    def test_same_content_has_same_hash_across_tables(self):
+        fields = {
+            "scraped_title": "Title",
+            "scraped_text": "Text",
+            "generated_title": "Generated",
+            "document_type": DocumentTypes.DATA,
+            "division": None,
+        }
+        dump_url = DumpUrlFactory(collection=self.collection, url="https://example.com/dump", **fields)
+        curated_url = CuratedUrlFactory(collection=self.collection, url="https://example.com/curated", **fields)
+        assert dump_url.content_hash == curated_url.content_hash
+
+        CuratedUrl.objects.filter(pk=curated_url.pk).update(visited=True)
+        curated_url.refresh_from_db()
+        assert dump_url.content_hash == curated_url.content_hash
+
+        CuratedUrl.objects.filter(pk=curated_url.pk).update(division=Divisions.HELIOPHYSICS)
+        curated_url.refresh_from_db()
+        assert dump_url.content_hash != curated_url.content_hash
+
+    def test_content_matches_compares_visited(self):
+        DeltaUrlFactory(collection=self.collection, url="https://example.com/a", visited=False)
+        CuratedUrlFactory(collection=self.collection, url="https://example.com/a", visited=False)
+        delta_url = DeltaUrl.objects.get(url="https://example.com/a")
+        curated_url = CuratedUrl.objects.get(url="https://example.com/a")
+        curated_url.scraped_title = delta_url.scraped_title
+        curated_url.scraped_text = delta_url.scraped_text
+        curated_url.generated_title = delta_url.generated_title
+        curated_url.document_type = delta_url.document_type
+        curated_url.division = delta_url.division
+        curated_url.save()
+
+        assert delta_url.content_matches(curated_url)
+
+        curated_url.visited = True
+        assert not delta_url.content_matches(curated_url)
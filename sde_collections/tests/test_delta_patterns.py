@@ -73,6 +73,27 @@ class TestBaseMatchPattern:
         # Delta URL should be gone since it was only created for exclusion
         assert not DeltaUrl.objects.filter(url=curated_url.url).exists()
 
+    def test_update_affected_urls_list_reports_diff(self):
+        """Membership updates are diffed in SQL and report how many rows changed."""
+        collection = CollectionFactory()
+        DeltaUrlFactory(collection=collection, url="https://example.com/docs/1")
+        DeltaUrlFactory(collection=collection, url="https://example.com/docs/2")
+        pattern = DeltaExcludePattern.objects.create(
+            collection=collection, match_pattern="*docs*", match_pattern_type=2
+        )
+        assert pattern.delta_urls.count() == 2
+
+        # nothing changed, so nothing is written
+        assert pattern.update_affected_delta_urls_list() == (0, 0)
+
+        DeltaUrl.objects.filter(url="https://example.com/docs/1").update(url="https://example.com/other/1")
+        DeltaUrlFactory(collection=collection, url="https://example.com/docs/3")
+        assert pattern.update_affected_delta_urls_list() == (1, 1)
+        assert set(pattern.delta_urls.values_list("url", flat=True)) == {
+            "https://example.com/docs/2",
+            "https://example.com/docs/3",
+        }
+
     def test_different_collections_isolation(self):
         """Test that patterns only affect URLs in their collection."""
         collection1 = CollectionFactory()
@@ -0,0 +1,60 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_excluded_column.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from sde_collections.models.delta_patterns import (
+    DeltaExcludePattern,
+    DeltaIncludePattern,
+)
+from sde_collections.models.delta_url import CuratedUrl, DeltaUrl
+from sde_collections.tests.factories import (
+    CollectionFactory,
+    CuratedUrlFactory,
+    DeltaUrlFactory,
+)
+
+
+@pytest.mark.django_db
+class TestExcludedColumn:
+    def setup_method(self):
+        self.collection = CollectionFactory()
+
+    def test_follows_exclude_and_include_patterns(self):
+        delta_url = DeltaUrlFactory(collection=self.collection, url="https://example.com/docs/page")
+
+        exclude = DeltaExcludePattern.objects.create(collection=self.collection, match_pattern=delta_url.url)
+        assert DeltaUrl.objects.get(pk=delta_url.pk).excluded is True
+
+        include = DeltaIncludePattern.objects.create(collection=self.collection, match_pattern=delta_url.url)
+        assert DeltaUrl.objects.get(pk=delta_url.pk).excluded is False
+
+        include.delete()
+        assert DeltaUrl.objects.get(pk=delta_url.pk).excluded is True
+
+        exclude.delete()
+        assert not DeltaUrl.objects.filter(excluded=True).exists()
+
+    def test_follows_bulk_membership_writes(self):
+        curated_urls = [
+            CuratedUrlFactory(collection=self.collection, url=f"https://example.com/{index}") for index in range(3)
+        ]
+        pattern = DeltaExcludePattern.objects.create(collection=self.collection, match_pattern="https://other.com/")
+        through = DeltaExcludePattern.curated_urls.through
+
+        through.objects.bulk_create(
+            [through(deltaexcludepattern=pattern, curatedurl=curated_url) for curated_url in curated_urls]
+        )
+        assert CuratedUrl.objects.filter(excluded=True).count() == 3
+
+        through.objects.filter(curatedurl__in=curated_urls[:2]).delete()
+        assert list(CuratedUrl.objects.filter(excluded=True).values_list("url", flat=True)) == ["https://example.com/2"]
+
+    def test_included_urls_query_has_no_subquery(self):
+        DeltaUrlFactory(collection=self.collection)
+
+        with CaptureQueriesContext(connection) as queries:
+            list(DeltaUrl.objects.filter(collection=self.collection, excluded=False))
+
+        assert "EXISTS" not in queries[0]["sql"]
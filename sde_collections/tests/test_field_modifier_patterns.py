@@ -2,8 +2,9 @@
 
 import pytest
 from django.contrib.contenttypes.models import ContentType
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from sde_collections.models.collection_choice_fields import Divisions, DocumentTypes
 from sde_collections.models.delta_patterns import (
@@ -457,6 +458,32 @@ class TestFieldModifierDeltaCleanup(TestCase):
         new_delta = DeltaUrl.objects.get(url=curated_url.url)
         assert new_delta.division is None
 
+    def test_pattern_removal_query_count_does_not_grow_with_urls(self):
+        """Unapply writes in bulk, so removing a pattern costs the same queries for 2 or 20 URLs."""
+
+        def queries_to_remove_pattern(url_count: int) -> int:
+            prefix = f"https://example.com/{url_count}"
+            for index in range(url_count):
+                CuratedUrlFactory(
+                    collection=self.collection, url=f"{prefix}/curated/{index}", division=Divisions.GENERAL
+                )
+                DeltaUrlFactory(collection=self.collection, url=f"{prefix}/delta/{index}", division=Divisions.GENERAL)
+            pattern = DeltaDivisionPattern.objects.create(
+                collection=self.collection,
+                match_pattern=f"{prefix}/*",
+                match_pattern_type=DeltaDivisionPattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+                division=Divisions.ASTROPHYSICS,
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                pattern.delete()
+            # deltas of new URLs are left with a NULL division, those of curated URLs are redundant
+            assert DeltaUrl.objects.filter(url__startswith=f"{prefix}/delta", division=None).count() == url_count
+            assert not DeltaUrl.objects.filter(url__startswith=f"{prefix}/curated").exists()
+            return len(queries)
+
+        assert queries_to_remove_pattern(2) == queries_to_remove_pattern(20)
+
     # def test_pattern_removal_with_multiple_patterns(self):
     #     """
     #     Test that removing one pattern doesn't NULL the field if other
@@ -0,0 +1,91 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_import_candidate_urls.py
+
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+
+from sde_collections.models.collection import Collection
+from sde_collections.models.collection_choice_fields import WorkflowStatusChoices
+from sde_collections.models.delta_patterns import DeltaExcludePattern
+from sde_collections.models.delta_url import DeltaUrl, DumpUrl
+from sde_collections.tasks import import_candidate_urls_from_api
+from sde_collections.tests.factories import CollectionFactory, DeltaUrlFactory
+
+
+def _collection_ready_for_curation():
+    # set through the queryset so the status change doesn't try to write configs to GitHub
+    collection = CollectionFactory()
+    Collection.objects.filter(pk=collection.pk).update(workflow_status=WorkflowStatusChoices.READY_FOR_CURATION)
+    return collection
+
+
+def _records(collection, count):
+    for index in range(count):
+        yield {
+            "collection": [f"/SDE/{collection.config_folder}/"],
+            "download_url": f"https://example.com/{collection.id}/{index}",
+            "title": f"Title {index}",
+        }
+
+
+@pytest.mark.django_db
+def test_import_streams_records_into_delta_urls():
+    collection = _collection_ready_for_curation()
+    DeltaExcludePattern.objects.create(
+        collection=collection, match_pattern=f"https://example.com/{collection.id}/3", match_pattern_type=1
+    )
+    records = [
+        *_records(collection, 12),
+        {"collection": ["/SMD/CMR_API/"], "download_url": "https://cmr.example.com/1", "title": "API"},
+        {"collection": [f"/SDE/{collection.config_folder}/"], "download_url": "", "title": "No URL"},
+    ]
+
+    with patch("sde_collections.sinequa_api.Api.iter_query_records", return_value=iter(records)):
+        import_candidate_urls_from_api("test", [collection.id])
+
+    assert not DumpUrl.objects.filter(collection=collection).exists()
+    delta_urls = DeltaUrl.objects.filter(collection=collection)
+    assert delta_urls.count() == 12
+    assert delta_urls.get(url=f"https://example.com/{collection.id}/7").scraped_title == "Title 7"
+    assert delta_urls.get(url=f"https://example.com/{collection.id}/3").excluded is True
+
+
+@pytest.mark.django_db
+def test_failed_import_leaves_collection_untouched():
+    collection = _collection_ready_for_curation()
+    existing = DeltaUrlFactory(collection=collection, url="https://example.com/existing")
+
+    def failing_records(**kwargs):
+        yield from _records(collection, 8)
+        raise ConnectionError("Sinequa went away")
+
+    with patch("sde_collections.sinequa_api.Api.iter_query_records", side_effect=failing_records), pytest.raises(
+        ConnectionError
+    ):
+        import_candidate_urls_from_api("test", [collection.id])
+
+    assert not DumpUrl.objects.filter(collection=collection).exists()
+    assert list(DeltaUrl.objects.filter(collection=collection).values_list("id", flat=True)) == [existing.id]
+
+
+@pytest.mark.django_db
+def test_records_are_downloaded_outside_a_transaction():
+    collection = _collection_ready_for_curation()
+    # the savepoints of the test's own transaction, which an atomic block opened by the import would add to
+    test_savepoints = list(connection.savepoint_ids)
+    savepoints_while_downloading = []
+
+    def records(**kwargs):
+        for record in _records(collection, 3):
+            savepoints_while_downloading.append(list(connection.savepoint_ids))
+            yield record
+
+    with patch("sde_collections.sinequa_api.Api.iter_query_records", side_effect=records), patch(
+        "sde_collections.sinequa_api.Api.close"
+    ) as close:
+        import_candidate_urls_from_api("test", [collection.id])
+
+    assert savepoints_while_downloading == [test_savepoints] * 3
+    assert DeltaUrl.objects.filter(collection=collection).count() == 3
+    close.assert_called_once()
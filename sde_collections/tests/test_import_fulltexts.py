@@ -5,6 +5,8 @@ from unittest.mock import patch
 import pytest
 
 from sde_collections.models.delta_url import CuratedUrl, DeltaUrl, DumpUrl
+from sde_collections.models.text_blob import TextBlob
+from sde_collections.sinequa_api import Api
 from sde_collections.tasks import fetch_and_replace_full_text
 from sde_collections.tests.factories import CollectionFactory
 
@@ -36,7 +38,52 @@ def test_fetch_and_replace_full_text():
                 DeltaUrl.objects.filter(collection=collection)
                 .filter(
                     url=doc["url"],
-                    scraped_text=doc["full_text"],
+                    scraped_text_blob=TextBlob.hash_text(doc["full_text"]),
                 )
                 .exists()
             )
+
+
+def test_get_full_texts_pages_through_sql_endpoint():
+    rows = [[f"http://example.com/{index}", f"Text {index}", f"Title {index}"] for index in range(5)]
+    queries = []
+
+    def sql_query(sql):
+        queries.append(sql)
+        skip = int(sql.split("SKIP ")[1].split()[0])
+        end = skip + 2
+        return {"Rows": rows[skip:end]}
+
+    api = Api("lrm_dev", token="token")
+    with patch.object(api, "sql_query", side_effect=sql_query):
+        documents = api.get_full_texts("example_collection", page_size=2)
+
+        # nothing is requested until the documents are consumed
+        assert queries == []
+        assert [doc["url"] for doc in documents] == [row[0] for row in rows]
+
+    assert len(queries) == 3
+    assert all("COUNT 2" in sql for sql in queries)
+
+
+@pytest.mark.django_db
+def test_fetch_and_replace_full_text_skips_duplicates(django_assert_max_num_queries):
+    collection = CollectionFactory()
+    DumpUrl.objects.create(collection=collection, url="http://example.com/stale")
+    mock_documents = [
+        {"url": f"http://example.com/{index % 30}", "full_text": f"Text {index}", "title": None} for index in range(40)
+    ]
+
+    with patch("sde_collections.sinequa_api.Api.get_full_texts") as mock_get_full_texts, patch(
+        "sde_collections.models.collection.Collection.migrate_dump_to_delta"
+    ):
+        mock_get_full_texts.return_value = iter(mock_documents)
+
+        with django_assert_max_num_queries(10):
+            fetch_and_replace_full_text(collection.id, "lrm_dev")
+
+    dump_urls = DumpUrl.objects.filter(collection=collection)
+    assert dump_urls.count() == 30
+    assert not dump_urls.filter(url="http://example.com/stale").exists()
+    assert dump_urls.get(url="http://example.com/5").scraped_text == "Text 5"
+    assert dump_urls.get(url="http://example.com/5").scraped_title == ""
@@ -0,0 +1,25 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_merge_join.py
+
+from sde_collections.utils.merge_join import left_merge_join
+
+
+def test_left_merge_join_pairs_matching_keys():
+    left = ["a", "c", "d", "f"]
+    right = ["b", "c", "e", "f", "g"]
+
+    assert list(left_merge_join(left, right, key=str)) == [("a", None), ("c", "c"), ("d", None), ("f", "f")]
+
+
+def test_left_merge_join_consumes_inputs_lazily():
+    consumed = []
+
+    def right():
+        for item in range(0, 100, 2):
+            consumed.append(item)
+            yield item
+
+    pairs = left_merge_join(iter([1, 2, 3]), right(), key=lambda item: item)
+
+    assert next(pairs) == (1, None)
+    assert next(pairs) == (2, 2)
+    assert consumed == [0, 2]
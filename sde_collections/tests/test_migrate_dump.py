@@ -2,6 +2,7 @@
 # docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_migrate_dump.py
 
 import pytest
+from django.db import IntegrityError
 
 from sde_collections.models.collection_choice_fields import DocumentTypes
 from sde_collections.models.delta_patterns import (
@@ -120,6 +121,20 @@ class TestMigrateDumpToDelta:
         assert delta.scraped_title == ""
         assert delta.to_delete is False
 
+    def test_url_with_a_delta_in_another_collection_is_not_dropped(self):
+        collection = CollectionFactory()
+        other_delta = DeltaUrlFactory(collection=CollectionFactory(), scraped_title="Other")
+        DumpUrlFactory(collection=collection, url=other_delta.url)
+        DumpUrlFactory(collection=collection)
+
+        with pytest.raises(IntegrityError, match=other_delta.url):
+            collection.migrate_dump_to_delta()
+
+        # the migration is rolled back, keeping the dump to migrate once the conflict is resolved
+        assert DumpUrl.objects.filter(collection=collection).count() == 2
+        assert not DeltaUrl.objects.filter(collection=collection).exists()
+        assert DeltaUrl.objects.get(pk=other_delta.pk).scraped_title == "Other"
+
 
 @pytest.mark.django_db
 class TestMigrationIdempotency:
@@ -1,7 +1,9 @@
 # docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_migration.py
 
 import pytest
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from sde_collections.models.collection_choice_fields import Divisions, DocumentTypes
 from sde_collections.models.delta_patterns import (
@@ -262,3 +264,106 @@ class TestMigrateDumpToDelta(TestCase):
 
         delta = DeltaUrl.objects.get(url=dump_url.url)
         assert pattern.delta_urls.filter(id=delta.id).exists()
+
+
+@pytest.mark.django_db
+class TestIncrementalMigration(TestCase):
+    """Test that incremental migration only re-evaluates the URLs it touches."""
+
+    def setUp(self):
+        self.collection = CollectionFactory()
+
+    def _migration_result(self):
+        return {
+            (delta.url, delta.to_delete, delta.document_type, delta.excluded)
+            for delta in DeltaUrl.objects.filter(collection=self.collection)
+        }
+
+    def test_pattern_derived_deltas_are_kept(self):
+        """A delta a pattern created from an unchanged curated URL survives the migration untouched."""
+        curated = CuratedUrlFactory(
+            collection=self.collection, url="https://example.com/internal/doc", scraped_title="Internal"
+        )
+        DeltaExcludePattern.objects.create(
+            collection=self.collection,
+            match_pattern="*internal*",
+            match_pattern_type=DeltaExcludePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+        )
+        pattern_delta = DeltaUrl.objects.get(url=curated.url)
+
+        DumpUrlFactory(collection=self.collection, url=curated.url, scraped_title="Internal")
+        DumpUrlFactory(collection=self.collection, url="https://example.com/new", scraped_title="New")
+        self.collection.migrate_dump_to_delta()
+
+        kept_delta = DeltaUrl.objects.get(url=curated.url)
+        assert kept_delta.pk == pattern_delta.pk
+        assert kept_delta.excluded is True
+        assert DeltaUrl.objects.filter(url="https://example.com/new").exists()
+
+    def test_removed_delta_is_recreated_by_patterns(self):
+        """When a leftover delta is dropped, patterns get to recreate it from its curated URL."""
+        curated = CuratedUrlFactory(collection=self.collection, url="https://example.com/internal/doc")
+        self.collection.migrate_dump_to_delta()  # curated missing from the dump -> to_delete delta
+        pattern = DeltaExcludePattern.objects.create(
+            collection=self.collection,
+            match_pattern="*internal*",
+            match_pattern_type=DeltaExcludePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+        )
+
+        DumpUrlFactory(collection=self.collection, url=curated.url, scraped_title=curated.scraped_title)
+        self.collection.migrate_dump_to_delta()
+
+        delta = DeltaUrl.objects.get(url=curated.url)
+        assert delta.to_delete is False
+        assert delta.excluded is True
+        assert pattern.delta_urls.filter(pk=delta.pk).exists()
+
+    def test_incremental_matches_full_migration(self):
+        """Incremental and full migrations produce the same deltas."""
+        DeltaDocumentTypePattern.objects.create(
+            collection=self.collection,
+            match_pattern="*.pdf",
+            match_pattern_type=DeltaDocumentTypePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+            document_type=DocumentTypes.DATA,
+        )
+        DeltaExcludePattern.objects.create(
+            collection=self.collection,
+            match_pattern="*internal*",
+            match_pattern_type=DeltaExcludePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+        )
+        CuratedUrlFactory(collection=self.collection, url="https://example.com/internal/a.pdf", scraped_title="A")
+        CuratedUrlFactory(collection=self.collection, url="https://example.com/b.pdf", scraped_title="B")
+        CuratedUrlFactory(collection=self.collection, url="https://example.com/gone", scraped_title="Gone")
+
+        def load_dump():
+            DumpUrlFactory(collection=self.collection, url="https://example.com/internal/a.pdf", scraped_title="A")
+            DumpUrlFactory(collection=self.collection, url="https://example.com/b.pdf", scraped_title="B2")
+            DumpUrlFactory(collection=self.collection, url="https://example.com/c.pdf", scraped_title="C")
+
+        load_dump()
+        self.collection.migrate_dump_to_delta(incremental=False)
+        full_result = self._migration_result()
+
+        load_dump()
+        self.collection.migrate_dump_to_delta()
+        assert self._migration_result() == full_result
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("incremental", [True, False])
+def test_migration_query_count_does_not_grow_with_urls(incremental):
+    """Deltas are computed in SQL, so migrating more URLs doesn't issue more queries."""
+
+    def count_migration_queries(url_count):
+        collection = CollectionFactory()
+        for index in range(url_count):
+            DumpUrlFactory(collection=collection, url=f"https://example.com/{incremental}/{url_count}/dump/{index}")
+            CuratedUrlFactory(
+                collection=collection, url=f"https://example.com/{incremental}/{url_count}/curated/{index}"
+            )
+        with CaptureQueriesContext(connection) as queries:
+            collection.migrate_dump_to_delta(incremental=incremental)
+        assert DeltaUrl.objects.filter(collection=collection).count() == 2 * url_count
+        return len(queries)
+
+    assert count_migration_queries(2) == count_migration_queries(20)
@@ -0,0 +1,109 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_partitioning.py
+
+import pytest
+from django.db import IntegrityError, connection
+
+from sde_collections.models.collection import Collection
+from sde_collections.models.delta_url import DeltaUrl, DumpUrl
+from sde_collections.models.text_blob import TextBlob
+from sde_collections.tests.factories import CollectionFactory, DumpUrlFactory
+from sde_collections.utils.bulk_load import copy_urls
+from sde_collections.utils.partitioning import (
+    is_partitioned,
+    partition_by_collection,
+    partition_name,
+    unpartition,
+)
+
+
+def rows_by_partition() -> dict[str, int]:
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT tableoid::regclass::text, COUNT(*) FROM {DumpUrl._meta.db_table} GROUP BY 1")
+        return dict(cursor.fetchall())
+
+
+@pytest.mark.django_db
+class TestDumpUrlPartitioning:
+    def setup_method(self):
+        self.collection = CollectionFactory()
+        self.other_collection = CollectionFactory()
+        # explicit urls, since two faked ones can collide and DeltaUrl urls are unique
+        for index in range(3):
+            DumpUrlFactory(collection=self.collection, url=f"https://example.com/{index}", scraped_text="Text")
+        for index in range(2):
+            DumpUrlFactory(collection=self.other_collection, url=f"https://example.com/other/{index}")
+
+    def test_partitioning_moves_rows_into_collection_partitions(self):
+        assert partition_by_collection(DumpUrl) == 2
+
+        assert is_partitioned(DumpUrl)
+        assert rows_by_partition() == {
+            partition_name(DumpUrl, self.collection.id): 3,
+            partition_name(DumpUrl, self.other_collection.id): 2,
+        }
+        dump_url = DumpUrl.objects.create(
+            collection=self.collection, url="https://example.com/new", scraped_text_blob=TextBlob.from_text("New")
+        )
+        assert DumpUrl.objects.get(pk=dump_url.pk).content_hash == dump_url.compute_content_hash()
+
+    def test_clearing_truncates_only_the_collections_partition(self):
+        partition_by_collection(DumpUrl)
+
+        self.collection.clear_dump_urls()
+
+        assert rows_by_partition() == {partition_name(DumpUrl, self.other_collection.id): 2}
+
+    def test_new_collections_get_a_partition_when_cleared(self):
+        partition_by_collection(DumpUrl)
+        collection = CollectionFactory()
+        DumpUrlFactory(collection=collection)
+
+        collection.clear_dump_urls()
+        copy_urls(DumpUrl, collection, [{"url": "https://example.com/loaded"}], fields=["url"])
+
+        assert rows_by_partition()[partition_name(DumpUrl, collection.id)] == 1
+        assert f"{DumpUrl._meta.db_table}_default" not in rows_by_partition()
+
+    def test_migration_from_a_partitioned_table(self):
+        partition_by_collection(DumpUrl)
+
+        self.collection.migrate_dump_to_delta()
+
+        assert DeltaUrl.objects.filter(collection=self.collection).count() == 3
+        assert not DumpUrl.objects.filter(collection=self.collection).exists()
+
+    def test_deleting_a_collection_drops_its_partition(self):
+        partition_by_collection(DumpUrl)
+
+        Collection.objects.filter(pk=self.collection.pk).delete()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [partition_name(DumpUrl, self.collection.id)])
+            assert cursor.fetchone()[0] is None
+
+    def test_unpartition_restores_a_single_table(self):
+        partition_by_collection(DumpUrl)
+
+        unpartition(DumpUrl)
+
+        assert not is_partitioned(DumpUrl)
+        assert rows_by_partition() == {DumpUrl._meta.db_table: 5}
+        DumpUrl.objects.create(collection=self.collection, url="https://example.com/after")
+
+
+@pytest.mark.django_db
+def test_dump_urls_are_unique_per_collection():
+    collection, other_collection = CollectionFactory(), CollectionFactory()
+    rows = [{"url": "https://example.com/shared"}]
+
+    copy_urls(DumpUrl, collection, rows, fields=["url"])
+    counts = copy_urls(DumpUrl, other_collection, rows * 2, fields=["url"])
+
+    assert counts["created"] == 1
+    assert DumpUrl.objects.filter(url="https://example.com/shared").count() == 2
+
+    # but a URL can only be curated in one collection, so the second migration fails instead of dropping it
+    collection.migrate_dump_to_delta()
+    with pytest.raises(IntegrityError):
+        other_collection.migrate_dump_to_delta()
+    assert DumpUrl.objects.filter(collection=other_collection).exists()
@@ -0,0 +1,176 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_pattern_engine.py
+
+import re
+from typing import Any
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from sde_collections.models.collection_choice_fields import Divisions, DocumentTypes
+from sde_collections.models.delta_patterns import (
+    BaseMatchPattern,
+    DeltaDivisionPattern,
+    DeltaDocumentTypePattern,
+    DeltaExcludePattern,
+    DeltaTitlePattern,
+)
+from sde_collections.models.delta_url import CuratedUrl, DeltaUrl
+from sde_collections.tests.factories import (
+    CollectionFactory,
+    CuratedUrlFactory,
+    DeltaUrlFactory,
+)
+from sde_collections.utils.pattern_engine import (
+    AhoCorasick,
+    CompiledPatternSet,
+    PatternMatchIndex,
+)
+
+INDIVIDUAL = DeltaExcludePattern.MatchPatternTypeChoices.INDIVIDUAL_URL
+MULTI = DeltaExcludePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN
+
+URLS = [
+    "https://example.com/docs/item.html",
+    "https://example.com/docs/api/v2/users.html",
+    "https://example.com/data/file.pdf",
+    "https://example.com/data/archive/file.pdf",
+    "https://other.org/docs/readme.txt",
+    "https://example.com/docs",
+    "https://example.com/a.b/c?x=1&y=(2)",
+    "https://mirror.net/https://example.com/docs/item.html",
+    "https://mirror.net/https://example.com/data/file.pdf",
+]
+
+PATTERNS = [
+    ("https://example.com/docs/item.html", INDIVIDUAL),
+    ("file.pdf", INDIVIDUAL),
+    ("https://example.com/a.b/c?x=1&y=(2)", INDIVIDUAL),
+    ("*docs*", MULTI),
+    ("*.pdf", MULTI),
+    ("https://example.com/data/*", MULTI),
+    ("*docs/api/*users*", MULTI),
+    ("*", MULTI),
+    ("example.com", MULTI),
+    ("*archive*file*pdf", MULTI),
+    ("*pdf*file*", MULTI),
+    ("*a.b/c?x=1*", MULTI),
+    ("https://example.com/*file*", MULTI),
+]
+
+
+def _patterns():
+    return [
+        DeltaExcludePattern(id=index, match_pattern=match_pattern, match_pattern_type=match_pattern_type)
+        for index, (match_pattern, match_pattern_type) in enumerate(PATTERNS, start=1)
+    ]
+
+
+def test_aho_corasick_finds_overlapping_literals():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    found = automaton.search("ushers")
+    ids = automaton.literal_ids
+    assert found == {ids["he"], ids["she"], ids["hers"]}
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_compiled_set_matches_regex_semantics(url):
+    """The compiled set must agree with the regex each pattern sends to the database."""
+    patterns = _patterns()
+    compiled = CompiledPatternSet(patterns)
+
+    expected = {pattern for pattern in patterns if re.search(pattern.get_regex_pattern(), url)}
+    assert compiled.match(url) == expected
+
+
+@pytest.mark.django_db
+def test_index_memberships_match_regex_queries():
+    collection = CollectionFactory()
+    for index, url in enumerate(URLS):
+        if index % 2:
+            DeltaUrlFactory(collection=collection, url=url)
+        else:
+            CuratedUrlFactory(collection=collection, url=url)
+
+    patterns = [
+        DeltaExcludePattern.objects.create(collection=collection, match_pattern="*docs*", match_pattern_type=MULTI),
+        DeltaExcludePattern.objects.create(collection=collection, match_pattern="file.pdf", match_pattern_type=1),
+    ]
+    match_index = PatternMatchIndex.for_collection(collection)
+
+    for pattern in patterns:
+        regex = pattern.get_regex_pattern()
+        expected_deltas = set(
+            DeltaUrl.objects.filter(collection=collection, url__regex=regex).values_list("id", flat=True)
+        )
+        expected_curated = set(
+            CuratedUrl.objects.filter(collection=collection, url__regex=regex).values_list("id", flat=True)
+        )
+        assert match_index.delta_ids[pattern] == expected_deltas
+        assert match_index.curated_ids[pattern] == expected_curated
+
+
+@pytest.mark.django_db
+def test_apply_all_patterns_uses_single_pass():
+    """Applying every pattern through the index gives the same results as applying them one by one."""
+    collection = CollectionFactory()
+    curated = CuratedUrlFactory(
+        collection=collection, url="https://example.com/docs/internal.html", document_type=DocumentTypes.DATA
+    )
+    delta = DeltaUrlFactory(collection=collection, url="https://example.com/docs/guide.html", scraped_title="Guide")
+
+    exclude = DeltaExcludePattern.objects.create(
+        collection=collection, match_pattern="*internal*", match_pattern_type=MULTI
+    )
+    doc_type = DeltaDocumentTypePattern.objects.create(
+        collection=collection,
+        match_pattern="*docs*",
+        match_pattern_type=MULTI,
+        document_type=DocumentTypes.SOFTWARETOOLS,
+    )
+    title = DeltaTitlePattern.objects.create(
+        collection=collection, match_pattern="*guide*", match_pattern_type=MULTI, title_pattern="{title} - Docs"
+    )
+
+    # wipe the effects of the individual applies and redo them in one pass
+    DeltaUrl.objects.filter(collection=collection).exclude(pk=delta.pk).delete()
+    collection.apply_all_patterns()
+
+    excluded_delta = DeltaUrl.objects.get(url=curated.url)
+    assert excluded_delta.excluded is True
+    assert exclude.delta_urls.filter(pk=excluded_delta.pk).exists()
+    assert excluded_delta.document_type == DocumentTypes.SOFTWARETOOLS
+
+    delta.refresh_from_db()
+    assert delta.document_type == DocumentTypes.SOFTWARETOOLS
+    assert delta.generated_title == "Guide - Docs"
+    assert set(doc_type.delta_urls.values_list("pk", flat=True)) == {delta.pk, excluded_delta.pk}
+    assert set(title.delta_urls.values_list("pk", flat=True)) == {delta.pk}
+
+
+@pytest.mark.django_db
+def test_apply_all_patterns_query_count_does_not_grow_with_matches():
+    """Patterns write the URLs they match in bulk, so applying them costs the same queries for 2 or 20 URLs."""
+
+    def queries_to_apply(url_count: int) -> int:
+        collection = CollectionFactory()
+        prefix = f"https://example.com/{collection.id}"
+        for index in range(url_count):
+            CuratedUrlFactory(collection=collection, url=f"{prefix}/curated/{index}", document_type=DocumentTypes.DATA)
+            DeltaUrlFactory(collection=collection, url=f"{prefix}/delta/{index}", document_type=DocumentTypes.DATA)
+        patterns: list[tuple[type[BaseMatchPattern], dict[str, Any]]] = [
+            (DeltaExcludePattern, {"match_pattern": f"{prefix}/curated/*"}),
+            (DeltaDocumentTypePattern, {"match_pattern": f"{prefix}/*", "document_type": DocumentTypes.IMAGES}),
+            (DeltaDivisionPattern, {"match_pattern": f"{prefix}/*", "division": Divisions.BIOLOGY}),
+        ]
+        for pattern_model, fields in patterns:
+            pattern_model(collection=collection, match_pattern_type=MULTI, **fields).save(apply=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            collection.apply_all_patterns()
+        assert DeltaUrl.objects.filter(collection=collection, division=Divisions.BIOLOGY).count() == 2 * url_count
+        return len(queries)
+
+    # the first apply also looks up and caches the patterns' content types
+    queries_to_apply(1)
+    assert queries_to_apply(2) == queries_to_apply(20)
@@ -0,0 +1,216 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_pattern_jobs.py
+
+from unittest import mock
+
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded
+from rest_framework.test import APIClient
+
+from sde_collections.models.collection_choice_fields import Divisions
+from sde_collections.models.delta_patterns import (
+    DeltaDivisionPattern,
+    DeltaExcludePattern,
+    PatternApplicationJob,
+)
+from sde_collections.models.delta_url import DeltaUrl
+from sde_collections.tasks import run_pattern_application_job
+from sde_collections.tests.factories import (
+    CollectionFactory,
+    CuratedUrlFactory,
+    DeltaUrlFactory,
+)
+
+
+@pytest.mark.django_db
+class TestPatternApplicationJobs:
+    def setup_method(self):
+        self.client = APIClient()
+        self.collection = CollectionFactory()
+        self.delta_url = DeltaUrlFactory(collection=self.collection, url="https://example.com/private/page")
+
+    def test_create_queues_apply_job(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = self.client.post(
+                "/api/exclude-patterns/",
+                {
+                    "collection": self.collection.id,
+                    "match_pattern": "*private*",
+                    "match_pattern_type": DeltaExcludePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+                },
+            )
+
+        assert response.status_code == 201
+        assert len(callbacks) == 1
+
+        # the pattern exists but is not applied until the job runs
+        pattern = DeltaExcludePattern.objects.get(collection=self.collection, match_pattern="*private*")
+        assert not pattern.delta_urls.exists()
+
+        job = PatternApplicationJob.objects.get(id=response.data["job_id"])
+        assert job.collection == self.collection
+        assert job.action == PatternApplicationJob.Action.APPLY
+        assert job.status == PatternApplicationJob.Status.PENDING
+
+        run_pattern_application_job(job.id)
+
+        job.refresh_from_db()
+        assert job.status == PatternApplicationJob.Status.SUCCEEDED
+        assert job.progress == 100
+        assert DeltaUrl.objects.get(pk=self.delta_url.pk).excluded is True
+
+    def test_destroy_unapplies_and_deletes_in_job(self):
+        pattern = DeltaExcludePattern.objects.create(
+            collection=self.collection,
+            match_pattern=self.delta_url.url,
+            match_pattern_type=DeltaExcludePattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
+        )
+
+        response = self.client.delete(f"/api/exclude-patterns/{pattern.id}/")
+
+        assert response.status_code == 202
+        assert DeltaExcludePattern.objects.filter(pk=pattern.pk).exists()
+
+        run_pattern_application_job(response.data["job_id"])
+
+        assert not DeltaExcludePattern.objects.filter(pk=pattern.pk).exists()
+        assert DeltaUrl.objects.get(pk=self.delta_url.pk).excluded is False
+
+    def test_pattern_being_deleted_is_hidden_and_not_deleted_twice(self):
+        pattern = DeltaExcludePattern.objects.create(
+            collection=self.collection,
+            match_pattern=self.delta_url.url,
+            match_pattern_type=DeltaExcludePattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
+        )
+        assert self.client.delete(f"/api/exclude-patterns/{pattern.id}/").status_code == 202
+
+        response = self.client.get("/api/exclude-patterns/", {"collection_id": self.collection.id, "format": "json"})
+        assert response.data["results"] == []
+        assert self.client.delete(f"/api/exclude-patterns/{pattern.id}/").status_code == 404
+        # posting the pattern again toggles it off, which is a second delete too
+        response = self.client.post(
+            "/api/exclude-patterns/", {"collection": self.collection.id, "match_pattern": pattern.match_pattern}
+        )
+        assert response.status_code == 409
+        assert PatternApplicationJob.objects.filter(action=PatternApplicationJob.Action.UNAPPLY).count() == 1
+
+    def test_posting_an_individual_url_pattern_again_replaces_it_in_a_job(self):
+        other_collection = CollectionFactory()
+        other_pattern = DeltaDivisionPattern.objects.create(
+            collection=other_collection,
+            match_pattern=self.delta_url.url,
+            match_pattern_type=DeltaDivisionPattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
+            division=Divisions.BIOLOGY,
+        )
+        pattern = DeltaDivisionPattern.objects.create(
+            collection=self.collection,
+            match_pattern=self.delta_url.url,
+            match_pattern_type=DeltaDivisionPattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
+            division=Divisions.BIOLOGY,
+        )
+
+        response = self.client.post(
+            "/api/division-patterns/",
+            {
+                "collection": self.collection.id,
+                "match_pattern": self.delta_url.url,
+                "match_pattern_type": DeltaDivisionPattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
+                "division": Divisions.ASTROPHYSICS,
+            },
+        )
+
+        assert response.status_code == 201
+        assert response.data["id"] == pattern.id
+        # nothing is unapplied inside the request
+        assert DeltaUrl.objects.get(pk=self.delta_url.pk).division == Divisions.BIOLOGY
+
+        job = PatternApplicationJob.objects.get(id=response.data["job_id"])
+        assert job.action == PatternApplicationJob.Action.REAPPLY
+        run_pattern_application_job(job.id)
+
+        job.refresh_from_db()
+        assert job.status == PatternApplicationJob.Status.SUCCEEDED
+        assert DeltaUrl.objects.get(pk=self.delta_url.pk).division == Divisions.ASTROPHYSICS
+        assert pattern.journal_entries().get().restore_value is None
+        assert DeltaDivisionPattern.objects.get(pk=other_pattern.pk).division == Divisions.BIOLOGY
+
+    def test_failed_job_records_error(self):
+        pattern = DeltaExcludePattern.objects.create(
+            collection=self.collection,
+            match_pattern="*private*",
+            match_pattern_type=DeltaExcludePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+        )
+        job = PatternApplicationJob.enqueue(pattern, PatternApplicationJob.Action.APPLY)
+        DeltaExcludePattern.objects.filter(pk=pattern.pk).delete()
+
+        run_pattern_application_job(job.id)
+
+        job.refresh_from_db()
+        assert job.status == PatternApplicationJob.Status.FAILED
+        assert job.error
+
+    def test_unapplying_a_deleted_pattern_succeeds(self):
+        pattern = DeltaExcludePattern.objects.create(collection=self.collection, match_pattern="*private*")
+        job = PatternApplicationJob.enqueue(pattern, PatternApplicationJob.Action.UNAPPLY)
+        DeltaExcludePattern.objects.filter(pk=pattern.pk).delete()
+
+        run_pattern_application_job(job.id)
+
+        job.refresh_from_db()
+        assert job.status == PatternApplicationJob.Status.SUCCEEDED
+
+    def test_interrupted_unapply_is_rolled_back_and_can_be_rerun(self):
+        CuratedUrlFactory(collection=self.collection, url="https://example.com/curated", division=Divisions.BIOLOGY)
+        pattern = DeltaDivisionPattern.objects.create(
+            collection=self.collection,
+            match_pattern="https://example.com/*",
+            match_pattern_type=DeltaDivisionPattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+            division=Divisions.ASTROPHYSICS,
+        )
+        job = PatternApplicationJob.enqueue(pattern, PatternApplicationJob.Action.UNAPPLY)
+        revert_field = DeltaDivisionPattern.revert_field
+
+        def revert_then_time_out(self, *args):
+            revert_field(self, *args)
+            raise SoftTimeLimitExceeded()
+
+        with mock.patch.object(DeltaDivisionPattern, "revert_field", revert_then_time_out):
+            with pytest.raises(SoftTimeLimitExceeded):
+                run_pattern_application_job(job.id)
+
+        job.refresh_from_db()
+        assert job.status == PatternApplicationJob.Status.FAILED
+        # the journal and the pattern are kept, so the unapply can run again
+        assert pattern.journal_entries().count() == 2
+        assert DeltaUrl.objects.get(url="https://example.com/curated").division == Divisions.ASTROPHYSICS
+
+        run_pattern_application_job(job.id)
+
+        job.refresh_from_db()
+        assert job.status == PatternApplicationJob.Status.SUCCEEDED
+        assert not DeltaDivisionPattern.objects.filter(pk=pattern.pk).exists()
+        assert not DeltaUrl.objects.filter(url="https://example.com/curated").exists()
+        assert DeltaUrl.objects.get(pk=self.delta_url.pk).division is None
+
+    def test_track_progress_reports_percentages(self):
+        pattern = DeltaExcludePattern(collection=self.collection, match_pattern="*")
+        reported: list[int] = []
+        pattern._progress_callback = reported.append
+
+        assert list(pattern.track_progress(list(range(40)), 0, 50)) == list(range(40))
+        assert reported == sorted(reported)
+        assert reported[-1] == 50
+
+    def test_polling_endpoint_filters_unfinished_jobs(self):
+        pattern = DeltaExcludePattern.objects.create(collection=self.collection, match_pattern="*private*")
+        pending = PatternApplicationJob.enqueue(pattern, PatternApplicationJob.Action.APPLY)
+        finished = PatternApplicationJob.enqueue(pattern, PatternApplicationJob.Action.APPLY)
+        finished.run()
+
+        response = self.client.get(f"/api/pattern-jobs/{finished.id}/")
+        assert response.data["progress"] == 100
+        assert response.data["is_finished"] is True
+
+        response = self.client.get(
+            "/api/pattern-jobs/", {"collection_id": self.collection.id, "is_finished": "false", "format": "json"}
+        )
+        assert [job["id"] for job in response.data["results"]] == [pending.id]
@@ -0,0 +1,141 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_pattern_journal.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from sde_collections.models.collection_choice_fields import Divisions
+from sde_collections.models.delta_patterns import (
+    DeltaDivisionPattern,
+    DeltaExcludePattern,
+    DeltaTitlePattern,
+    PatternJournalEntry,
+)
+from sde_collections.models.delta_url import DeltaUrl
+
+from .factories import CollectionFactory, CuratedUrlFactory, DeltaUrlFactory
+
+
+@pytest.mark.django_db
+class TestPatternJournal:
+    def setup_method(self):
+        self.collection = CollectionFactory()
+
+    def exclude_pattern(self, match_pattern: str) -> DeltaExcludePattern:
+        return DeltaExcludePattern.objects.create(
+            collection=self.collection,
+            match_pattern=match_pattern,
+            match_pattern_type=DeltaExcludePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+        )
+
+    def division_pattern(self, match_pattern: str, division=Divisions.ASTROPHYSICS) -> DeltaDivisionPattern:
+        return DeltaDivisionPattern.objects.create(
+            collection=self.collection,
+            match_pattern=match_pattern,
+            match_pattern_type=DeltaDivisionPattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+            division=division,
+        )
+
+    def test_apply_journals_the_values_to_restore(self):
+        DeltaUrlFactory(collection=self.collection, url="https://example.com/delta", division=Divisions.GENERAL)
+        DeltaUrlFactory(collection=self.collection, url="https://example.com/same", division=Divisions.ASTROPHYSICS)
+        CuratedUrlFactory(collection=self.collection, url="https://example.com/curated", division=Divisions.BIOLOGY)
+
+        pattern = self.division_pattern("https://example.com/*")
+
+        assert {
+            (entry.delta_url.url, entry.restore_value)
+            for entry in pattern.journal_entries().select_related("delta_url")
+        } == {
+            ("https://example.com/delta", None),
+            ("https://example.com/same", None),
+            ("https://example.com/curated", Divisions.BIOLOGY),
+        }
+
+    def test_unapply_restores_the_curated_value_or_null(self):
+        delta_url = DeltaUrlFactory(
+            collection=self.collection, url="https://example.com/delta", division=Divisions.GENERAL
+        )
+        CuratedUrlFactory(collection=self.collection, url="https://example.com/curated", division=Divisions.BIOLOGY)
+        pattern = self.division_pattern("https://example.com/*")
+        # applying again keeps the journal of the first application
+        pattern.apply()
+
+        pattern.delete()
+
+        delta_url.refresh_from_db()
+        assert delta_url.division is None
+        # the curated URL's delta was only there for the pattern
+        assert not DeltaUrl.objects.filter(url="https://example.com/curated").exists()
+        assert not PatternJournalEntry.objects.exists()
+
+    def test_title_unapply_restores_curated_titles(self):
+        delta_url = DeltaUrlFactory(
+            collection=self.collection, url="https://example.com/delta", scraped_title="Delta", generated_title="Old"
+        )
+        CuratedUrlFactory(
+            collection=self.collection,
+            url="https://example.com/delta",
+            scraped_title="Delta",
+            generated_title="Curated",
+        )
+        pattern = DeltaTitlePattern.objects.create(
+            collection=self.collection,
+            match_pattern="https://example.com/*",
+            match_pattern_type=DeltaTitlePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+            title_pattern="{title} - Processed",
+        )
+        delta_url.refresh_from_db()
+        assert delta_url.generated_title == "Delta - Processed"
+
+        pattern.delete()
+
+        delta_url.refresh_from_db()
+        assert delta_url.generated_title == "Curated"
+
+    def test_exclude_unapply_deletes_only_redundant_deltas(self):
+        curated_url = CuratedUrlFactory(collection=self.collection, url="https://example.com/curated")
+        DeltaUrlFactory(collection=self.collection, url="https://example.com/delta")
+        pattern = self.exclude_pattern("https://example.com/*")
+        assert DeltaUrl.objects.filter(url=curated_url.url).exists()
+
+        pattern.delete()
+
+        assert set(DeltaUrl.objects.values_list("url", flat=True)) == {"https://example.com/delta"}
+
+    def test_unapply_leaves_the_memberships_of_other_patterns(self):
+        delta_url = DeltaUrlFactory(collection=self.collection, url="https://example.com/delta")
+        broad = self.exclude_pattern("https://example.com/*")
+        other = self.exclude_pattern("https://example.com/d*")
+        assert set(delta_url.deltaexcludepatterns.all()) == {broad, other}
+
+        broad.delete()
+
+        # the other pattern's rows were not this pattern's to undo
+        assert list(other.delta_urls.all()) == [delta_url]
+        delta_url.refresh_from_db()
+        assert delta_url.excluded
+
+    def test_promotion_clears_the_journal(self):
+        DeltaUrlFactory(collection=self.collection, url="https://example.com/delta", division=Divisions.GENERAL)
+        self.division_pattern("https://example.com/*")
+        assert PatternJournalEntry.objects.exists()
+
+        self.collection.promote_to_curated()
+
+        assert not PatternJournalEntry.objects.exists()
+
+    def test_unapply_reads_only_the_urls_the_pattern_matched(self):
+        def queries_to_remove_pattern(unmatched_count: int) -> int:
+            prefix = f"https://example.com/{unmatched_count}"
+            DeltaUrlFactory(collection=self.collection, url=f"{prefix}/matched", division=Divisions.GENERAL)
+            for index in range(unmatched_count):
+                DeltaUrlFactory(collection=self.collection, url=f"https://other.com/{unmatched_count}/{index}")
+            pattern = self.division_pattern(f"{prefix}/*")
+            assert pattern.journal_entries().count() == 1
+
+            with CaptureQueriesContext(connection) as queries:
+                pattern.delete()
+            return len(queries)
+
+        assert queries_to_remove_pattern(2) == queries_to_remove_pattern(20)
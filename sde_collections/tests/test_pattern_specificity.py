@@ -156,3 +156,84 @@ def test_field_modifying_pattern_layered_specificity():
     assert mid_tool.pk in broad_pattern.delta_urls.values_list("pk", flat=True)
 
     assert top_tool.pk in broad_pattern.delta_urls.values_list("pk", flat=True)
+
+
+@pytest.mark.django_db
+def test_url_match_count_is_persisted_on_apply():
+    """Applying a pattern stores its match count so competing patterns don't have to recount."""
+    collection = CollectionFactory()
+    DeltaUrlFactory(collection=collection, url="https://example.com/tools/a.py")
+    DeltaUrlFactory(collection=collection, url="https://example.com/tools/b.py")
+
+    pattern = DeltaDocumentTypePattern.objects.create(
+        collection=collection,
+        match_pattern="*/tools/*.py",
+        document_type=DocumentTypes.SOFTWARETOOLS,
+        match_pattern_type=2,
+    )
+
+    assert DeltaDocumentTypePattern.objects.get(pk=pattern.pk).url_match_count == 2
+
+
+@pytest.mark.django_db
+def test_dominated_urls_resolved_in_constant_queries(django_assert_max_num_queries):
+    """Precedence for all URLs of a pattern is resolved up front, independent of the number of URLs."""
+    collection = CollectionFactory()
+    for i in range(10):
+        DeltaUrlFactory(collection=collection, url=f"https://example.com/tools/analysis/{i}.py")
+    DeltaUrlFactory(collection=collection, url="https://example.com/tools/simple.py")
+
+    specific_pattern = DeltaDocumentTypePattern.objects.create(
+        collection=collection,
+        match_pattern="*/tools/analysis/*.py",
+        document_type=DocumentTypes.DATA,
+        match_pattern_type=2,
+    )
+    broad_pattern = DeltaDocumentTypePattern.objects.create(
+        collection=collection,
+        match_pattern="*/tools/*.py",
+        document_type=DocumentTypes.SOFTWARETOOLS,
+        match_pattern_type=2,
+    )
+
+    with django_assert_max_num_queries(3):
+        dominated_urls = broad_pattern.get_dominated_urls()
+
+    assert dominated_urls == {f"https://example.com/tools/analysis/{i}.py" for i in range(10)}
+    assert specific_pattern.get_dominated_urls() == set()
+    assert DeltaUrl.objects.get(url="https://example.com/tools/simple.py").document_type == DocumentTypes.SOFTWARETOOLS
+    assert set(DeltaUrl.objects.filter(document_type=DocumentTypes.DATA).values_list("url", flat=True)) == (
+        dominated_urls
+    )
+
+
+@pytest.mark.django_db
+def test_precedence_recounts_competitors_whose_count_drifted():
+    """A competitor's persisted count is stale after URLs are added without applying it, so it is recounted."""
+    collection = CollectionFactory()
+    for url in ["https://example.com/docs/1.pdf", "https://example.com/docs/2.html"]:
+        DeltaUrlFactory(collection=collection, url=url)
+    for url in ["https://example.com/x/3.pdf", "https://example.com/y/4.pdf"]:
+        DeltaUrlFactory(collection=collection, url=url)
+
+    docs_pattern = DeltaDocumentTypePattern.objects.create(
+        collection=collection,
+        match_pattern="https://example.com/docs/*",
+        document_type=DocumentTypes.DATA,
+        match_pattern_type=2,
+    )
+    pdf_pattern = DeltaDocumentTypePattern.objects.create(
+        collection=collection,
+        match_pattern="*.pdf",
+        document_type=DocumentTypes.IMAGES,
+        match_pattern_type=2,
+    )
+    assert DeltaUrl.objects.get(url="https://example.com/docs/1.pdf").document_type == DocumentTypes.DATA
+
+    # docs_pattern now matches 5 URLs, but its persisted count still says 2
+    for index in range(5, 8):
+        DeltaUrlFactory(collection=collection, url=f"https://example.com/docs/{index}.html")
+    pdf_pattern.apply()
+
+    assert DeltaUrl.objects.get(url="https://example.com/docs/1.pdf").document_type == DocumentTypes.IMAGES
+    assert DeltaDocumentTypePattern.objects.get(pk=docs_pattern.pk).url_match_count == 5
@@ -1,8 +1,13 @@
 # docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_promote_collection.py
 
+from unittest.mock import patch
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from sde_collections.models.delta_patterns import (
+    DeltaDocumentTypePattern,
     DeltaExcludePattern,
     DeltaIncludePattern,
 )
@@ -116,3 +121,109 @@ def test_patterns_reapplied_after_promotion(collection):
 
     # Verify exclusion status
     assert curated_urls.filter(url="https://exclude.com", excluded=True).exists()
+
+
+@pytest.mark.django_db
+def test_refresh_url_lists_reports_membership_changes(collection):
+    DeltaUrl.objects.create(collection=collection, url="https://example.com/keep", scraped_title="Keep")
+    DeltaUrl.objects.create(collection=collection, url="https://example.com/drop", scraped_title="Drop")
+    exclude_pattern = DeltaExcludePattern.objects.create(
+        collection=collection, match_pattern="https://example.com/drop", match_pattern_type=1
+    )
+
+    collection.promote_to_curated()
+
+    drop_curated = CuratedUrl.objects.get(url="https://example.com/drop")
+    assert exclude_pattern.curated_urls.filter(pk=drop_curated.pk).exists()
+    assert exclude_pattern.delta_urls.count() == 0
+
+    # everything is already up to date
+    assert collection.refresh_url_lists_for_all_patterns() == {"added": 0, "removed": 0}
+
+
+def _promote_with_pattern(delta_count):
+    collection = CollectionFactory()
+    curated = CuratedUrl.objects.create(
+        collection=collection, url=f"https://example.com/{delta_count}/gone", scraped_title="Gone"
+    )
+    exclude_pattern = DeltaExcludePattern.objects.create(
+        collection=collection, match_pattern=f"*example.com/{delta_count}/*", match_pattern_type=2
+    )
+    for index in range(delta_count):
+        DeltaUrl.objects.create(
+            collection=collection, url=f"https://example.com/{delta_count}/{index}", scraped_title="New"
+        )
+    DeltaUrl.objects.filter(url=curated.url).update(to_delete=True)
+    exclude_pattern.apply()
+
+    with CaptureQueriesContext(connection) as queries:
+        collection.promote_to_curated()
+    return collection, exclude_pattern, len(queries)
+
+
+@pytest.mark.django_db
+def test_promotion_moves_memberships_to_curated_urls():
+    collection, exclude_pattern, query_count = _promote_with_pattern(10)
+
+    curated_urls = CuratedUrl.objects.filter(collection=collection)
+    assert curated_urls.count() == 10
+    assert set(exclude_pattern.curated_urls.values_list("url", flat=True)) == set(
+        curated_urls.values_list("url", flat=True)
+    )
+    exclude_pattern.refresh_from_db()
+    assert exclude_pattern.url_match_count == 10
+    assert collection.refresh_url_lists_for_all_patterns() == {"added": 0, "removed": 0}
+
+    # bulk operations, so promoting more URLs doesn't take more queries
+    assert _promote_with_pattern(30)[2] == query_count
+
+
+@pytest.mark.django_db
+def test_promotion_rematches_patterns_without_deltas(collection):
+    """A pattern that matched a curated URL without needing a DeltaUrl still gets its membership."""
+    curated = CuratedUrl.objects.create(collection=collection, url="https://example.com/doc", document_type=1)
+    pattern = DeltaDocumentTypePattern.objects.create(
+        collection=collection, match_pattern=curated.url, match_pattern_type=1, document_type=1
+    )
+    assert not DeltaUrl.objects.filter(url=curated.url).exists()
+
+    collection.promote_to_curated()
+
+    assert pattern.curated_urls.filter(pk=curated.pk).exists()
+
+
+@pytest.mark.django_db
+def test_promotion_replaces_stale_memberships_of_the_same_count(collection):
+    """A pattern that lost one curated URL and gained another has its memberships diffed, not just counted."""
+    matching = CuratedUrl.objects.create(collection=collection, url="https://example.com/docs/guide", document_type=1)
+    stale = CuratedUrl.objects.create(collection=collection, url="https://example.com/blog/post", document_type=1)
+    # the curated URLs already have the document type, so the pattern needs no DeltaUrls
+    pattern = DeltaDocumentTypePattern.objects.create(
+        collection=collection, match_pattern="https://example.com/docs/*", match_pattern_type=2, document_type=1
+    )
+    pattern.curated_urls.set([stale])
+
+    collection.promote_to_curated()
+
+    assert list(pattern.curated_urls.all()) == [matching]
+
+
+@pytest.mark.django_db
+def test_promotion_pairs_urls_across_batches_in_byte_order(collection):
+    # mixed case, punctuation and non-ASCII sort differently under most database collations
+    urls = [f"https://example.com/{path}" for path in ["B", "a", "_x", "é", "Z-1", "z_1", "~", "ü"]]
+    for url in urls:
+        CuratedUrl.objects.create(collection=collection, url=url, scraped_title="Old")
+        DeltaUrl.objects.create(collection=collection, url=url, scraped_title=f"New {url}")
+    DeltaUrl.objects.create(collection=collection, url="https://example.com/new", scraped_title="Created")
+    DeltaUrl.objects.filter(url=urls[0]).update(to_delete=True)
+
+    with patch("sde_collections.models.collection.PROMOTION_CHUNK_SIZE", 3):
+        collection.promote_to_curated()
+
+    curated_urls = CuratedUrl.objects.filter(collection=collection)
+    assert curated_urls.count() == len(urls)
+    assert not curated_urls.filter(url=urls[0]).exists()
+    for url in urls[1:]:
+        assert curated_urls.get(url=url).scraped_title == f"New {url}"
+    assert curated_urls.get(url="https://example.com/new").scraped_title == "Created"
@@ -0,0 +1,94 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_sinequa_api.py
+
+import pytest
+import requests
+
+from sde_collections.sinequa_api import Api
+from sde_collections.tests.fake_sinequa import FakeSinequaServer
+
+
+@pytest.fixture
+def fake_sinequa():
+    records = [{"download_url": f"https://example.com/{index}", "title": f"Title {index}"} for index in range(2500)]
+    with FakeSinequaServer(records=records, rows=[["https://example.com/0", "Text", "Title"]]) as server:
+        yield server
+
+
+def _api(server, **kwargs):
+    api = Api("lrm_dev", user="user", password="password", token="token", backoff_factor=0, **kwargs)
+    api.base_url = server.url
+    return api
+
+
+def test_pagination_reuses_one_connection(fake_sinequa):
+    with _api(fake_sinequa) as api:
+        page = 1
+        urls: list[str] = []
+        while (response := api.query(page=page, collection_config_folder="example"))["cursorRowCount"]:
+            urls.extend(record["download_url"] for record in response["records"])
+            page += 1
+
+    assert len(urls) == 2500
+    assert len(fake_sinequa.requests) == 4
+    assert len(fake_sinequa.connections) == 1
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retries_throttled_and_failed_requests(fake_sinequa, status):
+    fake_sinequa.failures = [status, status]
+
+    with _api(fake_sinequa) as api:
+        response = api.sql_query("SELECT url1, text, title FROM sde_init_check")
+
+    assert response["Rows"] == [["https://example.com/0", "Text", "Title"]]
+    assert len(fake_sinequa.requests) == 3
+    assert api.metrics.summary()["/api/v1/engine.sql"]["retries"] == 2
+
+
+def test_gives_up_after_retries_are_exhausted(fake_sinequa):
+    fake_sinequa.failures = [502] * 3
+
+    with _api(fake_sinequa, retries=2) as api, pytest.raises(requests.HTTPError):
+        api.sql_query("SELECT url1 FROM sde_init_check")
+
+    assert len(fake_sinequa.requests) == 3
+
+
+def test_records_latency_per_endpoint(fake_sinequa):
+    with _api(fake_sinequa) as api:
+        api.query(page=1, collection_config_folder="example")
+        api.query(page=2, collection_config_folder="example")
+        list(api.get_full_texts("example"))
+
+    summary = api.metrics.summary()
+    # credentials in the query string are never recorded
+    assert set(summary) == {"/api/v1/search.query", "/api/v1/engine.sql"}
+    assert summary["/api/v1/search.query"]["count"] == 2
+    assert summary["/api/v1/engine.sql"]["count"] == 1
+    assert 0 < summary["/api/v1/search.query"]["mean"] <= summary["/api/v1/search.query"]["max"]
+    assert "search.query: 2 requests" in str(api.metrics)
+
+
+def test_iter_query_records_fetches_pages_concurrently_in_order(fake_sinequa):
+    fake_sinequa.delay = 0.05
+
+    with _api(fake_sinequa) as api:
+        records = list(api.iter_query_records(collection_config_folder="example", concurrency=2))
+
+    assert [record["download_url"] for record in records] == [f"https://example.com/{index}" for index in range(2500)]
+    pages = [body["query"]["page"] for path, body in fake_sinequa.requests]
+    assert sorted(pages) == [1, 2, 3]
+    assert fake_sinequa.max_in_flight == 2
+
+
+def test_iter_query_records_stops_early_without_fetching_everything(fake_sinequa):
+    fake_sinequa.records *= 4
+
+    with _api(fake_sinequa) as api:
+        records = api.iter_query_records(collection_config_folder="example", concurrency=3)
+        first_records = [next(records) for _ in range(1500)]
+        records.close()
+
+    assert len(first_records) == 1500
+    # the first page plus at most one window of pages ahead of the consumer
+    assert len(fake_sinequa.requests) <= 1 + 3 + 1
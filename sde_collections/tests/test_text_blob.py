@@ -0,0 +1,81 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_text_blob.py
+
+import pytest
+
+from sde_collections.models.delta_url import CuratedUrl, DeltaUrl, DumpUrl
+from sde_collections.models.text_blob import TextBlob
+from sde_collections.tests.factories import (
+    CollectionFactory,
+    DeltaUrlFactory,
+    DumpUrlFactory,
+)
+from sde_collections.utils.bulk_load import copy_urls
+
+
+@pytest.mark.django_db
+class TestTextBlob:
+    def setup_method(self):
+        self.collection = CollectionFactory()
+
+    def test_identical_texts_are_stored_once_and_compressed(self):
+        text = "The same page text. " * 500
+        dump_url = DumpUrlFactory(collection=self.collection, url="https://example.com/dump", scraped_text=text)
+        DeltaUrlFactory(collection=self.collection, url="https://example.com/delta", scraped_text=text)
+        DumpUrl.objects.bulk_create(
+            [
+                DumpUrl(
+                    collection=self.collection,
+                    url="https://example.com/bulk",
+                    scraped_text_blob=TextBlob.from_text(text),
+                )
+            ]
+        )
+
+        blob = TextBlob.objects.get()
+        assert blob.hash == TextBlob.hash_text(text) == dump_url.scraped_text_blob_id
+        assert blob.size == len(text)
+        assert len(blob.data) < len(text) / 10
+        assert DumpUrl.objects.get(url="https://example.com/bulk").scraped_text == text
+
+    def test_empty_text_has_no_blob(self):
+        dump_url = DumpUrlFactory(collection=self.collection, scraped_text="")
+
+        assert dump_url.scraped_text_blob_id is None
+        assert DumpUrl.objects.get(pk=dump_url.pk).scraped_text == ""
+        assert not TextBlob.objects.exists()
+
+    def test_with_scraped_text_loads_texts_in_one_query(self, django_assert_num_queries):
+        for index in range(3):
+            DumpUrlFactory(collection=self.collection, scraped_text=f"Text {index}")
+
+        with django_assert_num_queries(1):
+            texts = [dump_url.scraped_text for dump_url in DumpUrl.objects.with_scraped_text().order_by("id")]
+        assert texts == ["Text 0", "Text 1", "Text 2"]
+
+    def test_copy_urls_stores_each_text_once(self):
+        rows = [{"url": f"https://example.com/{index}", "scraped_text": f"Text {index % 2}"} for index in range(4)]
+
+        copy_urls(DumpUrl, self.collection, rows, fields=["url", "scraped_text"])
+
+        assert TextBlob.objects.count() == 2
+        assert DumpUrl.objects.get(url="https://example.com/3").scraped_text == "Text 1"
+
+    def test_migration_and_promotion_copy_the_key(self):
+        DumpUrlFactory(collection=self.collection, url="https://example.com/page", scraped_text="Page text")
+
+        self.collection.migrate_dump_to_delta()
+        self.collection.promote_to_curated()
+
+        curated_url = CuratedUrl.objects.get(url="https://example.com/page")
+        assert curated_url.scraped_text == "Page text"
+        assert curated_url.content_hash == curated_url.compute_content_hash()
+        assert TextBlob.objects.count() == 1
+        assert not DeltaUrl.objects.exists()
+
+    def test_purge_deletes_only_unreferenced_blobs(self):
+        DumpUrlFactory(collection=self.collection, url="https://example.com/kept", scraped_text="Kept")
+        gone = DumpUrlFactory(collection=self.collection, url="https://example.com/gone", scraped_text="Gone")
+        DumpUrl.objects.filter(pk=gone.pk).delete()
+
+        assert TextBlob.objects.purge_unreferenced() == 1
+        assert list(TextBlob.objects.values_list("hash", flat=True)) == [TextBlob.hash_text("Kept")]
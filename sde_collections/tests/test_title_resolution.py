@@ -0,0 +1,222 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_title_resolution.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from sde_collections.models import delta_patterns
+from sde_collections.models.delta_patterns import (
+    DeltaResolvedTitle,
+    DeltaResolvedTitleError,
+    DeltaTitlePattern,
+)
+from sde_collections.models.delta_url import DeltaUrl
+from sde_collections.tests.factories import (
+    CollectionFactory,
+    CuratedUrlFactory,
+    DeltaUrlFactory,
+)
+from sde_collections.tests.fake_pages import FakePagesServer
+from sde_collections.utils.page_fetcher import PageFetcher
+from sde_collections.utils.title_resolver import (
+    TEMPLATE_CACHE_SIZE,
+    compile_title_template,
+    resolve_title,
+    resolve_titles,
+)
+
+
+def page(heading: str) -> str:
+    return f"<html><body><h1>{heading}</h1></body></html>"
+
+
+@pytest.fixture
+def fake_pages():
+    pages = {f"/page/{index}": page(f"Heading {index}") for index in range(12)}
+    with FakePagesServer(pages=pages) as server:
+        yield server
+
+
+def test_cached_pages_are_revalidated_with_their_etag(fake_pages, tmp_path):
+    url = f"{fake_pages.url}/page/1"
+
+    with PageFetcher(cache_dir=tmp_path) as fetcher:
+        first = fetcher.fetch(url)
+        second = fetcher.fetch(url)
+
+    assert first == second == page("Heading 1").encode()
+    assert fake_pages.requests[1][1]["If-None-Match"]
+    assert fake_pages.not_modified == 1
+
+
+def test_cached_pages_are_revalidated_with_their_last_modified(tmp_path):
+    with FakePagesServer(pages={"/": page("Home")}, last_modified=True) as server:
+        for _ in range(2):
+            with PageFetcher(cache_dir=tmp_path) as fetcher:
+                content = fetcher.fetch(f"{server.url}/")
+
+    assert content == page("Home").encode()
+    assert server.not_modified == 1
+
+
+def test_changed_pages_are_downloaded_again(fake_pages, tmp_path):
+    url = f"{fake_pages.url}/page/1"
+
+    with PageFetcher(cache_dir=tmp_path) as fetcher:
+        fetcher.fetch(url)
+        fake_pages.pages["/page/1"] = page("Changed")
+        content = fetcher.fetch(url)
+
+    assert content == page("Changed").encode()
+    assert fake_pages.not_modified == 0
+
+
+def test_titles_are_resolved_concurrently_in_order(fake_pages, tmp_path):
+    fake_pages.delay = 0.05
+    contexts = [{"url": f"{fake_pages.url}/page/{index}", "title": "", "collection": ""} for index in range(12)]
+
+    with PageFetcher(concurrency=4, cache_dir=tmp_path) as fetcher:
+        results = list(resolve_titles("Title: xpath://h1", contexts, fetcher))
+
+    assert results == [(f"Title: Heading {index}", None) for index in range(12)]
+    assert fake_pages.max_in_flight == 4
+    assert len(fake_pages.connections) <= 4
+
+
+def test_failed_downloads_are_reported_per_url(fake_pages, tmp_path):
+    contexts = [
+        {"url": f"{fake_pages.url}/page/0", "title": "", "collection": ""},
+        {"url": f"{fake_pages.url}/missing", "title": "", "collection": ""},
+    ]
+
+    with PageFetcher(cache_dir=tmp_path) as fetcher:
+        (title, error), (missing_title, missing_error) = resolve_titles("xpath://h1", contexts, fetcher)
+
+    assert (title, error) == ("Heading 0", None)
+    assert missing_title is None
+    assert missing_error is not None and "Status code: 404" in missing_error
+
+
+def test_templates_are_compiled_once_per_pattern():
+    template = compile_title_template("{collection} | {title} }} xpath://h1")
+
+    assert compile_title_template("{collection} | {title} }} xpath://h1") is template
+    assert template.has_xpath
+    assert template.render(
+        {"url": "", "title": "Title", "collection": "SDE"}, lambda url: page("Heading").encode()
+    ) == ("SDE | Title }} Heading")
+
+
+def test_template_cache_evicts_the_least_recently_used_pattern():
+    first = compile_title_template("{title} (first)")
+    for index in range(TEMPLATE_CACHE_SIZE):
+        compile_title_template(f"{{title}} {index}")
+
+    assert compile_title_template("{title} (first)") is not first
+
+
+def test_pages_are_fetched_once_per_title():
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return page("Heading")
+
+    assert resolve_title("xpath://h1 - xpath://h1/text()", {"url": "https://example.com"}, fetch) == "Heading - Heading"
+    assert fetched == ["https://example.com"]
+
+
+@pytest.mark.parametrize("title_pattern", ["{title.upper()}", "{unknown}", "xpath://h1["])
+def test_invalid_templates_fail_on_every_render(title_pattern):
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            resolve_title(title_pattern, {"url": "", "title": "Title", "collection": ""})
+
+
+@pytest.mark.django_db
+def test_title_pattern_resolves_xpath_titles_from_pages(fake_pages, settings, tmp_path):
+    settings.TITLE_PAGE_CACHE_DIR = str(tmp_path)
+    collection = CollectionFactory()
+    for index in range(3):
+        DeltaUrlFactory(collection=collection, url=f"{fake_pages.url}/page/{index}")
+    DeltaUrlFactory(collection=collection, url=f"{fake_pages.url}/missing")
+
+    DeltaTitlePattern.objects.create(
+        collection=collection,
+        match_pattern=f"{fake_pages.url}/*",
+        match_pattern_type=DeltaTitlePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+        title_pattern="{collection} - xpath://h1",
+    )
+
+    titles = dict(DeltaUrl.objects.filter(collection=collection).values_list("url", "generated_title"))
+    assert titles[f"{fake_pages.url}/page/2"] == f"{collection.name} - Heading 2"
+    assert DeltaResolvedTitleError.objects.get(delta_url__url=f"{fake_pages.url}/missing").error_string.endswith(
+        "Status code: 404"
+    )
+
+
+@pytest.mark.django_db
+class TestTitlePatternWrites:
+    def setup_method(self):
+        self.collection = CollectionFactory()
+
+    def title_pattern(self, title_pattern: str, match_pattern: str = "https://example.com/*") -> DeltaTitlePattern:
+        pattern = DeltaTitlePattern(
+            collection=self.collection,
+            match_pattern=match_pattern,
+            match_pattern_type=DeltaTitlePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+            title_pattern=title_pattern,
+        )
+        pattern.save(apply=False)
+        return pattern
+
+    def queries_to_apply(self, url_count: int) -> int:
+        # DeltaUrl urls are unique across collections
+        self.collection = CollectionFactory()
+        prefix = f"https://example.com/{self.collection.id}"
+        for index in range(url_count):
+            DeltaUrlFactory(collection=self.collection, url=f"{prefix}/delta/{index}")
+            CuratedUrlFactory(collection=self.collection, url=f"{prefix}/curated/{index}")
+        pattern = self.title_pattern("{title} - Processed", match_pattern=f"{prefix}/*")
+
+        with CaptureQueriesContext(connection) as queries:
+            pattern.apply()
+        return len(queries)
+
+    def test_query_count_is_constant_per_batch(self, monkeypatch):
+        monkeypatch.setattr(delta_patterns, "TITLE_BATCH_SIZE", 5)
+
+        assert self.queries_to_apply(3) == self.queries_to_apply(5)
+        assert self.queries_to_apply(10) - self.queries_to_apply(5) == self.queries_to_apply(
+            15
+        ) - self.queries_to_apply(10)
+
+    def test_titles_are_written_to_curated_and_delta_urls(self):
+        delta_url = DeltaUrlFactory(collection=self.collection, url="https://example.com/delta", scraped_title="Delta")
+        CuratedUrlFactory(collection=self.collection, url="https://example.com/curated", scraped_title="Curated")
+
+        pattern = self.title_pattern("{title} - Processed")
+        pattern.apply()
+
+        assert dict(DeltaResolvedTitle.objects.values_list("delta_url__url", "resolved_title")) == {
+            "https://example.com/delta": "Delta - Processed",
+            "https://example.com/curated": "Curated - Processed",
+        }
+        delta_url.refresh_from_db()
+        assert delta_url.generated_title == "Delta - Processed"
+        assert pattern.delta_urls.count() == 2
+
+    def test_reapplying_replaces_errors(self):
+        delta_url = DeltaUrlFactory(collection=self.collection, url="https://example.com/delta", scraped_title="Delta")
+        pattern = self.title_pattern("{invalid_field}")
+
+        pattern.apply()
+        pattern.apply()
+        assert DeltaResolvedTitleError.objects.get(delta_url=delta_url).title_pattern == pattern
+
+        DeltaTitlePattern.objects.filter(pk=pattern.pk).update(title_pattern="{title} - Fixed")
+        pattern.refresh_from_db()
+        pattern.apply()
+
+        assert not DeltaResolvedTitleError.objects.exists()
+        assert DeltaResolvedTitle.objects.get(delta_url=delta_url).resolved_title == "Delta - Fixed"
@@ -0,0 +1,86 @@
+# docker-compose -f local.yml run --rm django pytest sde_collections/tests/test_url_match.py
+
+import pytest
+from django.db import connection
+
+from sde_collections.models.delta_patterns import DeltaExcludePattern
+from sde_collections.models.delta_url import DeltaUrl
+from sde_collections.tests.factories import CollectionFactory, DeltaUrlFactory
+from sde_collections.utils.url_match import match_pattern_filter, match_pattern_regex
+
+URLS = [
+    "https://example.com/docs/page.html",
+    "https://example.com/docs/guide.pdf",
+    "https://example.com/data/page.html",
+    "https://mirror.net/https://example.com/docs/page.html",
+]
+
+PATTERNS = [
+    ("https://example.com/docs/page.html", True),
+    ("page.html", True),
+    ("https://example.com/docs/*", False),
+    ("https://example.com/docs", False),
+    ("https://example.com/*.pdf", False),
+    ("*docs*", False),
+]
+
+
+def explain(queryset) -> str:
+    # the tables are tiny, so make scans expensive enough that the planner picks any usable index
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    return queryset.explain()
+
+
+@pytest.mark.parametrize("match_pattern,individual", PATTERNS)
+@pytest.mark.django_db
+def test_filter_matches_regex(match_pattern, individual):
+    collection = CollectionFactory()
+    for url in URLS:
+        DeltaUrlFactory(collection=collection, url=url)
+
+    by_filter = DeltaUrl.objects.filter(match_pattern_filter(match_pattern, individual))
+    by_regex = DeltaUrl.objects.filter(url__regex=match_pattern_regex(match_pattern, individual))
+    assert set(by_filter.values_list("url", flat=True)) == set(by_regex.values_list("url", flat=True))
+
+
+def test_patterns_starting_with_http_are_anchored():
+    assert match_pattern_filter("https://example.com/docs/page.html", individual=True).children == [
+        ("url", "https://example.com/docs/page.html")
+    ]
+    assert match_pattern_filter("https://example.com/docs/*", individual=False).children == [
+        ("url__startswith", "https://example.com/docs/")
+    ]
+    assert match_pattern_regex("https://example.com/*.pdf", individual=False) == r"^https://example\.com/.*\.pdf"
+    assert match_pattern_regex("page.html", individual=True) == r"page\.html$"
+
+
+@pytest.mark.django_db
+def test_prefix_patterns_use_the_url_index():
+    pattern = DeltaExcludePattern(
+        collection=CollectionFactory(),
+        match_pattern="https://example.com/docs/*.pdf",
+        match_pattern_type=DeltaExcludePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+    )
+
+    plan = explain(DeltaUrl.objects.filter(pattern.get_url_filter()).order_by())
+
+    index_conditions = [line for line in plan.splitlines() if "Index Cond" in line]
+    assert any("'https://example.com/docs/'::text" in line for line in index_conditions)
+
+
+@pytest.mark.django_db
+def test_unanchored_patterns_use_the_trigram_index():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            pytest.skip("pg_trgm is not installed on this database server")
+    pattern = DeltaExcludePattern(
+        collection=CollectionFactory(),
+        match_pattern="*docs*",
+        match_pattern_type=DeltaExcludePattern.MatchPatternTypeChoices.MULTI_URL_PATTERN,
+    )
+
+    plan = explain(DeltaUrl.objects.filter(pattern.get_url_filter()).order_by())
+
+    assert "sde_collections_deltaurl_url_trgm" in plan
@@ -15,6 +15,7 @@ router.register(r"include-patterns", views.IncludePatternViewSet)
 router.register(r"title-patterns", views.TitlePatternViewSet)
 router.register(r"document-type-patterns", views.DocumentTypePatternViewSet)
 router.register(r"division-patterns", views.DivisionPatternViewSet)
+router.register(r"pattern-jobs", views.PatternApplicationJobViewSet)
 router.register(r"environmental-justice", EnvironmentalJusticeRowViewSet)
 
 app_name = "sde_collections"
@@ -0,0 +1,225 @@
+"""
+Bulk loading of DumpUrls, DeltaUrls and CuratedUrls through Postgres COPY.
+
+Rows are streamed with `COPY ... FROM STDIN` into a temporary staging table, encoding them as
+they are read so only a small buffer is ever held in memory. A single INSERT ... SELECT then
+merges the staging table into the target with ON CONFLICT semantics on the url, which is unique
+per table or, for DumpUrls, per collection. This is an order of magnitude faster than `create()`
+per row or `bulk_create`, which both build and send a parameterised INSERT from Python objects.
+
+Scraped texts are hashed and compressed as the rows are read, staged alongside them, and merged
+into the TextBlob table before the URLs that reference them.
+"""
+
+from collections.abc import Iterable, Iterator
+
+from django.db import connection, transaction
+
+from sde_collections.models.text_blob import TextBlob
+
+# how to handle rows whose url is already in the target table
+ON_CONFLICT_SKIP = "skip"
+ON_CONFLICT_UPDATE = "update"
+
+STAGING_TABLE = "sde_collections_bulk_load_staging"
+# staging columns holding each scraped text's compressed blob next to its key
+TEXT_STAGING_COLUMNS = {"text_data": "bytea", "text_size": "integer"}
+# bytes handed to COPY per read
+COPY_BUFFER_SIZE = 1 << 20
+
+
+def _encode_copy_value(value) -> str:
+    """Encode a value in COPY's text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bytes):
+        # bytea hex format, with COPY's own escaping of the backslash
+        return "\\\\x" + value.hex()
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+        .replace("\x00", "")
+    )
+
+
+class CopyStream:
+    """A file-like object over rows, read by `copy_expert` one buffer at a time."""
+
+    def __init__(self, rows: Iterable[dict], columns: list[str], defaults: dict):
+        self.lines = self._lines(rows, columns, defaults)
+        self.buffer = b""
+        self.row_count = 0
+        self.error: Exception | None = None
+
+    def _lines(self, rows, columns, defaults) -> Iterator[bytes]:
+        for row in rows:
+            self.row_count += 1
+            values = (row.get(column, defaults[column]) for column in columns)
+            yield ("\t".join(_encode_copy_value(value) for value in values) + "\n").encode()
+
+    def read(self, size: int = -1) -> bytes:
+        size = COPY_BUFFER_SIZE if size is None or size < 0 else size
+        chunks = [self.buffer]
+        buffered = len(self.buffer)
+        try:
+            for line in self.lines:
+                chunks.append(line)
+                buffered += len(line)
+                if buffered >= size:
+                    break
+        except Exception as error:
+            self.error = error
+            raise
+        data = b"".join(chunks)
+        self.buffer = data[size:]
+        return data[:size]
+
+
+def copy_urls(
+    model, collection, rows: Iterable[dict], fields: Iterable[str], on_conflict: str = ON_CONFLICT_SKIP
+) -> dict[str, int]:
+    """
+    Load `rows`, dicts keyed by field name, into the `model` table for `collection`.
+
+    Only `fields` are read from the rows; missing keys and every other field get the model
+    default. `scraped_text` can be loaded like a field, and is stored as a TextBlob. When a url
+    appears more than once in `rows` the first one wins. Rows whose url already exists are
+    skipped, or with `on_conflict=ON_CONFLICT_UPDATE` overwrite the existing row's `fields` as
+    long as it belongs to the same collection.
+
+    Returns counts of the rows read, created, updated and skipped.
+    """
+    if on_conflict not in (ON_CONFLICT_SKIP, ON_CONFLICT_UPDATE):
+        raise ValueError(f"on_conflict must be '{ON_CONFLICT_SKIP}' or '{ON_CONFLICT_UPDATE}'")
+
+    table = model._meta.db_table
+    field_names = list(fields)
+    loads_text = "scraped_text" in field_names
+    if loads_text:
+        field_names[field_names.index("scraped_text")] = "scraped_text_blob"
+        rows = _with_text_blobs(rows)
+    model_fields = [model._meta.get_field(name) for name in field_names]
+    if "url" not in {field.name for field in model_fields}:
+        raise ValueError("fields must include url")
+    loaded = {field.name for field in model_fields}
+    # the remaining columns get their Python default; content_hash is computed by its trigger
+    defaulted = [
+        field
+        for field in model._meta.concrete_fields
+        if field.name not in loaded and field.name not in ("id", "collection") and not field.primary_key
+    ]
+
+    columns = [field.column for field in model_fields]
+    column_list = ", ".join(columns)
+    insert_columns = ", ".join(["collection_id", *columns, *(field.column for field in defaulted)])
+    select_values = ", ".join(["%s", *columns, *(["%s"] * len(defaulted))])
+    conflict_columns = ", ".join(_url_conflict_columns(model))
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column != "url")
+    if on_conflict == ON_CONFLICT_UPDATE and updates:
+        conflict_sql = f"DO UPDATE SET {updates} WHERE {table}.collection_id = EXCLUDED.collection_id"
+        # rows an update touched already existed; partitioned tables can't return xmax, so only update does
+        created_sql = "xmax = 0"
+    else:
+        conflict_sql = "DO NOTHING"
+        created_sql = "true"
+
+    staged_columns = [field.name for field in model_fields]
+    defaults = {field.name: field.get_default() for field in model_fields}
+    extra_columns = ""
+    if loads_text:
+        staged_columns += list(TEXT_STAGING_COLUMNS)
+        defaults.update(dict.fromkeys(TEXT_STAGING_COLUMNS))
+        extra_columns = "".join(f", ADD COLUMN {name} {sql_type}" for name, sql_type in TEXT_STAGING_COLUMNS.items())
+    copy_columns = ", ".join([*columns, *(TEXT_STAGING_COLUMNS if loads_text else [])])
+
+    stream = CopyStream(rows, staged_columns, defaults)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TEMPORARY TABLE {STAGING_TABLE} ON COMMIT DROP AS
+                SELECT {column_list} FROM {table} WITH NO DATA;
+            ALTER TABLE {STAGING_TABLE} ADD COLUMN position bigserial{extra_columns}
+            """
+        )
+        try:
+            cursor.copy_expert(f"COPY {STAGING_TABLE} ({copy_columns}) FROM STDIN", stream, COPY_BUFFER_SIZE)
+        except Exception as error:
+            # psycopg2 reports a failure while reading the rows as a cancelled COPY; raise the original instead
+            if stream.error is not None:
+                raise stream.error from error
+            raise
+
+        # the texts' blobs are stored in the same statement; the URLs' foreign keys are only checked
+        # on commit, by which time the blobs exist
+        store_blobs = ""
+        if loads_text:
+            text_column = model._meta.get_field("scraped_text_blob").column
+            store_blobs = f"""
+            blobs AS (
+                INSERT INTO {TextBlob._meta.db_table} (hash, data, size)
+                SELECT {text_column}, text_data, text_size
+                FROM {STAGING_TABLE} WHERE text_data IS NOT NULL
+                ON CONFLICT (hash) DO NOTHING
+            ),"""
+
+        # DISTINCT ON keeps a single row per url, since ON CONFLICT can't affect a row twice
+        cursor.execute(
+            f"""
+            WITH {store_blobs}
+            merged AS (
+                INSERT INTO {table} ({insert_columns})
+                SELECT {select_values}
+                FROM (
+                    SELECT DISTINCT ON (url) {column_list} FROM {STAGING_TABLE} ORDER BY url, position
+                ) AS staged
+                ON CONFLICT ({conflict_columns}) {conflict_sql}
+                RETURNING {created_sql} AS created
+            )
+            SELECT COUNT(*) FILTER (WHERE created), COUNT(*) FILTER (WHERE NOT created) FROM merged
+            """,
+            [collection.pk, *(field.get_db_prep_save(field.get_default(), connection) for field in defaulted)],
+        )
+        created, updated = cursor.fetchone()
+        cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+
+    return {
+        "rows": stream.row_count,
+        "created": created,
+        "updated": updated,
+        "skipped": stream.row_count - created - updated,
+    }
+
+
+def _url_conflict_columns(model) -> list[str]:
+    """The columns of the unique constraint covering `model`'s url, which ON CONFLICT targets."""
+    if model._meta.get_field("url").unique:
+        return [model._meta.get_field("url").column]
+    for field_names in model._meta.unique_together:
+        if "url" in field_names:
+            return [model._meta.get_field(name).column for name in field_names]
+    raise ValueError(f"{model.__name__}.url has no unique constraint")
+
+
+def _with_text_blobs(rows: Iterable[dict]) -> Iterator[dict]:
+    """
+    Replace each row's scraped_text with the key of its TextBlob, and the blob's data the first
+    time the text is seen, so repeated texts are only compressed and staged once.
+    """
+    seen = set()
+    for row in rows:
+        text = row.get("scraped_text") or ""
+        key = TextBlob.hash_text(text) if text else None
+        blob = TextBlob.from_text(text) if key is not None and key not in seen else None
+        if blob is not None:
+            seen.add(key)
+        yield {
+            **row,
+            "scraped_text_blob": key,
+            "text_data": blob and blob.data,
+            "text_size": blob and blob.size,
+        }
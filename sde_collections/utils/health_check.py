@@ -52,8 +52,8 @@ def _fetch_candidate_urls(collection, server_name):
 
     candidate_urls_sinequa = {}
     for candidate_url in candidate_urls_remote:
-        url = candidate_url["fields"]["url"]
-        candidate_urls_sinequa[url] = CandidateURL(url=url, scraped_title=candidate_url["fields"]["scraped_title"])
+        url = candidate_url["url"]
+        candidate_urls_sinequa[url] = CandidateURL(url=url, scraped_title=candidate_url["scraped_title"])
     return candidate_urls_sinequa
 
 
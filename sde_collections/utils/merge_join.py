@@ -0,0 +1,35 @@
+"""
+Streaming merge join of two iterables sorted by the same key.
+
+Holds one item from each side at a time, so joining two tables streamed with server-side
+cursors (`.iterator(chunk_size=...)`) takes O(1) memory however large they are. Both sides must
+be sorted in Python's string order; for Postgres text that means ordering with the "C" collation.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, TypeVar, cast
+
+Left = TypeVar("Left")
+Right = TypeVar("Right")
+
+_EXHAUSTED = object()
+
+
+def left_merge_join(
+    left: Iterable[Left], right: Iterable[Right], key: Callable[[Any], Any]
+) -> Iterator[tuple[Left, Right | None]]:
+    """
+    Yields `(left_item, right_item)` for every item of `left`, paired with the item of `right`
+    that has the same key, or None. Keys must be unique and ascending on both sides.
+    """
+    right = iter(right)
+    right_item = next(right, _EXHAUSTED)
+    for left_item in left:
+        left_key = key(left_item)
+        while right_item is not _EXHAUSTED and key(right_item) < left_key:
+            right_item = next(right, _EXHAUSTED)
+        if right_item is not _EXHAUSTED and key(right_item) == left_key:
+            yield left_item, cast(Right, right_item)
+            right_item = next(right, _EXHAUSTED)
+        else:
+            yield left_item, None
@@ -0,0 +1,153 @@
+"""
+Fetching the pages that xpath title patterns read their titles from.
+
+A `PageFetcher` downloads pages through one pooled `requests.Session` with timeouts, and keeps
+them in an on-disk cache keyed by URL. A cached page is revalidated with the ETag and
+Last-Modified its server sent, so an unchanged page costs a 304 instead of a download.
+`PageFetcher.map` runs a function over many URLs `concurrency` at a time, which is how a title
+pattern resolves the titles of all the URLs it matches, see `title_resolver.resolve_titles`.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# pages downloaded at once, and connections kept alive per host
+DEFAULT_CONCURRENCY = 8
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (5, 30)
+
+# response headers kept with a cached page, and the request headers that revalidate it
+VALIDATORS = {"ETag": "If-None-Match", "Last-Modified": "If-Modified-Since"}
+
+
+def _content(url: str, response: requests.Response) -> bytes:
+    if not response.ok:
+        raise ValueError(f"Failed to retrieve the {url}. Status code: {response.status_code}")
+    return response.content
+
+
+def fetch_page(url: str) -> bytes:
+    """Download a single page, without a cache. Failures are raised as ValueErrors."""
+    try:
+        response = requests.get(url, timeout=DEFAULT_TIMEOUT)
+    except requests.RequestException as e:
+        raise ValueError(f"Network error while accessing {url}: {str(e)}")
+    return _content(url, response)
+
+
+class PageCache:
+    """
+    Pages stored under the sha256 of their URL. Each file holds a line of JSON with the
+    validators the server sent, followed by the page, and is replaced atomically so pages
+    written by concurrent fetches are never read half-written.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+
+    def _path(self, url: str) -> Path:
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / digest[:2] / digest
+
+    def get(self, url: str) -> tuple[bytes, dict[str, str]] | None:
+        try:
+            validators, _, content = self._path(url).read_bytes().partition(b"\n")
+            return content, json.loads(validators)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, url: str, content: bytes, validators: dict[str, str]) -> None:
+        path = self._path(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(json.dumps(validators).encode() + b"\n")
+            file.write(content)
+        os.replace(temporary_path, path)
+
+
+class PageFetcher:
+    """
+    Downloads pages `concurrency` at a time over a shared connection pool. Pages whose server
+    sent an ETag or Last-Modified are cached in `cache_dir`, which defaults to the
+    TITLE_PAGE_CACHE_DIR setting; an empty `cache_dir` turns the cache off.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+        cache_dir: str | Path | None = None,
+    ):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        cache_dir = settings.TITLE_PAGE_CACHE_DIR if cache_dir is None else cache_dir
+        self.cache = PageCache(cache_dir) if cache_dir else None
+
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "PageFetcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def fetch(self, url: str) -> bytes:
+        """Download a page, or reuse the cached copy if its server says it hasn't changed."""
+        cached = self.cache.get(url) if self.cache else None
+        headers = {}
+        if cached:
+            headers = {VALIDATORS[name]: value for name, value in cached[1].items() if name in VALIDATORS}
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ValueError(f"Network error while accessing {url}: {str(e)}")
+
+        if cached and response.status_code == requests.codes.not_modified:
+            return cached[0]
+        content = _content(url, response)
+        if self.cache:
+            validators = {name: response.headers[name] for name in VALIDATORS if name in response.headers}
+            if validators:
+                self.cache.put(url, content, validators)
+        return content
+
+    def map(self, function: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Yields `function(item)` for each item, in order, running `concurrency` calls at a time.
+        At most `concurrency` results are held ahead of the consumer.
+        """
+        items = iter(items)
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="page-fetcher")
+        try:
+            in_flight: deque[Future] = deque()
+            for item in items:
+                in_flight.append(executor.submit(function, item))
+                if len(in_flight) == self.concurrency:
+                    break
+            while in_flight:
+                result = in_flight.popleft().result()
+                # keep the window full while the consumer works through this result
+                if (item := next(items, None)) is not None:
+                    in_flight.append(executor.submit(function, item))
+                yield result
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
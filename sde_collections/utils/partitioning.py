@@ -0,0 +1,172 @@
+"""
+Optional LIST partitioning of a URL table by collection.
+
+A partitioned table has one partition per collection plus a default partition. Wiping a
+collection's rows is then a TRUNCATE of its partition instead of a DELETE leaving dead rows
+behind in one shared table, and queries filtered on a collection only read its partition.
+
+Postgres requires every unique constraint of a partitioned table to include the partition key,
+so a table can only be partitioned if its unique constraints include collection_id and no foreign
+key references it. That holds for DumpUrl, but DeltaUrl and CuratedUrl are referenced by id from
+the pattern membership and resolved title tables, so only DumpUrl can be partitioned; DeltaUrl,
+CuratedUrl and the membership tables, and so `clear_delta_urls`, are left as they are. Their urls
+remain globally unique, while DumpUrl's are only unique per collection.
+
+The models don't know whether their table is partitioned. `partition_by_collection` and
+`unpartition` rebuild a table in place under the same name, keeping its constraints, indexes
+and triggers, see `manage.py partition_dump_urls`.
+"""
+
+from django.db import connection, transaction
+
+DEFAULT_PARTITION_SUFFIX = "default"
+
+
+def is_partitioned(model) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [model._meta.db_table])
+        return cursor.fetchone() is not None
+
+
+def partition_name(model, collection_id: int) -> str:
+    return f"{model._meta.db_table}_collection_{int(collection_id)}"
+
+
+def clear_collection(model, collection) -> None:
+    """
+    Delete the collection's rows in a single statement, partitioned or not. A collection with a
+    partition has it truncated. Otherwise its rows are deleted and, if the table is partitioned, a
+    partition is created so the collection's next rows land there.
+    """
+    table, partition = model._meta.db_table, partition_name(model, collection.pk)
+    collection_id = int(collection.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DO $$
+            BEGIN
+                IF to_regclass('{partition}') IS NOT NULL THEN
+                    -- TRUNCATE refuses a table with foreign key checks still pending in this transaction
+                    SET CONSTRAINTS ALL IMMEDIATE;
+                    TRUNCATE {partition};
+                    SET CONSTRAINTS ALL DEFERRED;
+                ELSE
+                    DELETE FROM {table} WHERE collection_id = {collection_id};
+                    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = '{table}'::regclass) THEN
+                        CREATE TABLE {partition} PARTITION OF {table} FOR VALUES IN ({collection_id});
+                    END IF;
+                END IF;
+            END
+            $$
+            """
+        )
+
+
+def drop_collection_partition(model, collection_id: int) -> None:
+    """Drop a deleted collection's partition, if it has one."""
+    partition = partition_name(model, collection_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DO $$
+            BEGIN
+                IF to_regclass('{partition}') IS NOT NULL THEN
+                    SET CONSTRAINTS ALL IMMEDIATE;
+                    DROP TABLE {partition};
+                    SET CONSTRAINTS ALL DEFERRED;
+                END IF;
+            END
+            $$
+            """
+        )
+
+
+def partition_by_collection(model) -> int:
+    """Rebuild `model`'s table partitioned by collection. Returns the number of collection partitions."""
+    return _rebuild(model, partitioned=True)
+
+
+def unpartition(model) -> None:
+    """Rebuild `model`'s partitioned table as a single table."""
+    _rebuild(model, partitioned=False)
+
+
+def _rebuild(model, partitioned: bool) -> int:
+    """
+    Copy `model`'s table into a new table of the same name, partitioned by collection or not,
+    then recreate the constraints, indexes and triggers of the old one. The primary key includes
+    collection_id in a partitioned table.
+    """
+    table = model._meta.db_table
+    old_table = f"{table}_rebuilt"
+    pk_column = model._meta.pk.column
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'c', 'f') ORDER BY contype = 'f'",
+            [table],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = indrelid AND conindid = indexrelid)",
+            [table],
+        )
+        # indexes of a partitioned table are defined ON ONLY the parent
+        indexes = [definition.replace(" ON ONLY ", " ON ", 1) for definition, in cursor.fetchall()]
+        cursor.execute(
+            "SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass "
+            "AND NOT tgisinternal AND tgparentid = 0",
+            [table],
+        )
+        triggers = [definition for definition, in cursor.fetchall()]
+
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+        partition_by = " PARTITION BY LIST (collection_id)" if partitioned else ""
+        cursor.execute(f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING STORAGE){partition_by}")
+        # the id default belongs to the old table's sequence and is replaced below
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {pk_column} DROP DEFAULT")
+
+        collection_ids = []
+        if partitioned:
+            cursor.execute(f"CREATE TABLE {table}_{DEFAULT_PARTITION_SUFFIX} PARTITION OF {table} DEFAULT")
+            cursor.execute(f"SELECT DISTINCT collection_id FROM {old_table}")
+            collection_ids = [collection_id for collection_id, in cursor.fetchall()]
+            for collection_id in collection_ids:
+                cursor.execute(
+                    f"CREATE TABLE {partition_name(model, collection_id)} PARTITION OF {table} "
+                    f"FOR VALUES IN ({int(collection_id)})"
+                )
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {old_table}")
+        cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, %s))", [old_table, pk_column])
+        next_id = cursor.fetchone()[0]
+        # DROP refuses a table with foreign key checks still pending in this transaction
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(f"DROP TABLE {old_table}")
+        cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+        if partitioned:
+            # identity columns are only supported on partitioned tables from Postgres 17
+            sequence = f"{table}_{pk_column}_seq"
+            cursor.execute(f"CREATE SEQUENCE {sequence} OWNED BY {table}.{pk_column} START WITH {int(next_id)}")
+            cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {pk_column} SET DEFAULT nextval('{sequence}')")
+        else:
+            cursor.execute(
+                f"ALTER TABLE {table} ALTER COLUMN {pk_column} "
+                f"ADD GENERATED BY DEFAULT AS IDENTITY (START WITH {int(next_id)})"
+            )
+
+        for name, kind, definition in constraints:
+            if kind == "p":
+                definition = (
+                    f"PRIMARY KEY ({pk_column}, collection_id)" if partitioned else f"PRIMARY KEY ({pk_column})"
+                )
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+        for definition in indexes + triggers:
+            cursor.execute(definition)
+        cursor.execute(f"ANALYZE {table}")
+
+    return len(collection_ids)
@@ -0,0 +1,322 @@
+"""
+Single-pass matching of every pattern in a collection against its URLs.
+
+`BaseMatchPattern.get_url_filter` turns each pattern into a query on the URL tables, so applying
+N patterns means N queries, and N scans for the patterns no index can serve. This module compiles
+all of a collection's patterns once and streams the URLs a single time instead:
+
+- Individual URL patterns that start with http are the exact URL and are looked up in a dict.
+  The others are anchored at the end of the URL (`pattern$`), so their literals are stored
+  reversed in a trie and each URL is walked backwards through it once.
+- Multi-URL patterns are split on `*` into literal fragments. All fragments of all patterns go
+  into one Aho-Corasick automaton; a pattern is a candidate when every one of its fragments
+  occurs in the URL, and candidates are confirmed by checking the fragments appear in order,
+  the first one at the start of the URL for patterns that start with http.
+"""
+
+from collections import defaultdict
+from collections.abc import Hashable, Iterable
+
+from django.apps import apps
+
+from .url_match import is_anchored
+
+# Mirrors BaseMatchPattern.MatchPatternTypeChoices.INDIVIDUAL_URL
+INDIVIDUAL_URL_PATTERN = 1
+
+PATTERN_MODEL_NAMES = [
+    "DeltaExcludePattern",
+    "DeltaIncludePattern",
+    "DeltaTitlePattern",
+    "DeltaDocumentTypePattern",
+    "DeltaDivisionPattern",
+]
+
+
+class SuffixTrie:
+    """Trie of reversed literals, used to find every literal a string ends with."""
+
+    _END = object()
+
+    def __init__(self):
+        self.root: dict = {}
+
+    def add(self, literal: str, key: Hashable) -> None:
+        node = self.root
+        for char in reversed(literal):
+            node = node.setdefault(char, {})
+        node.setdefault(self._END, []).append(key)
+
+    def matches(self, text: str) -> list[Hashable]:
+        found = list(self.root.get(self._END, []))
+        node = self.root
+        for char in reversed(text):
+            child = node.get(char)
+            if child is None:
+                break
+            node = child
+            found.extend(node.get(self._END, []))
+        return found
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton reporting which of its literals occur anywhere in a string."""
+
+    def __init__(self, literals: Iterable[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[frozenset[int]] = [frozenset()]
+        self.literal_ids: dict[str, int] = {}
+
+        outputs: list[set[int]] = [set()]
+        for literal in literals:
+            if literal in self.literal_ids:
+                continue
+            literal_id = self.literal_ids[literal] = len(self.literal_ids)
+            state = 0
+            for char in literal:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(literal_id)
+
+        # breadth-first pass to build failure links and merge outputs along them
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                outputs[next_state] |= outputs[self.fail[next_state]]
+
+        self.output = [frozenset(found) for found in outputs]
+
+    def search(self, text: str) -> set[int]:
+        """Return the ids of all literals found in `text`."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found: set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+def _fragments_in_order(text: str, fragments: list[str], anchored: bool = False) -> bool:
+    """
+    Equivalent to matching `fragment1.*fragment2.*...` anywhere in `text`, or at its start
+    when `anchored`.
+    """
+    position = 0
+    if anchored:
+        if not text.startswith(fragments[0]):
+            return False
+        position, fragments = len(fragments[0]), fragments[1:]
+    for fragment in fragments:
+        position = text.find(fragment, position)
+        if position == -1:
+            return False
+        position += len(fragment)
+    return True
+
+
+class CompiledPatternSet:
+    """
+    All match patterns of a collection compiled into a single matcher.
+
+    Keys are the pattern objects themselves (anything with `match_pattern` and
+    `match_pattern_type`), so `match(url)` returns the patterns that match a URL with the same
+    semantics as running `url ~ pattern.get_regex_pattern()` in the database.
+    """
+
+    def __init__(self, patterns: Iterable):
+        self.patterns = list(patterns)
+        self.suffix_trie = SuffixTrie()
+        self.exact_urls: dict[str, list] = defaultdict(list)
+        self.always_match: list = []
+        self.wildcard_patterns: list[tuple[Hashable, list[str], frozenset[int], bool]] = []
+
+        fragments_by_pattern = []
+        for pattern in self.patterns:
+            if pattern.match_pattern_type == INDIVIDUAL_URL_PATTERN:
+                if is_anchored(pattern.match_pattern):
+                    self.exact_urls[pattern.match_pattern].append(pattern)
+                else:
+                    self.suffix_trie.add(pattern.match_pattern, pattern)
+                continue
+            fragments = [fragment for fragment in pattern.match_pattern.split("*") if fragment]
+            if not fragments:
+                self.always_match.append(pattern)
+            else:
+                fragments_by_pattern.append((pattern, fragments))
+
+        self.automaton = AhoCorasick(fragment for _, fragments in fragments_by_pattern for fragment in fragments)
+        self.patterns_by_literal: dict[int, list[int]] = defaultdict(list)
+        for index, (pattern, fragments) in enumerate(fragments_by_pattern):
+            required = frozenset(self.automaton.literal_ids[fragment] for fragment in fragments)
+            self.wildcard_patterns.append((pattern, fragments, required, is_anchored(pattern.match_pattern)))
+            for literal_id in required:
+                self.patterns_by_literal[literal_id].append(index)
+
+    def match(self, url: str) -> set:
+        """Return every pattern that matches `url`."""
+        matched = set(self.always_match)
+        matched.update(self.exact_urls.get(url, []))
+        matched.update(self.suffix_trie.matches(url))
+
+        found_literals = self.automaton.search(url)
+        if found_literals:
+            candidates = {index for literal_id in found_literals for index in self.patterns_by_literal[literal_id]}
+            for index in candidates:
+                pattern, fragments, required, anchored = self.wildcard_patterns[index]
+                if required <= found_literals and _fragments_in_order(url, fragments, anchored):
+                    matched.add(pattern)
+        return matched
+
+
+class PatternMatchIndex:
+    """
+    Pattern -> URL memberships for every pattern in a collection, built by streaming the
+    collection's DeltaUrls and CuratedUrls through a CompiledPatternSet once.
+
+    While an index is attached to a pattern (see `Collection.apply_all_patterns`) the pattern reads
+    its matches from here instead of querying the URL tables. DeltaUrls created while patterns
+    are being applied must be registered with `add_delta_url` so later patterns see them.
+
+    A partial index only evaluates the given DeltaUrl and CuratedUrl ids. Patterns then only
+    touch those URLs, and pattern precedence falls back to the persisted `url_match_count`.
+    """
+
+    STREAM_CHUNK_SIZE = 5000
+
+    def __init__(self, collection, patterns: Iterable, partial: bool = False):
+        self.collection = collection
+        self.compiled = CompiledPatternSet(patterns)
+        self.delta_ids: dict = defaultdict(set)
+        self.curated_ids: dict = defaultdict(set)
+        self.urls: dict = defaultdict(set)
+        self._min_match_counts: dict[type, dict[str, int]] = {}
+
+        # ids a partial index has evaluated; memberships outside of these are left untouched
+        self.is_partial = partial
+        self.delta_scope: set[int] | None = set() if partial else None
+        self.curated_scope: set[int] | None = set() if partial else None
+
+    @property
+    def patterns(self) -> list:
+        return self.compiled.patterns
+
+    @classmethod
+    def for_collection(cls, collection, delta_ids=None, curated_ids=None) -> "PatternMatchIndex":
+        """
+        Compile every pattern of the collection and match all of its URLs in a single pass.
+        If `delta_ids` or `curated_ids` are given, build a partial index over only those URLs.
+        """
+        patterns = []
+        for model_name in PATTERN_MODEL_NAMES:
+            model = apps.get_model("sde_collections", model_name)
+            patterns.extend(model.objects.filter(collection=collection))
+
+        partial = delta_ids is not None or curated_ids is not None
+        index = cls(collection, patterns, partial=partial)
+        if partial:
+            index.stream_urls(delta_ids=delta_ids or [], curated_ids=curated_ids or [])
+        else:
+            index.stream_urls()
+        return index
+
+    def stream_urls(self, delta_ids=None, curated_ids=None) -> None:
+        DeltaUrl = apps.get_model("sde_collections", "DeltaUrl")
+        CuratedUrl = apps.get_model("sde_collections", "CuratedUrl")
+
+        delta_rows = DeltaUrl.objects.filter(collection=self.collection)
+        if delta_ids is not None:
+            delta_rows = delta_rows.filter(id__in=delta_ids)
+        for delta_id, url in delta_rows.values_list("id", "url").iterator(chunk_size=self.STREAM_CHUNK_SIZE):
+            self.add_delta_url(delta_id, url)
+
+        curated_rows = CuratedUrl.objects.filter(collection=self.collection)
+        if curated_ids is not None:
+            curated_rows = curated_rows.filter(id__in=curated_ids)
+        for curated_id, url in curated_rows.values_list("id", "url").iterator(chunk_size=self.STREAM_CHUNK_SIZE):
+            self.add_curated_url(curated_id, url)
+
+    def add_delta_url(self, delta_id: int, url: str) -> None:
+        if self.delta_scope is not None:
+            self.delta_scope.add(delta_id)
+        for pattern in self.compiled.match(url):
+            self.delta_ids[pattern].add(delta_id)
+            self._add_url(pattern, url)
+
+    def add_curated_url(self, curated_id: int, url: str) -> None:
+        if self.curated_scope is not None:
+            self.curated_scope.add(curated_id)
+        for pattern in self.compiled.match(url):
+            self.curated_ids[pattern].add(curated_id)
+            self._add_url(pattern, url)
+
+    def _add_url(self, pattern, url: str) -> None:
+        if url not in self.urls[pattern]:
+            self.urls[pattern].add(url)
+            # a new URL changes match counts, so precedence has to be resolved again
+            self._min_match_counts.pop(type(pattern), None)
+
+    def get_match_count(self, pattern) -> int:
+        """Number of unique URLs the pattern matches; what `url_match_count` persists."""
+        if self.is_partial:
+            return pattern.url_match_count
+        return len(self.urls[pattern])
+
+    def adjust_match_counts(self, added_urls: Iterable[str], removed_urls: Iterable[str]) -> None:
+        """
+        Keep the persisted `url_match_count` of each pattern current when URLs enter or leave
+        the collection, by matching only those URLs instead of recounting every pattern.
+        """
+        changes: dict = defaultdict(int)
+        for url in added_urls:
+            for pattern in self.compiled.match(url):
+                changes[pattern] += 1
+        for url in removed_urls:
+            for pattern in self.compiled.match(url):
+                changes[pattern] -= 1
+
+        for pattern, change in changes.items():
+            if change:
+                pattern.url_match_count = max(pattern.url_match_count + change, 0)
+                type(pattern).objects.filter(pk=pattern.pk).update(url_match_count=pattern.url_match_count)
+        self._min_match_counts.clear()
+
+    def get_min_match_counts(self, pattern_class) -> dict[str, int]:
+        """
+        For every URL matched by a pattern of `pattern_class`, the smallest match count among
+        the patterns of that class matching it. This is the winning pattern's count, so a pattern
+        applies to a URL exactly when its own count equals the entry for that URL.
+        """
+        if pattern_class not in self._min_match_counts:
+            min_counts: dict[str, int] = {}
+            for pattern in self.patterns:
+                if type(pattern) is not pattern_class:
+                    continue
+                count = self.get_match_count(pattern)
+                for url in self.urls[pattern]:
+                    if count < min_counts.get(url, count + 1):
+                        min_counts[url] = count
+            self._min_match_counts[pattern_class] = min_counts
+        return self._min_match_counts[pattern_class]
+
+    def get_dominated_urls(self, pattern) -> set[str]:
+        """URLs matched by `pattern` where a pattern of the same type with fewer matches wins."""
+        count = self.get_match_count(pattern)
+        min_counts = self.get_min_match_counts(type(pattern))
+        return {url for url in self.urls[pattern] if min_counts[url] < count}
@@ -2,28 +2,46 @@ import _ast
 import ast
 import html as html_lib
 import re
-from typing import Any
+from collections.abc import Callable, Iterable, Iterator
+from functools import lru_cache
+from typing import Any, cast
 
-import requests
 from lxml import etree, html
 from unidecode import unidecode
 
+from .page_fetcher import PageFetcher, fetch_page
+
+# distinct title patterns and xpaths kept compiled; a collection has a handful of each
+TEMPLATE_CACHE_SIZE = 1024
+
+# titles are rendered without builtins, the allowed variables are all an f-string pattern can reach
+_EVAL_GLOBALS: dict[str, Any] = {"__builtins__": {}}
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_xpath(xpath: str) -> etree.XPath:
+    return etree.XPath(xpath)
+
 
 def is_valid_xpath(xpath: str) -> bool:
     try:
-        etree.XPath(xpath)
+        compile_xpath(xpath)
         return True
     except etree.XPathSyntaxError:
         return False
 
 
+def _parse_fstring(pattern: str) -> ast.JoinedStr:
+    return cast(ast.JoinedStr, ast.parse(f"f'''{pattern}'''", mode="eval").body)
+
+
 def is_valid_fstring(pattern: str) -> bool:
     context = {
         "url": "",
         "title": "",
         "collection": "",
     }
-    parsed = ast.parse(f"f'''{pattern}'''", mode="eval")
+    parsed = _parse_fstring(pattern)
     # Walk through the AST to ensure it only contains safe expressions
     for node in ast.walk(parsed):
         if isinstance(node, _ast.FormattedValue):
@@ -51,45 +69,34 @@ def clean_text(text: str) -> str:
 
 def resolve_brace(pattern: str, context: dict[str, Any]) -> str:
     """Safely interpolates the variables in an f-string pattern using the provided context."""
-    parsed = ast.parse(f"f'''{pattern}'''", mode="eval")
-
-    is_valid_fstring(pattern)  # Refactor this
-
-    compiled = compile(parsed, "<string>", "eval")
-    return str(eval(compiled, {}, context))
+    return compile_title_template(pattern).render(context)
 
 
-def resolve_xpath(xpath: str, url: str) -> str:
+def resolve_xpath(xpath: str, url: str, fetch: Callable[[str], bytes] = fetch_page) -> str:
     if not is_valid_xpath(xpath):
         raise ValueError(f"The xpath, {xpath}, is not valid.")
 
-    try:
-        response = requests.get(url)
-
-        if response.ok:
-            tree = html.fromstring(response.content)
-            values = tree.xpath(xpath)
-
-            if len(values) == 1:
-                if isinstance(values[0], str):
-                    text_content = values[0]
-                else:
-                    text_content = values[0].text
-
-                if text_content:
-                    text_content = clean_text(text_content)
-                    return text_content
-                else:
-                    raise ValueError(f"The element at the xpath, {xpath}, does not contain any text content.")
-            elif len(values) > 1:
-                raise ValueError(f"More than one element found for the xpath, {xpath}")
-            else:
-                raise ValueError(f"No element found for the xpath, {xpath}")
+    return _xpath_text(html.fromstring(fetch(url)), compile_xpath(xpath), xpath)
+
+
+def _xpath_text(tree: html.HtmlElement, compiled_xpath: etree.XPath, xpath: str) -> str:
+    values = compiled_xpath(tree)
+
+    if len(values) == 1:
+        if isinstance(values[0], str):
+            text_content = values[0]
         else:
-            raise ValueError(f"Failed to retrieve the {url}. Status code: {response.status_code}")
+            text_content = values[0].text
 
-    except requests.RequestException as e:
-        raise ValueError(f"Network error while accessing {url}: {str(e)}")
+        if text_content:
+            text_content = clean_text(text_content)
+            return text_content
+        else:
+            raise ValueError(f"The element at the xpath, {xpath}, does not contain any text content.")
+    elif len(values) > 1:
+        raise ValueError(f"More than one element found for the xpath, {xpath}")
+    else:
+        raise ValueError(f"No element found for the xpath, {xpath}")
 
 
 def parse_title(input_string: str) -> list[tuple[str, str]]:
@@ -134,18 +141,90 @@ def parse_title(input_string: str) -> list[tuple[str, str]]:
     return result
 
 
-def resolve_title(raw_title: str, context: dict[str, Any]) -> str:
-    parsed_title = parse_title(raw_title)
-    final_string = ""
-
-    for element in parsed_title:
-        element_type, element_value = element
+class TitleTemplate:
+    """
+    A title pattern compiled for rendering many titles. Its segments are parsed once, its str
+    and brace segments are joined into a single f-string code object, and its xpaths are
+    compiled, so rendering a title is one eval, plus one page download when it has xpaths.
+    Get templates through `compile_title_template`, which caches them per pattern.
+    """
+
+    def __init__(self, raw_title: str):
+        self.raw_title = raw_title
+        # (variable the text is passed to the f-string as, compiled xpath, xpath)
+        self.xpaths: list[tuple[str, etree.XPath, str]] = []
+        values: list[ast.expr] = []
+
+        for element_type, element_value in parse_title(raw_title):
+            if element_type == "xpath":
+                if not is_valid_xpath(element_value):
+                    raise ValueError(f"The xpath, {element_value}, is not valid.")
+                variable = f"_xpath_{len(self.xpaths)}"
+                self.xpaths.append((variable, compile_xpath(element_value), element_value))
+                values.append(ast.FormattedValue(value=ast.Name(id=variable, ctx=ast.Load()), conversion=-1))
+            elif element_type == "brace":
+                is_valid_fstring(element_value)
+                values.extend(_parse_fstring(element_value).values)
+            elif element_type == "str":
+                values.append(ast.Constant(value=element_value))
+
+        expression = ast.fix_missing_locations(ast.Expression(body=ast.JoinedStr(values=values)))
+        self.code = compile(expression, "<title pattern>", "eval")
+
+    @property
+    def has_xpath(self) -> bool:
+        return bool(self.xpaths)
+
+    def render(self, context: dict[str, Any], fetch: Callable[[str], bytes] = fetch_page) -> str:
+        if self.xpaths:
+            tree = html.fromstring(fetch(context["url"]))
+            context = {
+                **context,
+                **{variable: _xpath_text(tree, compiled, xpath) for variable, compiled, xpath in self.xpaths},
+            }
+        return eval(self.code, _EVAL_GLOBALS, context)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_title_template(raw_title: str) -> TitleTemplate:
+    return TitleTemplate(raw_title)
+
+
+def resolve_title(raw_title: str, context: dict[str, Any], fetch: Callable[[str], bytes] = fetch_page) -> str:
+    return compile_title_template(raw_title).render(context, fetch)
+
+
+def resolve_titles(
+    raw_title: str, contexts: Iterable[dict[str, Any]], fetcher: PageFetcher | None = None
+) -> Iterator[tuple[str | None, str | None]]:
+    """
+    Resolve `raw_title` for each context, in order, yielding (title, error_message) pairs.
+
+    A title with xpath segments has its pages downloaded `fetcher.concurrency` at a time through
+    the fetcher's connection pool and page cache, instead of one blocking download per context.
+    """
+    try:
+        has_xpath = compile_title_template(raw_title).has_xpath
+    except Exception:
+        # an invalid pattern is reported against every context
+        has_xpath = False
+    if not has_xpath:
+        yield from map(lambda context: _resolve_or_error(raw_title, context, fetch_page), contexts)
+        return
+
+    own_fetcher = fetcher is None
+    fetcher = fetcher or PageFetcher()
+    try:
+        yield from fetcher.map(lambda context: _resolve_or_error(raw_title, context, fetcher.fetch), contexts)
+    finally:
+        if own_fetcher:
+            fetcher.close()
 
-        if element_type == "xpath":
-            final_string += resolve_xpath(element_value, context["url"])
-        elif element_type == "brace":
-            final_string += resolve_brace(element_value, context)
-        elif element_type == "str":
-            final_string += element_value
 
-    return final_string
+def _resolve_or_error(
+    raw_title: str, context: dict[str, Any], fetch: Callable[[str], bytes]
+) -> tuple[str | None, str | None]:
+    try:
+        return resolve_title(raw_title, context, fetch), None
+    except Exception as e:
+        return None, str(e)
@@ -0,0 +1,46 @@
+"""
+How a match pattern selects URLs, shared by the delta patterns and the legacy candidate URL patterns.
+
+Patterns that start with http are anchored at the start of the URL, the same way they are written
+into the indexer config by `_process_match_pattern`. An individual URL pattern is then the exact
+URL and a multi-URL pattern a prefix followed by `*` wildcards, which the btree indexes on the url
+columns can serve with `=` and `LIKE 'prefix%'`. Any other pattern can match anywhere in the URL
+and is only expressible as a regex, served by the pg_trgm indexes where the database has them.
+"""
+
+import re
+
+from django.db import models
+
+ANCHORED_PREFIX = "http"
+
+
+def is_anchored(match_pattern: str) -> bool:
+    return match_pattern.startswith(ANCHORED_PREFIX)
+
+
+def match_pattern_regex(match_pattern: str, individual: bool) -> str:
+    """The Postgres regex matching the URLs selected by `match_pattern`."""
+    regex = re.escape(match_pattern)
+    if individual:
+        regex = f"{regex}$"
+    else:
+        regex = regex.replace(r"\*", ".*")
+    return f"^{regex}" if is_anchored(match_pattern) else regex
+
+
+def match_pattern_filter(match_pattern: str, individual: bool) -> models.Q:
+    """
+    A filter on `url` equivalent to `url__regex=match_pattern_regex(...)`, using `=` and
+    `startswith` wherever the pattern allows so the database can use an index instead of
+    evaluating the regex on every URL.
+    """
+    if not is_anchored(match_pattern):
+        return models.Q(url__regex=match_pattern_regex(match_pattern, individual))
+    if individual:
+        return models.Q(url=match_pattern)
+    prefix, _, rest = match_pattern.partition("*")
+    if not rest.strip("*"):
+        return models.Q(url__startswith=prefix)
+    # the prefix narrows the URLs down through the index, the regex checks the rest of the pattern
+    return models.Q(url__startswith=prefix, url__regex=match_pattern_regex(match_pattern, individual))
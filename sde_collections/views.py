@@ -12,7 +12,7 @@ from django.views.generic.detail import DetailView
 from django.views.generic.edit import DeleteView
 from django.views.generic.list import ListView
 from rest_framework import generics, status, viewsets
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -27,6 +27,7 @@ from .models.collection_choice_fields import (
     WorkflowStatusChoices,
 )
 from .models.delta_patterns import (
+    BaseMatchPattern,
     DeltaDivisionPattern,
     DeltaDocumentTypePattern,
     DeltaExcludePattern,
@@ -34,6 +35,7 @@ from .models.delta_patterns import (
     DeltaResolvedTitle,
     DeltaResolvedTitleError,
     DeltaTitlePattern,
+    PatternApplicationJob,
 )
 from .models.delta_url import CuratedUrl, DeltaUrl
 from .serializers import (
@@ -48,9 +50,11 @@ from .serializers import (
     DocumentTypePatternSerializer,
     ExcludePatternSerializer,
     IncludePatternSerializer,
+    PatternApplicationJobSerializer,
     TitlePatternSerializer,
 )
 from .tasks import push_to_github_task
+from .utils.bulk_load import copy_urls
 from .utils.health_check import generate_db_github_metadata_differences
 
 User = get_user_model()
@@ -322,10 +326,14 @@ class DeltaURLBulkCreateView(generics.ListCreateAPIView):
     queryset = DeltaUrl.objects.all()
     serializer_class = DeltaURLBulkCreateSerializer
 
-    def perform_create(self, serializer, collection_id=None):
-        for validated_data in serializer.validated_data:
-            validated_data["collection_id"] = collection_id
-        super().perform_create(serializer)
+    def perform_create(self, serializer, collection=None):
+        counts = copy_urls(DeltaUrl, collection, serializer.validated_data, fields=serializer.child.Meta.fields)
+        # copy_urls skips URLs that already exist; reject the request, rolling it back, rather than drop them
+        if counts["skipped"]:
+            raise ValidationError(
+                f"{counts['skipped']} of the posted URLs already exist in another collection "
+                "or are posted more than once."
+            )
 
     def create(self, request, *args, **kwargs):
         config_folder = kwargs.get("config_folder")
@@ -334,7 +342,7 @@ class DeltaURLBulkCreateView(generics.ListCreateAPIView):
 
         serializer = self.get_serializer(data=request.data, many=True)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer, collection_id=collection.pk)
+        self.perform_create(serializer, collection=collection)
 
         collection.apply_all_patterns()
 
@@ -350,11 +358,7 @@ class DeltaURLAPIView(ListAPIView):
         return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        queryset = (
-            DeltaUrl.objects.filter(collection__config_folder=self.config_folder)
-            .with_exclusion_status()
-            .filter(excluded=False)
-        )
+        queryset = DeltaUrl.objects.filter(collection__config_folder=self.config_folder, excluded=False)
         return queryset
 
 
@@ -367,15 +371,91 @@ class CuratedURLAPIView(ListAPIView):
         return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        queryset = (
-            CuratedUrl.objects.filter(collection__config_folder=self.config_folder)
-            .with_exclusion_status()
-            .filter(excluded=False)
-        )
+        queryset = CuratedUrl.objects.filter(collection__config_folder=self.config_folder, excluded=False)
         return queryset
 
 
-class ExcludePatternViewSet(CollectionFilterMixin, viewsets.ModelViewSet):
+class PatternBeingDeleted(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This pattern is already being deleted."
+    default_code = "pattern_being_deleted"
+
+
+class PatternJobMixin(viewsets.ModelViewSet):
+    """
+    Saves and deletes patterns without applying them inside the request. The apply/unapply
+    runs in a PatternApplicationJob instead, whose id is returned as `job_id` for polling.
+
+    A deleted pattern stays in the database until its unapply job deletes it. Until then it is
+    left out of the API, and deleting it again is rejected rather than queueing a second unapply.
+
+    With `replaces_individual_patterns`, posting a pattern for a URL that already has an
+    individual URL pattern in the collection replaces that pattern's value, and its job
+    unapplies the old value before applying the new one.
+    """
+
+    job: PatternApplicationJob
+    replaces_individual_patterns = False
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return queryset.exclude(pk__in=PatternApplicationJob.objects.unapplying(queryset.model).values("pattern_id"))
+
+    def perform_create(self, serializer):
+        serializer.save(apply=False)
+        self.job = PatternApplicationJob.enqueue(serializer.instance, PatternApplicationJob.Action.APPLY)
+
+    def perform_update(self, serializer):
+        serializer.save(apply=False)
+        self.job = PatternApplicationJob.enqueue(serializer.instance, PatternApplicationJob.Action.APPLY)
+
+    def perform_destroy(self, instance):
+        # lock the pattern so that of two concurrent deletes, the second sees the first one's job
+        type(instance).objects.select_for_update().filter(pk=instance.pk).first()
+        if PatternApplicationJob.objects.unapplying(type(instance)).filter(pattern_id=instance.pk).exists():
+            raise PatternBeingDeleted()
+        # the job unapplies the pattern and then deletes it
+        self.job = PatternApplicationJob.enqueue(instance, PatternApplicationJob.Action.UNAPPLY)
+
+    def job_response(self) -> Response:
+        return Response({"job_id": self.job.id}, status=status.HTTP_202_ACCEPTED)
+
+    def get_replaced_pattern(self, request):
+        if not self.replaces_individual_patterns:
+            return None
+        return (
+            self.get_queryset()
+            .filter(
+                collection_id=request.data.get("collection"),
+                match_pattern=request.data.get("match_pattern"),
+                match_pattern_type=BaseMatchPattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
+            )
+            .first()
+        )
+
+    def create(self, request, *args, **kwargs):
+        if (pattern := self.get_replaced_pattern(request)) is not None:
+            serializer = self.get_serializer(pattern, data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(apply=False)
+            self.job = PatternApplicationJob.enqueue(pattern, PatternApplicationJob.Action.REAPPLY)
+            return Response({**serializer.data, "job_id": self.job.id}, status=status.HTTP_201_CREATED)
+
+        response = super().create(request, *args, **kwargs)
+        response.data["job_id"] = self.job.id
+        return response
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response.data["job_id"] = self.job.id
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        self.perform_destroy(self.get_object())
+        return self.job_response()
+
+
+class ExcludePatternViewSet(PatternJobMixin, CollectionFilterMixin, viewsets.ModelViewSet):
     queryset = DeltaExcludePattern.objects.all()
     serializer_class = ExcludePatternSerializer
 
@@ -386,16 +466,17 @@ class ExcludePatternViewSet(CollectionFilterMixin, viewsets.ModelViewSet):
         match_pattern = request.POST.get("match_pattern")
         collection_id = request.POST.get("collection")
         try:
-            DeltaExcludePattern.objects.get(
+            pattern = DeltaExcludePattern.objects.get(
                 collection_id=Collection.objects.get(id=collection_id),
                 match_pattern=match_pattern,
-            ).delete()
-            return Response(status=status.HTTP_200_OK)
+            )
         except DeltaExcludePattern.DoesNotExist:
             return super().create(request, *args, **kwargs)
+        self.perform_destroy(pattern)
+        return self.job_response()
 
 
-class IncludePatternViewSet(CollectionFilterMixin, viewsets.ModelViewSet):
+class IncludePatternViewSet(PatternJobMixin, CollectionFilterMixin, viewsets.ModelViewSet):
     queryset = DeltaIncludePattern.objects.all()
     serializer_class = IncludePatternSerializer
 
@@ -406,26 +487,29 @@ class IncludePatternViewSet(CollectionFilterMixin, viewsets.ModelViewSet):
         match_pattern = request.POST.get("match_pattern")
         collection_id = request.POST.get("collection")
         try:
-            DeltaIncludePattern.objects.get(
+            pattern = DeltaIncludePattern.objects.get(
                 collection_id=Collection.objects.get(id=collection_id),
                 match_pattern=match_pattern,
-            ).delete()
-            return Response(status=status.HTTP_200_OK)
+            )
         except DeltaIncludePattern.DoesNotExist:
             return super().create(request, *args, **kwargs)
+        self.perform_destroy(pattern)
+        return self.job_response()
 
 
-class TitlePatternViewSet(CollectionFilterMixin, viewsets.ModelViewSet):
+class TitlePatternViewSet(PatternJobMixin, CollectionFilterMixin, viewsets.ModelViewSet):
     queryset = DeltaTitlePattern.objects.all()
     serializer_class = TitlePatternSerializer
+    replaces_individual_patterns = True
 
     def get_queryset(self):
         return super().get_queryset().order_by("match_pattern")
 
 
-class DocumentTypePatternViewSet(CollectionFilterMixin, viewsets.ModelViewSet):
+class DocumentTypePatternViewSet(PatternJobMixin, CollectionFilterMixin, viewsets.ModelViewSet):
     queryset = DeltaDocumentTypePattern.objects.all()
     serializer_class = DocumentTypePatternSerializer
+    replaces_individual_patterns = True
 
     def get_queryset(self):
         return super().get_queryset().order_by("match_pattern")
@@ -438,19 +522,21 @@ class DocumentTypePatternViewSet(CollectionFilterMixin, viewsets.ModelViewSet):
             collection_id = request.POST.get("collection")
             match_pattern = request.POST.get("match_pattern")
             try:
-                DeltaDocumentTypePattern.objects.get(
+                pattern = DeltaDocumentTypePattern.objects.get(
                     collection_id=Collection.objects.get(id=collection_id),
                     match_pattern=match_pattern,
                     match_pattern_type=DeltaDocumentTypePattern.MatchPatternTypeChoices.INDIVIDUAL_URL,
-                ).delete()
-                return Response(status=status.HTTP_200_OK)
+                )
             except DeltaDocumentTypePattern.DoesNotExist:
                 return Response(status=status.HTTP_204_NO_CONTENT)
+            self.perform_destroy(pattern)
+            return self.job_response()
 
 
-class DivisionPatternViewSet(CollectionFilterMixin, viewsets.ModelViewSet):
+class DivisionPatternViewSet(PatternJobMixin, CollectionFilterMixin, viewsets.ModelViewSet):
     queryset = DeltaDivisionPattern.objects.all()
     serializer_class = DivisionPatternSerializer
+    replaces_individual_patterns = True
 
     def get_queryset(self):
         return super().get_queryset().order_by("match_pattern")
@@ -463,6 +549,20 @@ class DivisionPatternViewSet(CollectionFilterMixin, viewsets.ModelViewSet):
             return Response(status=status.HTTP_400_BAD_REQUEST, data={"error": "Division is required."})
 
 
+class PatternApplicationJobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = PatternApplicationJob.objects.all()
+    serializer_class = PatternApplicationJobSerializer
+
+    def get_queryset(self):
+        # jobs are polled by id, so only filter by collection when one is asked for
+        queryset = super().get_queryset()
+        if collection_id := self.request.GET.get("collection_id"):
+            queryset = queryset.filter(collection_id=collection_id)
+        if self.request.GET.get("is_finished") == "false":
+            queryset = queryset.unfinished()
+        return queryset
+
+
 class CollectionViewSet(viewsets.ModelViewSet):
     queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
@@ -15,6 +15,14 @@ var matchPatternTypeMap = {
   "Multi-URL Pattern": 2,
 };
 var currentURLtoDelete;
+var ALL_PATTERN_TABLES = [
+  "#delta_urls_table",
+  "#exclude_patterns_table",
+  "#include_patterns_table",
+  "#title_patterns_table",
+  "#document_type_patterns_table",
+  "#division_patterns_table",
+];
 
 var uniqueId; //used for logic related to contents on column customization modal
 const dict = {
@@ -1156,8 +1164,7 @@ function postDivisionPatterns(match_pattern, match_pattern_type, division) {
       csrfmiddlewaretoken: csrftoken,
     },
     success: function (data) {
-      $("#delta_urls_table").DataTable().ajax.reload(null, false);
-      $("#division_patterns_table").DataTable().ajax.reload(null, false);
+      waitForPatternJob(data && data.job_id, ["#delta_urls_table", "#division_patterns_table"]);
       if (currentTab === "") { // Only add a notification if we are on the first tab
         newDivisionPatternsCount = newDivisionPatternsCount + 1;
         $("#divisionPatternsTab").html(
@@ -1570,8 +1577,7 @@ function postDocumentTypePatterns(
       csrfmiddlewaretoken: csrftoken,
     },
     success: function (data) {
-      $("#delta_urls_table").DataTable().ajax.reload(null, false);
-      $("#document_type_patterns_table").DataTable().ajax.reload(null, false);
+      waitForPatternJob(data && data.job_id, ["#delta_urls_table", "#document_type_patterns_table"]);
       if (currentTab === "") { //Only add a notification if we are on the first tab
         newDocumentTypePatternsCount = newDocumentTypePatternsCount + 1;
         $("#documentTypePatternsTab").html(
@@ -1621,8 +1627,7 @@ function postExcludePatterns(match_pattern, match_pattern_type = 0, force) {
       csrfmiddlewaretoken: csrftoken,
     },
     success: function (data) {
-      $("#delta_urls_table").DataTable().ajax.reload(null, false);
-      $("#exclude_patterns_table").DataTable().ajax.reload(null, false);
+      waitForPatternJob(data && data.job_id, ["#delta_urls_table", "#exclude_patterns_table"]);
       if (currentTab === "") { //Only add a notification if we are on the first tab
         newExcludePatternsCount = newExcludePatternsCount + 1;
         $("#excludePatternsTab").html(
@@ -1663,8 +1668,7 @@ function postIncludePatterns(match_pattern, match_pattern_type = 0) {
       csrfmiddlewaretoken: csrftoken,
     },
     success: function (data) {
-      $("#delta_urls_table").DataTable().ajax.reload(null, false);
-      $("#include_patterns_table").DataTable().ajax.reload(null, false);
+      waitForPatternJob(data && data.job_id, ["#delta_urls_table", "#include_patterns_table"]);
       if (currentTab === "") { //Only add a notification if we are on the first tab
         newIncludePatternsCount = newIncludePatternsCount + 1;
         $("#includePatternsTab").html(
@@ -1702,8 +1706,7 @@ function postTitlePatterns(
       csrfmiddlewaretoken: csrftoken
     },
     success: function (data) {
-      $('#delta_urls_table').DataTable().ajax.reload(null, false);
-      $('#title_patterns_table').DataTable().ajax.reload(null, false);
+      waitForPatternJob(data && data.job_id, ["#delta_urls_table", "#title_patterns_table"]);
       if (currentTab === "") { //Only add a notification if we are on the first tab
         newTitlePatternsCount = newTitlePatternsCount + 1;
         $("#titlePatternsTab").html(
@@ -1782,12 +1785,7 @@ function deletePattern(
           },
           success: function (data) {
             $modal = $("#deletePatternModal").modal("hide");
-            $("#delta_urls_table").DataTable().ajax.reload(null, false);
-            $("#exclude_patterns_table").DataTable().ajax.reload(null, false);
-            $("#include_patterns_table").DataTable().ajax.reload(null, false);
-            $("#title_patterns_table").DataTable().ajax.reload(null, false);
-            $("#document_type_patterns_table").DataTable().ajax.reload(null, false);
-            $("#division_patterns_table").DataTable().ajax.reload(null, false);
+            waitForPatternJob(data.job_id, ALL_PATTERN_TABLES);
           },
         });
       }
@@ -1811,12 +1809,7 @@ function deletePattern(
           "X-CSRFToken": csrftoken,
         },
         success: function (data) {
-          $("#delta_urls_table").DataTable().ajax.reload(null, false);
-          $("#exclude_patterns_table").DataTable().ajax.reload(null, false);
-          $("#include_patterns_table").DataTable().ajax.reload(null, false);
-          $("#title_patterns_table").DataTable().ajax.reload(null, false);
-          $("#document_type_patterns_table").DataTable().ajax.reload(null, false);
-          $("#division_patterns_table").DataTable().ajax.reload(null, false);
+          waitForPatternJob(data.job_id, ALL_PATTERN_TABLES);
         },
       });
     }
@@ -1835,12 +1828,56 @@ function deletePattern(
       "X-CSRFToken": csrftoken,
     },
     success: function (data) {
-      $("#delta_urls_table").DataTable().ajax.reload(null, false);
-      $("#exclude_patterns_table").DataTable().ajax.reload(null, false);
-      $("#include_patterns_table").DataTable().ajax.reload(null, false);
-      $("#title_patterns_table").DataTable().ajax.reload(null, false);
-      $("#document_type_patterns_table").DataTable().ajax.reload(null, false);
-      $("#division_patterns_table").DataTable().ajax.reload(null, false);
+      waitForPatternJob(data.job_id, ALL_PATTERN_TABLES);
+    },
+  });
+}
+
+function reloadTables(tables) {
+  tables.forEach(function (table) {
+    $(table).DataTable().ajax.reload(null, false);
+  });
+}
+
+// Patterns are applied and unapplied in the background. Poll the job, showing its progress,
+// and reload the tables once it has finished.
+function waitForPatternJob(jobId, tables, $progressToast = null) {
+  if (!jobId) {
+    reloadTables(tables);
+    return;
+  }
+
+  $.ajax({
+    url: `/api/pattern-jobs/${jobId}/`,
+    type: "GET",
+    global: false, // don't block the UI while polling
+    success: function (job) {
+      var message = `${job.action_display} ${job.match_pattern}: ${job.progress}%`;
+      if (!job.is_finished) {
+        if ($progressToast) {
+          $progressToast.find(".toast-message").text(message);
+        } else {
+          $progressToast = toastr.info(message, "", { timeOut: 0, extendedTimeOut: 0 });
+        }
+        setTimeout(function () {
+          waitForPatternJob(jobId, tables, $progressToast);
+        }, 1000);
+        return;
+      }
+
+      if ($progressToast) {
+        toastr.clear($progressToast);
+      }
+      if (job.status_display === "Failed") {
+        toastr.error(job.error, `${job.action_display} ${job.match_pattern} failed`);
+      }
+      reloadTables(tables);
+    },
+    error: function () {
+      if ($progressToast) {
+        toastr.clear($progressToast);
+      }
+      reloadTables(tables);
     },
   });
 }